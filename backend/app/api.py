@@ -1,20 +1,51 @@
-from django.shortcuts import get_object_or_404
-from django.core.files.storage import default_storage
-from ninja import Router, PatchDict, File
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from ninja import Router, PatchDict, File, Query
 from ninja.files import UploadedFile
 from ninja.errors import HttpError
-from typing import List, Optional
+from ninja.decorators import decorate_view
+from typing import List, Literal, Optional
+from datetime import date, timedelta
 from decimal import Decimal
-from django.conf import settings
-from .models import Finance, SpendingLimit, FinanceAttachment, Goal, GoalRecord, Family, FamilyMember
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth
+from .types import FinanceType, FinanceStatus
+from .models import (
+    Finance,
+    SpendingLimit,
+    FinanceAttachment,
+    Goal,
+    GoalRecord,
+    Family,
+    FamilyMember,
+    StorageDeletion,
+    User,
+)
 from .schemas import (
     CreateFinanceSchema,
     FinanceSchema,
+    FinanceFilterSchema,
+    FinanceSummaryFilterSchema,
+    FinanceSummaryBucketSchema,
+    FinanceNotificationSchema,
+    FinanceImportResultSchema,
+    FinanceBatchSchema,
+    FinanceBatchResultSchema,
+    FinanceChangesSchema,
     DetailFinanceSchema,
     CreateOrUpdateSpendingLimitSchema,
     SpendingLimitSchema,
     FinanceAttachmentSchema,
+    PresignAttachmentsSchema,
+    PresignedUploadSchema,
+    ConfirmAttachmentsSchema,
     GoalSchema,
+    GoalRecordSchema,
+    GoalChangesSchema,
     CreateGoalSchema,
     AddGoalRecordSchema,
     UploadProfilePhotoSchema,
@@ -22,19 +53,54 @@ from .schemas import (
     CreateFamilySchema,
     JoinFamilySchema,
 )
-from core.auth import AuthBearer
+from core.auth import AsyncAuthBearer, AuthBearer, invalidate_tokens
+from core.renderers import render_json
 from core.schemas import UserSchema
 from app.storage_backend import PublicMediaStorage
+from app.pagination import paginate_rows
+from app.upload_handlers import DECLARED_TEXT_TYPES, MB, get_limits, limit_uploads
+from app import rollups, exports, imports, uploads, photos, rows, sync, events
+from app.scope import aget_scope, get_scope, family_member_ids, invalidate_scopes
 
 router = Router(tags=["Finances"], auth=AuthBearer())
+# Operações async (servidas pelo ASGI) usam a mesma autenticação sem bloquear o loop
+async_auth = AsyncAuthBearer()
 
 
 # ========= Funções auxiliares =========
 
 def get_user_family(request):
     """Retorna a família do usuário autenticado (se houver)."""
-    membership = FamilyMember.objects.filter(user=request.auth).select_related("family").first()
-    return membership.family if membership else None
+    family_id = get_scope(request).family_id
+    if not family_id:
+        return None
+    return Family.objects.select_related("created_by").filter(pk=family_id).first()
+
+
+def get_visible_finances(request):
+    """Retorna as finanças que o usuário pode ver (as suas ou as da família)."""
+    return visible_finances(get_scope(request))
+
+
+def visible_finances(scope):
+    if scope.family_id:
+        return Finance.objects.filter(family_id=scope.family_id)
+    return Finance.objects.filter(created_by_id=scope.user_id)
+
+
+def visible_goals(scope):
+    if scope.family_id:
+        return Goal.objects.filter(family_id=scope.family_id)
+    return Goal.objects.filter(user_id=scope.user_id)
+
+
+def assign_family(user_id, family_id):
+    """Vincula (ou desvincula, com None) as finanças e metas do usuário à família."""
+    for queryset in (Finance.objects.filter(created_by_id=user_id), Goal.objects.filter(user_id=user_id)):
+        # Os registros saem do stream do escopo antigo (lápides) e entram no novo
+        sync.record_deleted(queryset)
+        queryset.update(family_id=family_id)
+        sync.record_changed(queryset)
 
 
 def get_user_image_url(user):
@@ -47,105 +113,397 @@ def get_user_image_url(user):
         return user.image
 
     try:
-        return default_storage.url(user.image)
+        return uploads.signed_urls([user.image])[user.image]
     except Exception:
         return None
 
 
 # ========= Finanças =========
 
-@router.get("/finances", response=List[FinanceSchema])
-def get_finances(request):
-    user = request.auth
+USER_REFS_DESCRIPTION = (
+    "Em vez de repetir o autor em cada item, retorna só created_by_id e os usuários uma vez em users."
+)
+
+
+@router.get("/finances", response=List[FinanceSchema], auth=async_auth)
+@sync.conditional(sync.FINANCES)
+@paginate_rows(rows.finance_rows, page=rows.finance_page)
+async def get_finances(
+    request,
+    filters: FinanceFilterSchema = Query(...),
+    user_refs: bool = Query(False, description=USER_REFS_DESCRIPTION),
+):
+    return filters.filter(visible_finances(await aget_scope(request)))
+
+
+@router.get("/finances/changes", response=FinanceChangesSchema)
+def get_finance_changes(request, since: Optional[str] = None, filters: FinanceFilterSchema = Query(...)):
+    """
+    Finanças alteradas e removidas desde o token ``since`` (campo ``revision``
+    da resposta anterior). Sem ``since``, ou com ``reset``, recarregue a listagem.
+    """
+    scope = get_scope(request)
+    return sync.changes(
+        sync.FINANCES, scope, since, visible_finances(scope), rows.finance_rows, matching=filters.filter
+    )
+
+
+SUMMARY_DIMENSIONS = {"category": "category", "status": "status", "member": "created_by_id"}
 
-    family_member = FamilyMember.objects.filter(user=user).select_related("family").first()
 
-    if family_member:
-        family_users = FamilyMember.objects.filter(family=family_member.family).values_list("user", flat=True)
-        finances = Finance.objects.filter(created_by__in=family_users).select_related("created_by")
+@router.get("/finances/summary", response=List[FinanceSummaryBucketSchema])
+def get_finances_summary(
+    request,
+    filters: FinanceSummaryFilterSchema = Query(...),
+    period: Literal["month", "day"] = "month",
+    group_by: List[Literal["category", "status", "member"]] = Query([]),
+):
+    """Totais de receita/despesa/meta agregados no banco por período (e dimensões opcionais)."""
+    trunc = TruncMonth if period == "month" else TruncDay
+    dimensions = [SUMMARY_DIMENSIONS[name] for name in dict.fromkeys(group_by)]
+
+    if rollups.can_summarize(filters, period, group_by):
+        return rollups.summarize(get_scope(request).user_ids, filters, dimensions)
+
+    finances = (
+        get_visible_finances(request)
+        .annotate(reference_date=Coalesce("payment_date", "due_date", output_field=DateField()))
+        .filter(reference_date__isnull=False)
+    )
+    zero = Value(Decimal("0"))
+    buckets = (
+        filters.filter(finances)
+        .annotate(period=trunc("reference_date", output_field=DateField()))
+        .order_by()
+        .values("period", *dimensions)
+        .annotate(
+            income=Coalesce(Sum("value", filter=Q(type=FinanceType.INCOME)), zero),
+            expense=Coalesce(Sum("value", filter=Q(type=FinanceType.EXPENSE)), zero),
+            goal=Coalesce(Sum("value", filter=Q(type=FinanceType.GOAL)), zero),
+            count=Count("id"),
+        )
+        .order_by("period", *dimensions)
+    )
+    return list(buckets)
+
+
+@router.get("/finances/export")
+def export_finances(
+    request,
+    filters: FinanceFilterSchema = Query(...),
+    format: Literal["csv", "xlsx"] = "csv",
+):
+    """Exporta as finanças (com os mesmos filtros da listagem) em streaming."""
+    finances = filters.filter(get_visible_finances(request)).order_by("-payment_date", "created_at", "id")
+    rows = exports.export_rows(finances)
+
+    if format == "xlsx":
+        chunks = exports.stream_xlsx(rows)
+        content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     else:
-        finances = Finance.objects.filter(created_by=user).select_related("created_by")
+        chunks = exports.stream_csv(rows)
+        content_type = "text/csv; charset=utf-8"
+    if isinstance(request, ASGIRequest):
+        chunks = exports.async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="registros.{format}"'
+    return response
+
+
+@router.post("/finances/import", response=FinanceImportResultSchema)
+@decorate_view(limit_uploads("import"))
+def import_finances(
+    request,
+    file: UploadedFile = File(...),
+    format: Optional[Literal["csv", "ofx"]] = None,
+    category: str = imports.DEFAULT_CATEGORY,
+):
+    """Importa um extrato CSV/OFX; linhas já importadas antes são ignoradas."""
+    if format is None:
+        format = "ofx" if (file.name or "").lower().endswith((".ofx", ".qfx")) else "csv"
+
+    try:
+        return imports.import_finances(request.auth, get_scope(request).family_id, file, format, category)
+    except imports.ImportFormatError as e:
+        raise HttpError(400, str(e))
+    except IntegrityError:
+        raise HttpError(409, "Este extrato já está sendo importado.")
 
-    return finances
+
+NOTIFICATION_WINDOW_DAYS = 3
+
+
+@router.get("/finances/notifications", response=List[FinanceNotificationSchema])
+def get_finance_notifications(request):
+    """Finanças não pagas que vencem nos próximos dias ou já venceram."""
+    today = date.today()
+    finances = (
+        get_visible_finances(request)
+        .filter(
+            status__in=[FinanceStatus.PENDING, FinanceStatus.OVERDUE],
+            due_date__lte=today + timedelta(days=NOTIFICATION_WINDOW_DAYS),
+        )
+        .order_by("due_date", "id")
+        .values("id", "title", "due_date", "status")
+    )
+
+    notifications = []
+    for finance in finances:
+        days_left = (finance["due_date"] - today).days
+        if days_left < 0:
+            kind = "due-expired"
+        elif days_left == 0:
+            kind = "due-today"
+        elif days_left == 1:
+            kind = "due-tomorrow"
+        else:
+            kind = "due-soon"
+        notifications.append({**finance, "days_left": days_left, "kind": kind})
+    return notifications
 
 
 @router.post("/finances", response=FinanceSchema)
 def create_finance(request, finance: CreateFinanceSchema, goal_id: Optional[int] = None):
     payload = finance.dict()
-    finance_obj = Finance.objects.create(**payload, created_by=request.auth)
+    with transaction.atomic():
+        finance_obj = Finance.objects.create(**payload, created_by=request.auth, family_id=get_scope(request).family_id)
+        rollups.record_change(None, rollups.snapshot(finance_obj))
+        sync.record_changed([finance_obj])
     return finance_obj
 
 
-@router.get("/finances/{finance_id}", response=DetailFinanceSchema)
-def get_finance(request, finance_id: int):
-    finance = get_object_or_404(Finance.objects.prefetch_related("attachments"), id=finance_id)
+BATCH_UPDATE_FIELDS = ["title", "value", "payment_date", "due_date", "category", "type", "status", "updated_at"]
+
+
+def null_required_fields(data):
+    """Campos obrigatórios enviados como null numa alteração parcial."""
+    return [attr for attr, value in data.items() if value is None and not Finance._meta.get_field(attr).null]
+
+
+@router.post("/finances/batch", response=List[FinanceBatchResultSchema])
+def batch_finances(request, payload: FinanceBatchSchema):
+    """Cria, altera e remove várias finanças numa só requisição (resultado por item)."""
+    scope = get_scope(request)
+    ids = {operation.id for operation in payload.operations if operation.op != "create"}
+    # Uma única consulta para buscar (e depois autorizar) todas as finanças do lote
+    finances = {finance.id: finance for finance in Finance.objects.filter(id__in=ids)}
+
+    results = [None] * len(payload.operations)
+    created, updated, deleted, originals = [], {}, {}, {}
+    now = timezone.now()
+
+    for index, operation in enumerate(payload.operations):
+        if operation.op == "create":
+            finance = Finance(**operation.data.dict(), created_by=request.auth, family_id=scope.family_id)
+            finance.apply_status_rules()
+            created.append((index, finance))
+            continue
+
+        finance = finances.get(operation.id)
+        result = {"index": index, "op": operation.op, "id": operation.id}
+        null_fields = null_required_fields(operation.data) if operation.op == "update" else []
+        if finance is None:
+            results[index] = {**result, "status": 404, "detail": "Finança não encontrada"}
+        elif not scope.can_access(finance.created_by_id, finance.family_id):
+            results[index] = {**result, "status": 403, "detail": "Acesso negado"}
+        elif finance.id in deleted:
+            results[index] = {**result, "status": 409, "detail": "Finança já removida neste lote"}
+        elif null_fields:
+            detail = f"Campos obrigatórios não podem ser nulos: {', '.join(null_fields)}"
+            results[index] = {**result, "status": 400, "detail": detail}
+        elif operation.op == "update":
+            originals.setdefault(finance.id, rollups.snapshot(finance))
+            for attr, value in operation.data.items():
+                setattr(finance, attr, value)
+            finance.apply_status_rules()
+            finance.updated_at = now
+            updated[finance.id] = finance
+            results[index] = {**result, "status": 200}
+        else:
+            originals.setdefault(finance.id, rollups.snapshot(finance))
+            updated.pop(finance.id, None)
+            deleted[finance.id] = finance
+            results[index] = {**result, "status": 204}
+
+    with transaction.atomic():
+        Finance.objects.bulk_create([finance for _, finance in created])
+        Finance.objects.bulk_update(updated.values(), BATCH_UPDATE_FIELDS)
+        if deleted:
+            Finance.objects.filter(id__in=deleted).delete()
+        rollups.record_changes(
+            [(None, rollups.snapshot(finance)) for _, finance in created]
+            + [(originals[id], rollups.snapshot(finance)) for id, finance in updated.items()]
+            + [(originals[id], None) for id in deleted]
+        )
+        sync.record_changed([finance for _, finance in created] + list(updated.values()))
+        sync.record_deleted(deleted.values())
+
+    for index, finance in created:
+        results[index] = {"index": index, "op": "create", "id": finance.id, "status": 201}
+    return results
+
+
+@router.get("/finances/{finance_id}", response=DetailFinanceSchema, auth=async_auth)
+async def get_finance(
+    request, finance_id: int, user_refs: bool = Query(False, description=USER_REFS_DESCRIPTION)
+):
+    # Tudo o que a resposta usa é carregado aqui (nada de consulta preguiçosa no loop)
+    attachments = Prefetch("attachments", queryset=FinanceAttachment.objects.select_related("created_by"))
+    finance = await aget_object_or_404(
+        Finance.objects.select_related("created_by").prefetch_related(attachments), id=finance_id
+    )
 
     # Segurança: garante que o usuário tem acesso
-    family = get_user_family(request)
-    if finance.created_by != request.auth and finance.family != family:
+    if not (await aget_scope(request)).can_access(finance.created_by_id, finance.family_id):
         raise HttpError(403, "Acesso negado")
 
-    for attachment in finance.attachments.all():
-        attachment.file_url = default_storage.url(attachment.file.name)
-
+    await uploads.run_storage_io(uploads.set_file_urls, finance.attachments.all())
+    if user_refs:
+        data = DetailFinanceSchema.model_validate(finance).model_dump()
+        return render_json(rows.finance_detail_with_user_refs(data))
     return finance
 
 
 @router.put("/finances/{finance_id}", response=FinanceSchema)
 def update_finance(request, finance_id: int, payload: PatchDict[CreateFinanceSchema]):
     finance = get_object_or_404(Finance, id=finance_id)
-    family = get_user_family(request)
-    if finance.created_by != request.auth and finance.family != family:
+    if not get_scope(request).can_access(finance.created_by_id, finance.family_id):
         raise HttpError(403, "Acesso negado")
+    null_fields = null_required_fields(payload)
+    if null_fields:
+        raise HttpError(400, f"Campos obrigatórios não podem ser nulos: {', '.join(null_fields)}")
 
+    before = rollups.snapshot(finance)
     for attr, value in payload.items():
         setattr(finance, attr, value)
-    finance.save()
+    with transaction.atomic():
+        finance.save()
+        rollups.record_change(before, rollups.snapshot(finance))
+        sync.record_changed([finance])
     return finance
 
 
 @router.delete("/finances/{finance_id}", response={204: None})
 def delete_finance(request, finance_id: int):
     finance = get_object_or_404(Finance, id=finance_id)
-    family = get_user_family(request)
-    if finance.created_by != request.auth and finance.family != family:
+    if not get_scope(request).can_access(finance.created_by_id, finance.family_id):
         raise HttpError(403, "Acesso negado")
 
-    finance.delete()
+    with transaction.atomic():
+        rollups.record_change(rollups.snapshot(finance), None)
+        sync.record_deleted([finance])
+        finance.delete()
     return 204, None
 
 
 # ========= Upload de anexos =========
 
-@router.post("/finances/{finance_id}/attachments", response=List[FinanceAttachmentSchema])
-def upload_finance_attachments(request, finance_id: int, files: List[UploadedFile] = File(...)):
+ATTACHMENTS_REQUEST_BODY = {
+    "requestBody": {
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                    "required": ["files"],
+                }
+            }
+        },
+        "required": True,
+    }
+}
+
+
+@router.post(
+    "/finances/{finance_id}/attachments",
+    response=List[FinanceAttachmentSchema],
+    auth=async_auth,
+    openapi_extra=ATTACHMENTS_REQUEST_BODY,
+)
+@decorate_view(limit_uploads("attachments", stream_to_storage=True))
+async def upload_finance_attachments(request, finance_id: int):
+    finance = await aget_object_or_404(Finance, id=finance_id)
+    if not (await aget_scope(request)).can_access(finance.created_by_id, finance.family_id):
+        raise HttpError(403, "Acesso negado")
+
+    def save():
+        # O corpo só é lido (e enviado ao storage) depois da checagem de acesso, numa thread
+        files = request.FILES.getlist("files")
+        if not files:
+            raise HttpError(400, "Envie ao menos um arquivo.")
+        return uploads.set_file_urls(uploads.save_attachments(finance, files, request.auth))
+
+    return await sync_to_async(save)()
+
+
+@router.post("/finances/{finance_id}/attachments/presign", response=List[PresignedUploadSchema])
+def presign_finance_attachments(request, finance_id: int, payload: PresignAttachmentsSchema):
+    """Primeiro passo do upload direto: o cliente envia cada arquivo com PUT na URL retornada."""
     finance = get_object_or_404(Finance, id=finance_id)
-    family = get_user_family(request)
-    if finance.created_by != request.auth and finance.family != family:
+    if not get_scope(request).can_access(finance.created_by_id, finance.family_id):
         raise HttpError(403, "Acesso negado")
 
-    uploaded_files = []
-    for file in files:
-        attachment = FinanceAttachment.objects.create(
-            finance=finance,
-            file=file,
-            name=file.name or "",
-            content_type=file.content_type or "application/octet-stream",
-            size=file.size or 0,
-            created_by=request.auth,
-        )
-        attachment.file_url = default_storage.url(attachment.file.name)
-        uploaded_files.append(attachment)
+    # O tipo declarado vai assinado no PUT e é o que o storage servirá depois
+    allowed = get_limits("attachments")["content_types"] | DECLARED_TEXT_TYPES | {"application/octet-stream"}
+    for file in payload.files:
+        if file.content_type.lower() not in allowed:
+            raise HttpError(415, f"Tipo de arquivo não permitido: {file.name}")
+
+    presigned = []
+    for file in payload.files:
+        key = uploads.new_attachment_key(finance.id, file.name)
+        presigned.append({
+            "name": file.name,
+            "key": key,
+            "url": uploads.presign_put(key, file.content_type),
+            "headers": {"Content-Type": file.content_type},
+        })
+    return presigned
+
+
+@router.post("/finances/{finance_id}/attachments/confirm", response=List[FinanceAttachmentSchema])
+def confirm_finance_attachments(request, finance_id: int, payload: ConfirmAttachmentsSchema):
+    """Segundo passo do upload direto: registra os anexos já enviados ao storage."""
+    finance = get_object_or_404(Finance, id=finance_id)
+    if not get_scope(request).can_access(finance.created_by_id, finance.family_id):
+        raise HttpError(403, "Acesso negado")
 
-    return uploaded_files
+    prefix = uploads.attachment_prefix(finance.id)
+    keys = [upload.key for upload in payload.uploads]
+    if any(not key.startswith(prefix) or ".." in key.split("/") for key in keys):
+        raise HttpError(400, "Chave de upload inválida")
+
+    max_size = get_limits("attachments")["max_file_size"]
+    # Confirmar de novo o mesmo upload não duplica o anexo
+    existing = {attachment.file.name: attachment for attachment in finance.attachments.filter(file__in=keys)}
+    attachments = []
+    for upload in payload.uploads:
+        attachment = existing.get(upload.key)
+        if attachment is None:
+            stat = uploads.stat_object(upload.key)
+            if stat is None:
+                raise HttpError(404, f"Arquivo não encontrado no storage: {upload.name}")
+            if stat["size"] > max_size:
+                StorageDeletion.schedule([upload.key])
+                raise HttpError(413, f"O arquivo {upload.name} passa do limite de {max_size // MB} MB.")
+            attachment = FinanceAttachment.objects.create(
+                finance=finance,
+                file=upload.key,
+                name=upload.name,
+                content_type=stat["content_type"] or "application/octet-stream",
+                size=stat["size"],
+                created_by=request.auth,
+            )
+            existing[upload.key] = attachment
+        attachments.append(attachment)
+    return uploads.set_file_urls(attachments)
 
 
 @router.delete("/attachments/{attachment_id}", response={204: None})
 def delete_finance_attachment(request, attachment_id: int):
     attachment = get_object_or_404(FinanceAttachment, id=attachment_id)
     finance = attachment.finance
-    family = get_user_family(request)
-    if finance.created_by != request.auth and finance.family != family:
+    if not get_scope(request).can_access(finance.created_by_id, finance.family_id):
         raise HttpError(403, "Acesso negado")
 
     attachment.delete()
@@ -180,111 +538,130 @@ def delete_spending_limit(request):
 # ========= Metas =========
 
 @router.get("/goals", response=List[GoalSchema])
+@sync.conditional(sync.GOALS)
 def list_goals(request):
-    user = request.auth
-    family_member = FamilyMember.objects.filter(user=user).select_related("family").first()
+    return render_json(rows.goal_rows(visible_goals(get_scope(request))))
+
+
+@router.get("/goals/changes", response=GoalChangesSchema)
+def get_goal_changes(request, since: Optional[str] = None):
+    """Metas alteradas e removidas desde o token ``since`` (ver /finances/changes)."""
+    scope = get_scope(request)
+    return sync.changes(sync.GOALS, scope, since, visible_goals(scope), rows.goal_rows)
 
-    if family_member:
-        family_users = FamilyMember.objects.filter(family=family_member.family).values_list("user", flat=True)
-        goals = Goal.objects.filter(user__in=family_users).prefetch_related("records")
-    else:
-        goals = Goal.objects.filter(user=user).prefetch_related("records")
 
-    return goals
+def goal_summary(goal_id):
+    """Resposta de uma meta (mesmo formato da listagem)."""
+    return rows.goal_rows(Goal.objects.filter(pk=goal_id))[0]
 
 
 @router.post("/goals", response=GoalSchema)
 def create_goal(request, payload: CreateGoalSchema):
-    family = get_user_family(request)
-    goal = Goal.objects.create(
-        user=request.auth,
-        title=payload.title,
-        target_value=payload.target_value,
-        deadline=payload.deadline,
-        family=family,
-    )
-    return goal
+    with transaction.atomic():
+        goal = Goal.objects.create(
+            user=request.auth,
+            title=payload.title,
+            target_value=payload.target_value,
+            deadline=payload.deadline,
+            family_id=get_scope(request).family_id,
+        )
+        sync.record_changed([goal])
+    return goal_summary(goal.pk)
 
 
 @router.get("/goals/{goal_id}", response=GoalSchema)
 def get_goal(request, goal_id: int):
-    goal = get_object_or_404(Goal.objects.prefetch_related("records"), id=goal_id)
-    family = get_user_family(request)
-    if goal.user != request.auth and goal.family != family:
+    goal = get_object_or_404(Goal.objects.only("user_id", "family_id"), id=goal_id)
+    if not get_scope(request).can_access(goal.user_id, goal.family_id):
         raise HttpError(403, "Acesso negado")
-    return goal
+    return goal_summary(goal.pk)
+
+
+@router.get("/goals/{goal_id}/records", response=List[GoalRecordSchema])
+@paginate_rows(rows.goal_record_rows, ordering=("-created_at", "-id"))
+def list_goal_records(request, goal_id: int):
+    """Histórico de registros da meta, dos mais recentes para os mais antigos."""
+    goal = get_object_or_404(Goal.objects.only("user_id", "family_id"), id=goal_id)
+    if not get_scope(request).can_access(goal.user_id, goal.family_id):
+        raise HttpError(403, "Acesso negado")
+    return GoalRecord.objects.filter(goal_id=goal.pk)
 
 
 @router.put("/goals/{goal_id}", response=GoalSchema)
 def update_goal(request, goal_id: int, payload: CreateGoalSchema):
     goal = get_object_or_404(Goal, id=goal_id)
-    family = get_user_family(request)
-    if goal.user != request.auth and goal.family != family:
+    if not get_scope(request).can_access(goal.user_id, goal.family_id):
         raise HttpError(403, "Acesso negado")
 
     goal.title = payload.title
     goal.target_value = payload.target_value
     goal.deadline = payload.deadline
-    goal.save()
-    return goal
+    with transaction.atomic():
+        # Sem current_value: o saldo é mantido pelos registros (GoalRecord.save)
+        goal.save(update_fields=["title", "target_value", "deadline", "updated_at"])
+        sync.record_changed([goal])
+    return goal_summary(goal.pk)
 
 
 @router.delete("/goals/{goal_id}", response={204: None})
 def delete_goal(request, goal_id: int):
     goal = get_object_or_404(Goal, id=goal_id)
-    family = get_user_family(request)
-    if goal.user != request.auth and goal.family != family:
+    if not get_scope(request).can_access(goal.user_id, goal.family_id):
         raise HttpError(403, "Acesso negado")
 
-    goal.delete()
+    with transaction.atomic():
+        sync.record_deleted([goal])
+        goal.delete()
     return 204, None
 
 
 @router.post("/goals/{goal_id}/records", response=GoalSchema)
 def add_goal_record(request, goal_id: int, payload: AddGoalRecordSchema):
     goal = get_object_or_404(Goal, id=goal_id)
-    family = get_user_family(request)
-    if goal.user != request.auth and goal.family != family:
+    if not get_scope(request).can_access(goal.user_id, goal.family_id):
         raise HttpError(403, "Acesso negado")
 
     value = Decimal(str(payload.value))
     record_title = payload.title or f"{payload.type} em {goal.title}"
 
-    GoalRecord.objects.create(
-        goal=goal,
-        title=record_title,
-        value=value,
-        type=payload.type,
-    )
-
-    goal.refresh_from_db()
-    return goal
+    with transaction.atomic():
+        GoalRecord.objects.create(
+            goal=goal,
+            title=record_title,
+            value=value,
+            type=payload.type,
+        )
+        sync.record_changed([goal])
+    return goal_summary(goal.pk)
 
 
 # ========= Foto de perfil =========
 
 @router.post("/user/photo", response=UploadProfilePhotoSchema)
+@decorate_view(limit_uploads("photo"))
 def upload_profile_photo(request, file: UploadedFile = File(...)):
     user = request.auth
     if not user:
         raise HttpError(401, "Usuário não autenticado")
 
     try:
-        # Usa o storage público
-        storage = PublicMediaStorage()
+        photos.validate_photo(file)
+    except photos.InvalidPhotoError as e:
+        raise HttpError(400, str(e))
 
-        # caminho relativo dentro do bucket (sem duplicar o prefixo)
-        file_path = f"{user.id}/{file.name}"
-
-        # salva no bucket na pasta 'profile_photos'
-        saved_path = storage.save(file_path, file)
+    try:
+        # Salva o original na pasta 'profile_photos'; as variantes são geradas em segundo plano
+        saved_path = photos.save_original(user, file)
 
         # gera URL pública permanente (funciona no MinIO local)
-        file_url = f"{settings.AWS_S3_ENDPOINT_URL.replace('http://', '').replace('https://', '')}/{settings.AWS_STORAGE_BUCKET_NAME}/{storage.location}/{saved_path}"
-        file_url = f"http://{file_url}"
+        file_url = photos.public_url(PublicMediaStorage(), saved_path)
 
-        user.image = file_url
-        user.save(update_fields=["image"])
+        # O usuário da requisição pode vir do cache de autenticação; a foto atual vem do banco
+        current = User.objects.only("image", "image_variants").get(pk=user.pk)
+        with transaction.atomic():
+            User.objects.filter(pk=user.pk).update(image=file_url, image_variants=None)
+            StorageDeletion.schedule(photos.stored_names(current), storage="public")
+            photos.schedule_processing(user.pk, saved_path)
 
         return {"photo_url": file_url}
 
@@ -294,10 +671,25 @@ def upload_profile_photo(request, file: UploadedFile = File(...)):
 
 # ========= Família =========
 
+def lock_membership(user_id, family_id=None):
+    """
+    Trava o usuário até o fim da transação e recusa uma segunda família: o
+    escopo (get_scope) e os registros (assign_family) consideram uma só.
+    """
+    User.objects.select_for_update().filter(pk=user_id).first()
+    if FamilyMember.objects.filter(user_id=user_id).exclude(family_id=family_id).exists():
+        raise HttpError(400, "Você já pertence a uma família. Saia dela antes de entrar em outra.")
+
+
 @router.post("/family", response=FamilySchema)
 def create_family(request, payload: CreateFamilySchema):
-    family = Family.objects.create(name=payload.name, created_by=request.auth)
-    FamilyMember.objects.create(family=family, user=request.auth)
+    with transaction.atomic():
+        lock_membership(request.auth.id)
+        family = Family.objects.create(name=payload.name, created_by=request.auth)
+        FamilyMember.objects.create(family=family, user=request.auth)
+        assign_family(request.auth.id, family.id)
+        events.publish_members([family.id], [request.auth.id])
+    invalidate_scopes([request.auth.id])
     return family
 
 
@@ -313,21 +705,29 @@ def join_family(request, payload: JoinFamilySchema):
     except Family.DoesNotExist:
         raise HttpError(404, "Código de família inválido")
 
-    FamilyMember.objects.get_or_create(family=family, user=request.auth)
+    with transaction.atomic():
+        lock_membership(request.auth.id, family.id)
+        FamilyMember.objects.get_or_create(family=family, user=request.auth)
+        assign_family(request.auth.id, family.id)
+        events.publish_members([family.id], [request.auth.id])
+    invalidate_scopes(family_member_ids(family.id))
     return family
 
 
-@router.get("/family/users", response=List[UserSchema])
-def list_family_users(request):
-    family = get_user_family(request)
-    if not family:
+@router.get("/family/users", response=List[UserSchema], auth=async_auth)
+async def list_family_users(request):
+    scope = await aget_scope(request)
+    if not scope.family_id:
         return []
 
-    users = []
-    for member in family.members.select_related("user"):
-        user = member.user
-        user.image = get_user_image_url(user)
-        users.append(user)
+    members = FamilyMember.objects.filter(family_id=scope.family_id).select_related("user")
+    users = [member.user async for member in members]
+
+    def sign_images():
+        for user in users:
+            user.image = get_user_image_url(user)
+
+    await uploads.run_storage_io(sign_images)
     return users
 
 
@@ -338,15 +738,23 @@ def leave_family(request):
         raise HttpError(404, "Você não pertence a nenhuma família.")
 
     family = membership.family
-    if family.created_by == request.auth:
-        members_count = FamilyMember.objects.filter(family=family).count()
-        if members_count > 1:
+    member_ids = family_member_ids(family.id)
+    if family.created_by_id == request.auth.id:
+        if len(member_ids) > 1:
             raise HttpError(400, "O criador não pode sair enquanto houver outros membros.")
         else:
-            family.delete()
+            with transaction.atomic():
+                assign_family(request.auth.id, None)
+                events.publish_members([family.id], [request.auth.id])
+                family.delete()
+            invalidate_scopes(member_ids)
             return 204, None
 
-    membership.delete()
+    with transaction.atomic():
+        membership.delete()
+        assign_family(request.auth.id, None)
+        events.publish_members([family.id], [request.auth.id])
+    invalidate_scopes(member_ids)
     return 204, None
 
 
@@ -367,28 +775,75 @@ def remove_family_member(request, user_id: str):
     if not member_to_remove:
         raise HttpError(404, "Usuário não encontrado na família.")
 
-    member_to_remove.delete()
+    member_ids = family_member_ids(family.id)
+    with transaction.atomic():
+        member_to_remove.delete()
+        assign_family(user_id, None)
+        events.publish_members([family.id], [user_id])
+    invalidate_scopes(member_ids)
     return 204, None
 
 
+# ========= Eventos (SSE) =========
+
+@router.get("/events", auth=async_auth, include_in_schema=False)
+async def stream_events(request):
+    """
+    Stream Server-Sent Events com avisos de alterações no escopo do usuário
+    (finanças, metas e membros da família). Os dados em si continuam vindo de
+    /finances/changes e /goals/changes. Só disponível quando servido por ASGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        raise HttpError(501, "Eventos em tempo real exigem o servidor ASGI.")
+
+    response = StreamingHttpResponse(events.EventStream(request.auth.id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Sem buffer em proxies (nginx), para cada evento sair na hora
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # ========= Excluir conta =========
 
 @router.delete("/user/delete", response={204: None})
 def delete_user_account(request):
     user = request.auth
+    affected_ids = {user.id, *get_scope(request).user_ids}
+    for family_id in Family.objects.filter(created_by=user).values_list("id", flat=True):
+        affected_ids.update(family_member_ids(family_id))
 
-    # Deleta registros relacionados
-    Finance.objects.filter(created_by=user).delete()
-    SpendingLimit.objects.filter(user=user).delete()
-    Goal.objects.filter(user=user).delete()
-    FamilyMember.objects.filter(user=user).delete()
-    Family.objects.filter(created_by=user).delete()
-
-    # Por segurança, deleta sessões e contas externas
     from .models import Session, Account
-    Session.objects.filter(user=user).delete()
-    Account.objects.filter(user=user).delete()
-
-    # Finalmente, deleta o usuário
-    user.delete()
+    sessions = Session.objects.filter(user=user)
+    tokens = list(sessions.values_list("token", flat=True))
+
+    # Os arquivos (anexos e foto) vão para o outbox na mesma transação
+    with transaction.atomic():
+        # Deleta registros relacionados (os totais do próprio usuário caem em cascata);
+        # as lápides avisam os outros membros da família na sincronização
+        sync.record_deleted(Finance.objects.filter(created_by=user))
+        Finance.objects.filter(created_by=user).delete()
+        SpendingLimit.objects.filter(user=user).delete()
+        sync.record_deleted(Goal.objects.filter(user=user))
+        Goal.objects.filter(user=user).delete()
+        family_ids = {
+            *FamilyMember.objects.filter(user=user).values_list("family_id", flat=True),
+            *Family.objects.filter(created_by=user).values_list("id", flat=True),
+        }
+        events.publish_members(family_ids, [])
+        FamilyMember.objects.filter(user=user).delete()
+        # Finanças e metas dos outros membros ficam sem família
+        for member_id in FamilyMember.objects.filter(family__created_by=user).values_list("user_id", flat=True):
+            assign_family(member_id, None)
+        Family.objects.filter(created_by=user).delete()
+
+        # Por segurança, deleta sessões e contas externas
+        sessions.delete()
+        Account.objects.filter(user=user).delete()
+        StorageDeletion.schedule(photos.stored_names(User.objects.get(pk=user.pk)), storage="public")
+
+        # Finalmente, deleta o usuário
+        user.delete()
+
+    invalidate_tokens(tokens)
+    invalidate_scopes(affected_ids)
     return 204, None
@@ -0,0 +1,104 @@
+"""
+Limpeza do bucket: remoção dos objetos agendados no outbox ``StorageDeletion``
+e busca de objetos órfãos (sem anexo no banco) em ``finances/``.
+
+As remoções usam ``DeleteObjects`` (até 1000 chaves por chamada) em vez de um
+DELETE por arquivo.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import AttachmentBlob, FinanceAttachment, StorageDeletion
+from .storage_backend import PublicMediaStorage
+from .uploads import ATTACHMENTS_LOCATION
+
+DELETE_OBJECTS_LIMIT = 1000
+
+
+def get_storage(alias):
+    return PublicMediaStorage() if alias == "public" else default_storage
+
+
+def referenced_names(names):
+    """Nomes que ainda pertencem a algum anexo ou blob (não podem ser apagados)."""
+    names = list(names)
+    return set(FinanceAttachment.objects.filter(file__in=names).values_list("file", flat=True)) | set(
+        AttachmentBlob.objects.filter(file__in=names).values_list("file", flat=True)
+    )
+
+
+def delete_objects(storage, names):
+    """Apaga objetos em lotes de até 1000; retorna {nome: erro} dos que falharam."""
+    client = storage.connection.meta.client
+    errors = {}
+    for start in range(0, len(names), DELETE_OBJECTS_LIMIT):
+        keys = {storage._normalize_name(name): name for name in names[start : start + DELETE_OBJECTS_LIMIT]}
+        response = client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        for error in response.get("Errors", []):
+            errors[keys.get(error["Key"], error["Key"])] = f"{error.get('Code')}: {error.get('Message')}"
+    return errors
+
+
+def process_deletions(batch_size=DELETE_OBJECTS_LIMIT):
+    """Processa o outbox uma vez, do mais antigo ao mais novo. Retorna (apagados, falhas)."""
+    deleted = failed = 0
+    last_id = 0
+    while True:
+        batch = list(StorageDeletion.objects.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        by_storage = defaultdict(list)
+        for entry in batch:
+            by_storage[entry.storage].append(entry)
+
+        for alias, entries in by_storage.items():
+            # Um nome pode ter voltado a ser usado (ex.: anexos antigos com o mesmo arquivo)
+            live = referenced_names(entry.name for entry in entries) if alias == "default" else set()
+            names = list({entry.name for entry in entries if entry.name not in live})
+            try:
+                errors = delete_objects(get_storage(alias), names)
+            except Exception as exc:
+                errors = dict.fromkeys(names, str(exc))
+
+            failures = [entry for entry in entries if entry.name in errors]
+            for entry in failures:
+                entry.attempts += 1
+                entry.last_error = errors[entry.name][:1000]
+            StorageDeletion.objects.bulk_update(failures, ["attempts", "last_error"])
+            StorageDeletion.objects.filter(id__in=[e.id for e in entries if e.name not in errors]).delete()
+            deleted += len(names) - len(errors)
+            failed += len(failures)
+    return deleted, failed
+
+
+def find_orphans(storage=None, older_than=timedelta(hours=24)):
+    """
+    Gera, página a página, os objetos de ``finances/`` sem anexo, blob ou remoção
+    agendada. Objetos recentes são ignorados (uploads diretos ainda não confirmados).
+    """
+    storage = storage or default_storage
+    cutoff = timezone.now() - older_than
+    location = storage._normalize_name("")
+    prefix = storage._normalize_name(ATTACHMENTS_LOCATION) + "/"
+
+    paginator = storage.connection.meta.client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=storage.bucket_name, Prefix=prefix):
+        names = [
+            item["Key"][len(location) :].lstrip("/")
+            for item in page.get("Contents", [])
+            if item["LastModified"] < cutoff
+        ]
+        if not names:
+            continue
+        known = referenced_names(names) | set(
+            StorageDeletion.objects.filter(storage="default", name__in=names).values_list("name", flat=True)
+        )
+        yield [name for name in names if name not in known]
@@ -0,0 +1,247 @@
+"""
+Eventos de alteração enviados aos membros da família por Server-Sent Events.
+
+Cada escopo tem um canal ("family:<id>" ou, sem família, "user:<id>"). As
+alterações registradas em ``sync`` publicam um evento curto no canal do escopo
+(tipo, revisão e ids); o cliente usa o evento como aviso e busca os dados em
+/finances/changes ou /goals/changes. Mudanças de membros publicam "members"
+no canal da família e no do usuário afetado.
+
+Com PostgreSQL o evento vai por ``NOTIFY`` dentro da transação da alteração
+(o banco só entrega no commit, e nada é entregue em rollback). Cada processo
+ASGI mantém uma conexão em ``LISTEN`` numa thread e repassa os eventos aos
+streams abertos nele, então uma alteração feita em qualquer worker chega a
+todos. Em outros bancos (testes), os eventos são entregues no próprio processo
+depois do commit.
+"""
+import asyncio
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import FamilyMember
+
+logger = logging.getLogger(__name__)
+
+# Canal do NOTIFY; o payload é "<canal do escopo> <json do evento>"
+NOTIFY_CHANNEL = "app_events"
+# Acima disso os ids são omitidos (o NOTIFY aceita até 8000 bytes)
+MAX_IDS = 100
+# Eventos pendentes por stream antes de pedir recarga completa ao cliente
+QUEUE_SIZE = 100
+RESET = orjson.dumps({"type": "reset"}).decode()
+
+
+def scope_channel(family_id, user_id):
+    if family_id:
+        return f"family:{family_id}"
+    return f"user:{user_id}"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def _uses_notify():
+    return connection.vendor == "postgresql"
+
+
+def publish(channel, event):
+    """Publica um evento no canal; só é entregue se a transação atual for confirmada."""
+    data = orjson.dumps(event).decode()
+    if _uses_notify():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, f"{channel} {data}"])
+    else:
+        transaction.on_commit(lambda: broker.dispatch(channel, data))
+
+
+def publish_records(channel, kind, revision, changed=(), deleted=()):
+    """Evento de finanças ou metas alteradas/removidas (chamado por ``sync``)."""
+    event = {"type": kind, "revision": revision}
+    if len(changed) + len(deleted) <= MAX_IDS:
+        event.update(changed=list(changed), deleted=list(deleted))
+    publish(channel, event)
+
+
+def publish_members(family_ids, user_ids):
+    """Avisa famílias e usuários afetados por entrada ou saída de membros."""
+    channels = {scope_channel(family_id, None) for family_id in family_ids if family_id}
+    channels.update(user_channel(user_id) for user_id in user_ids)
+    for channel in sorted(channels):
+        publish(channel, {"type": "members"})
+
+
+class Subscription:
+    """Fila de eventos de um stream, consumida no loop que a criou."""
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.channels = frozenset()
+
+    def put(self, data):
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Cliente lento: descarta o acumulado e pede recarga completa
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Distribui os eventos recebidos aos streams abertos neste processo."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription, channels):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+            subscription.channels = frozenset(channels)
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+
+    def unsubscribe(self, subscription):
+        self.subscribe(subscription, ())
+
+    def dispatch(self, channel, data):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        self._deliver(subscriptions, data)
+
+    def dispatch_all(self, data):
+        with self._lock:
+            subscriptions = {s for group in self._subscriptions.values() for s in group}
+        self._deliver(subscriptions, data)
+
+    @staticmethod
+    def _deliver(subscriptions, data):
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, data)
+            except RuntimeError:
+                # Loop já encerrado; o stream será removido ao fechar
+                pass
+
+
+broker = Broker()
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """Inicia (uma vez por processo) a thread em ``LISTEN``; sem PostgreSQL, não faz nada."""
+    global _listener
+    if not _uses_notify():
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name="events-listener", daemon=True)
+            _listener.start()
+
+
+def _listen():
+    while True:
+        try:
+            conn = connection.Database.connect(**connection.get_connection_params())
+            try:
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Eventos podem ter se perdido enquanto a conexão estava fora
+                broker.dispatch_all(RESET)
+                for payload in _notifications(conn):
+                    channel, _, data = payload.partition(" ")
+                    broker.dispatch(channel, data)
+            finally:
+                conn.close()
+        except Exception:
+            logger.exception("Conexão de eventos (LISTEN) caiu; reconectando")
+            time.sleep(5)
+
+
+def _notifications(conn):
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    if is_psycopg3:
+        for notify in conn.notifies():
+            yield notify.payload
+    else:
+        while True:
+            select.select([conn], [], [], 60)
+            conn.poll()
+            while conn.notifies:
+                yield conn.notifies.pop(0).payload
+
+
+def _current_family_id(user_id):
+    # Direto do banco: o evento "members" pode chegar antes da invalidação do cache de escopos
+    return FamilyMember.objects.filter(user_id=user_id).values_list("family_id", flat=True).first()
+
+
+def _channels(user_id, family_id):
+    return {scope_channel(family_id, user_id), user_channel(user_id)}
+
+
+class EventStream:
+    """
+    Stream SSE de um usuário, acompanhando a família atual dele. O Django chama
+    ``close`` ao encerrar a resposta (inclusive quando o cliente desconecta),
+    o que remove a inscrição no broker.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.subscription = None
+
+    def __aiter__(self):
+        return self._messages()
+
+    def close(self):
+        if self.subscription is not None:
+            broker.unsubscribe(self.subscription)
+
+    async def _subscribe(self):
+        family_id = await sync_to_async(_current_family_id)(self.user_id)
+        broker.subscribe(self.subscription, _channels(self.user_id, family_id))
+
+    async def _messages(self):
+        start_listener()
+        heartbeat = getattr(settings, "EVENTS_HEARTBEAT", 15)
+        self.subscription = Subscription(maxsize=QUEUE_SIZE)
+        await self._subscribe()
+        try:
+            # Intervalo (ms) para o EventSource reconectar
+            yield "retry: 3000\n\n"
+            while True:
+                data = await self.subscription.get(heartbeat)
+                if data is None:
+                    # Comentário SSE: mantém a conexão aberta em proxies
+                    yield ": ping\n\n"
+                    continue
+                event_type = orjson.loads(data)["type"]
+                if event_type == "members":
+                    # Troca de canais antes de repassar: o cliente recarrega tudo ao receber o aviso
+                    await self._subscribe()
+                yield f"event: {event_type}\ndata: {data}\n\n"
+        finally:
+            self.close()
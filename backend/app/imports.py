@@ -0,0 +1,243 @@
+"""
+Importação de extratos bancários (CSV ou OFX).
+
+O arquivo é lido linha a linha, cada transação é validada com
+``CreateFinanceSchema`` e recebe uma impressão digital estável: reimportar o
+mesmo extrato (ou um extrato que se sobrepõe) não duplica finanças. As
+inserções são feitas com ``bulk_create`` em lotes, numa única transação.
+"""
+import csv
+import hashlib
+import io
+import re
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from pydantic import ValidationError
+
+from . import rollups, sync
+from .models import Finance
+from .schemas import CreateFinanceSchema
+from .types import FinanceStatus, FinanceType
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+DEFAULT_CATEGORY = "Importado"
+
+# Cabeçalhos aceitos no CSV (inclui os da exportação de /finances/export)
+CSV_COLUMNS = {
+    "title": "title",
+    "título": "title",
+    "titulo": "title",
+    "descrição": "title",
+    "descricao": "title",
+    "value": "value",
+    "valor": "value",
+    "valor (r$)": "value",
+    "category": "category",
+    "categoria": "category",
+    "type": "type",
+    "tipo": "type",
+    "status": "status",
+    "payment_date": "payment_date",
+    "pagamento": "payment_date",
+    "data": "payment_date",
+    "due_date": "due_date",
+    "vencimento": "due_date",
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _text_stream(file):
+    """Abre o arquivo como texto, detectando UTF-8 ou Windows-1252 pelo início."""
+    raw = file.file
+    raw.seek(0)
+    head = raw.read(64 * 1024)
+    raw.seek(0)
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+    return io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline="")
+
+
+# "1.234" ou "-1.234.567": ponto como separador de milhar, sem vírgula decimal
+THOUSANDS = re.compile(r"[+-]?\d{1,3}(\.\d{3})+")
+
+
+def parse_decimal(value):
+    """Valor como "1.234,56", "1.234" (milhar) ou "-1234.56" (ponto decimal)."""
+    value = (value or "").strip().replace("R$", "").replace(" ", "")
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    elif THOUSANDS.fullmatch(value):
+        value = value.replace(".", "")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {value!r}")
+
+
+def parse_date(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: {value!r}")
+
+
+def parse_csv(stream):
+    """Gera (linha, campos) para cada linha do CSV; aceita ',' ou ';' como separador."""
+    sample = stream.read(4096)
+    stream.seek(0)
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    reader = csv.reader(stream, delimiter=delimiter)
+
+    header = next(reader, None)
+    if not header:
+        raise ImportFormatError("Arquivo CSV vazio.")
+    columns = [CSV_COLUMNS.get(name.strip().lower()) for name in header]
+    if "title" not in columns or "value" not in columns:
+        raise ImportFormatError("O CSV precisa das colunas de título e valor.")
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        fields = {column: cell.strip() for column, cell in zip(columns, row) if column}
+        yield reader.line_num, None, fields
+
+
+OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)")
+
+
+def parse_ofx(stream):
+    """Gera (linha, fitid, campos) para cada <STMTTRN> do OFX (SGML ou XML)."""
+    transaction_data = None
+    start_line = 0
+    for line_no, line in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            value = value.strip()
+            if tag == "STMTTRN":
+                if not closing:
+                    transaction_data, start_line = {}, line_no
+                elif transaction_data is not None:
+                    yield start_line, transaction_data.get("FITID"), _ofx_fields(transaction_data)
+                    transaction_data = None
+            elif transaction_data is not None and not closing and value:
+                transaction_data[tag] = value
+
+
+def _ofx_fields(data):
+    posted = data.get("DTPOSTED", "")[:8]
+    return {
+        "title": data.get("MEMO") or data.get("NAME") or "Transação",
+        "value": data.get("TRNAMT", ""),
+        "payment_date": f"{posted[6:8]}/{posted[4:6]}/{posted[:4]}" if len(posted) == 8 else "",
+    }
+
+
+def build_finance(fields, category):
+    """Converte os campos de uma linha para o formato de CreateFinanceSchema."""
+    amount = parse_decimal(fields.get("value"))
+    finance_type = fields.get("type") or (FinanceType.EXPENSE if amount < 0 else FinanceType.INCOME)
+    payment_date = parse_date(fields.get("payment_date"))
+    status = fields.get("status") or (FinanceStatus.PAID if payment_date else FinanceStatus.PENDING)
+
+    return CreateFinanceSchema(
+        title=fields.get("title", "")[: Finance._meta.get_field("title").max_length],
+        value=abs(amount),
+        payment_date=payment_date,
+        due_date=parse_date(fields.get("due_date")),
+        category=(fields.get("category") or category)[: Finance._meta.get_field("category").max_length],
+        type=finance_type,
+        status=status,
+    )
+
+
+def fingerprint(fitid, finance, occurrence):
+    """Impressão digital estável: FITID do banco ou (data, valor, tipo, título, ocorrência)."""
+    if fitid:
+        raw = f"ofx:{fitid}"
+    else:
+        raw = "|".join(
+            str(part)
+            for part in (
+                finance.payment_date or finance.due_date,
+                f"{finance.value:.2f}",
+                finance.type.value,
+                finance.title,
+                occurrence,
+            )
+        )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def import_finances(user, family_id, file, file_format, category=DEFAULT_CATEGORY):
+    stream = _text_stream(file)
+    try:
+        return _import_entries(
+            user, family_id, parse_ofx(stream) if file_format == "ofx" else parse_csv(stream), category
+        )
+    finally:
+        # Devolve o arquivo ao Django sem fechá-lo
+        stream.detach()
+
+
+def _import_entries(user, family_id, entries, category):
+    result = {"created": 0, "duplicates": 0, "errors": []}
+    occurrences = Counter()
+
+    with transaction.atomic():
+        while True:
+            batch = list(islice(entries, BATCH_SIZE))
+            if not batch:
+                break
+
+            candidates = {}
+            for line, fitid, fields in batch:
+                try:
+                    data = build_finance(fields, category)
+                except (ValueError, ValidationError) as exc:
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"line": line, "message": str(exc).splitlines()[0]})
+                    continue
+
+                key = (data.payment_date or data.due_date, data.value, data.type, data.title)
+                occurrences[key] += 1
+                digest = fingerprint(fitid, data, occurrences[key])
+                if digest in candidates:
+                    result["duplicates"] += 1
+                else:
+                    candidates[digest] = data
+
+            existing = set(
+                Finance.objects.filter(created_by=user, import_fingerprint__in=candidates).values_list(
+                    "import_fingerprint", flat=True
+                )
+            )
+            new_finances = []
+            for digest, data in candidates.items():
+                if digest in existing:
+                    result["duplicates"] += 1
+                    continue
+                finance = Finance(**data.dict(), created_by=user, family_id=family_id, import_fingerprint=digest)
+                finance.apply_status_rules()
+                new_finances.append(finance)
+
+            Finance.objects.bulk_create(new_finances, batch_size=BATCH_SIZE)
+            rollups.record_created(new_finances)
+            sync.record_changed(new_finances)
+            result["created"] += len(new_finances)
+
+    return result
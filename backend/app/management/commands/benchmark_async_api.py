@@ -0,0 +1,120 @@
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from app import uploads
+from app.models import Finance, FinanceAttachment, Session, StorageDeletion, User
+from core.auth import token_cache
+
+BENCHMARK_PREFIX = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o detalhe de finança (com anexos) servido por WSGI (threads) e por ASGI (async), "
+        "simulando a latência do storage na assinatura das URLs. Usa dados temporários."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Total de requisições em cada modo.")
+        parser.add_argument("--workers", type=int, default=4, help="Threads do WSGI (como workers síncronos).")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requisições simultâneas no ASGI.")
+        parser.add_argument("--latency-ms", type=float, default=50, help="Latência simulada do storage.")
+        parser.add_argument("--attachments", type=int, default=5, help="Anexos da finança usada no teste.")
+
+    def handle(self, *args, **options):
+        user, token, finance = self._create_data(options["attachments"])
+        url = f"/api/finances/{finance.id}"
+        headers = {"Authorization": f"Bearer {token}"}
+        latency = options["latency_ms"] / 1000
+
+        def slow_signed_urls(names, storage=None):
+            # Uma ida ao storage por requisição (cache frio)
+            time.sleep(latency)
+            return {name: f"https://storage.local/{name}" for name in names}
+
+        try:
+            with mock.patch.object(uploads, "signed_urls", slow_signed_urls):
+                results = [
+                    ("WSGI", self._run_wsgi(url, headers, options["requests"], options["workers"])),
+                    ("ASGI", asyncio.run(self._run_asgi(url, headers, options["requests"], options["concurrency"]))),
+                ]
+        finally:
+            self._delete_data(user, token)
+
+        for mode, (elapsed, timings) in results:
+            timings.sort()
+            self.stdout.write(
+                f"{mode}: {len(timings) / elapsed:.1f} req/s "
+                f"(p50 {statistics.median(timings) * 1000:.0f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.0f} ms)"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark concluído."))
+
+    def _run_wsgi(self, url, headers, total, workers):
+        client = Client()
+
+        def request(_):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            timings = list(pool.map(request, range(total)))
+        return time.perf_counter() - start, timings
+
+    async def _run_asgi(self, url, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(request() for _ in range(total)))
+        return time.perf_counter() - start, list(timings)
+
+    def _create_data(self, attachments):
+        user_id = str(uuid.uuid4())
+        user = User.objects.create(id=user_id, name="Benchmark", email=f"{user_id}@benchmark.local")
+        token = uuid.uuid4().hex
+        Session.objects.create(
+            id=str(uuid.uuid4()), user=user, token=token, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        finance = Finance.objects.create(
+            title="Benchmark", value=Decimal("1"), category="Benchmark", type="Despesa", created_by=user
+        )
+        FinanceAttachment.objects.bulk_create(
+            FinanceAttachment(
+                finance=finance,
+                file=f"{BENCHMARK_PREFIX}/{user_id}/{i}.pdf",
+                name=f"{i}.pdf",
+                content_type="application/pdf",
+                size=1,
+                created_by=user,
+            )
+            for i in range(attachments)
+        )
+        return user, token, finance
+
+    def _delete_data(self, user, token):
+        token_cache.delete(token)
+        prefix = f"{BENCHMARK_PREFIX}/{user.pk}/"
+        user.delete()
+        # Os anexos apagados agendam a remoção de arquivos que nunca existiram no storage
+        StorageDeletion.objects.filter(name__startswith=prefix).delete()
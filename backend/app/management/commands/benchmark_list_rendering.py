@@ -0,0 +1,86 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from ninja.renderers import JSONRenderer
+
+from app import rows
+from app.models import Finance, Goal, GoalRecord, User
+from app.schemas import FinanceSchema, GoalSchema
+from core.renderers import renderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede linhas/s das listagens de finanças e metas: schema pydantic + json (caminho antigo) "
+        "contra .values_list() + orjson. Os dados são criados numa transação desfeita no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Quantidades de linhas.")
+
+    def handle(self, *args, **options):
+        for count in options["rows"]:
+            with transaction.atomic():
+                user = self._create_data(count)
+                finances = Finance.objects.filter(created_by=user).order_by("-payment_date", "created_at", "id")
+                goals = Goal.objects.filter(user=user)
+
+                self._report(
+                    "finanças",
+                    count,
+                    lambda: self._schema_json(FinanceSchema, finances.select_related("created_by")),
+                    lambda: renderer.render(None, rows.finance_rows(finances), response_status=200),
+                )
+                self._report(
+                    "metas",
+                    count,
+                    lambda: self._schema_json(GoalSchema, goals.annotate(records_count=Count("records"))),
+                    lambda: renderer.render(None, rows.goal_rows(goals), response_status=200),
+                )
+                transaction.set_rollback(True)
+
+    def _schema_json(self, schema, queryset):
+        # O que o ninja faz com a resposta: valida cada objeto, gera o dict e codifica com json
+        data = [schema.model_validate(obj).model_dump() for obj in queryset]
+        return JSONRenderer().render(None, data, response_status=200)
+
+    def _report(self, label, count, before, after):
+        results = []
+        for run in (before, after):
+            start = time.perf_counter()
+            run()
+            results.append(count / (time.perf_counter() - start))
+        self.stdout.write(
+            f"{label} ({count} linhas): antes {results[0]:,.0f} linhas/s, "
+            f"depois {results[1]:,.0f} linhas/s ({results[1] / results[0]:.1f}x)"
+        )
+
+    def _create_data(self, count):
+        user_id = str(uuid.uuid4())
+        user = User.objects.create(id=user_id, name="Benchmark", email=f"{user_id}@benchmark.local")
+        Finance.objects.bulk_create(
+            (
+                Finance(
+                    title=f"Conta {i}",
+                    value=Decimal(i % 1000) + Decimal("0.99"),
+                    category="Benchmark",
+                    type="Despesa",
+                    created_by=user,
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        goals = Goal.objects.bulk_create(
+            (Goal(user=user, title=f"Meta {i}", target_value=Decimal("1000")) for i in range(count)),
+            batch_size=5000,
+        )
+        GoalRecord.objects.bulk_create(
+            (GoalRecord(goal=goal, title="Depósito", value=Decimal("10"), type="Adicionar") for goal in goals),
+            batch_size=5000,
+        )
+        return user
@@ -0,0 +1,43 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app import sync
+from app.models import Finance
+from app.types import FinanceStatus
+
+
+class Command(BaseCommand):
+    help = "Marca como atrasadas as finanças pendentes com vencimento passado (agendar diariamente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        overdue = Finance.objects.filter(status=FinanceStatus.PENDING, due_date__lt=date.today())
+
+        updated = 0
+        while True:
+            # Lotes pequenos para não travar muitas linhas de uma vez
+            ids = list(overdue.order_by().values_list("id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            with transaction.atomic():
+                # Só as que continuam pendentes (travadas): as pagas no meio não mudam nem ganham revisão
+                pending = list(
+                    Finance.objects.select_for_update()
+                    .filter(id__in=ids, status=FinanceStatus.PENDING)
+                    .values_list("id", flat=True)
+                )
+                updated += Finance.objects.filter(id__in=pending).update(
+                    status=FinanceStatus.OVERDUE,
+                    updated_at=timezone.now(),
+                )
+                sync.record_changed(Finance.objects.filter(id__in=pending))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"{updated} finanças marcadas como atrasadas em {elapsed:.2f}s."))
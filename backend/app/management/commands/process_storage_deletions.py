@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import cleanup
+
+
+class Command(BaseCommand):
+    help = "Apaga do bucket os objetos agendados para remoção (agendar a cada poucos minutos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=cleanup.DELETE_OBJECTS_LIMIT)
+        parser.add_argument(
+            "--loop",
+            type=int,
+            metavar="SEGUNDOS",
+            help="Continua rodando, processando o outbox a cada N segundos.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            deleted, failed = cleanup.process_deletions(batch_size=options["batch_size"])
+            elapsed = time.monotonic() - started
+            message = f"{deleted} objetos apagados em {elapsed:.2f}s."
+            if failed:
+                self.stderr.write(f"{message} {failed} falharam e serão tentados de novo.")
+            else:
+                self.stdout.write(self.style.SUCCESS(message))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
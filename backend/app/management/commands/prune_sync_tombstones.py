@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app import sync
+
+
+class Command(BaseCommand):
+    help = "Remove lápides antigas da sincronização incremental (clientes mais antigos que isso recarregam tudo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Mantém as lápides dos últimos N dias.")
+
+    def handle(self, *args, **options):
+        removed = sync.prune_tombstones(timezone.now() - timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"{removed} lápides removidas."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcula a tabela de totais mensais a partir das finanças e confere o resultado."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Apenas compara a tabela com as finanças, sem recalcular.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            count = rollups.rebuild(batch_size=options["batch_size"])
+            self.stdout.write(f"{count} linhas de totais recalculadas.")
+
+        mismatches = rollups.verify()
+        if mismatches:
+            for key in mismatches[:20]:
+                self.stderr.write(f"Divergência em {key}")
+            raise CommandError(f"{len(mismatches)} totais divergentes das finanças.")
+
+        self.stdout.write(self.style.SUCCESS("Totais conferidos com as finanças."))
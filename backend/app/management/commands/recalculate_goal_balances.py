@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app import sync
+from app.models import Goal
+
+
+class Command(BaseCommand):
+    help = "Recalcula o saldo das metas somando todos os registros (reparo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("goal_ids", nargs="*", type=int, help="Metas a recalcular (padrão: todas).")
+
+    def handle(self, *args, **options):
+        goals = Goal.objects.all()
+        if options["goal_ids"]:
+            goals = goals.filter(pk__in=options["goal_ids"])
+
+        fixed = 0
+        for goal in goals.iterator():
+            previous = goal.current_value
+            if goal.recalculate_current_value() != previous:
+                sync.record_changed([goal])
+                fixed += 1
+                self.stdout.write(f"Meta {goal.pk}: {previous} -> {goal.current_value}")
+
+        self.stdout.write(self.style.SUCCESS(f"{fixed} saldos corrigidos."))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app import cleanup
+from app.models import StorageDeletion
+
+
+class Command(BaseCommand):
+    help = "Procura objetos em finances/ sem anexo correspondente no banco e, opcionalmente, agenda a remoção."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-hours",
+            type=float,
+            default=24,
+            help="Ignora objetos mais novos que isso (uploads ainda não confirmados).",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Agenda os órfãos no outbox de remoção (sem isso, apenas lista).",
+        )
+
+    def handle(self, *args, **options):
+        found = 0
+        for orphans in cleanup.find_orphans(older_than=timedelta(hours=options["older_than_hours"])):
+            found += len(orphans)
+            if options["schedule"]:
+                StorageDeletion.schedule(orphans)
+            else:
+                for name in orphans:
+                    self.stdout.write(name)
+
+        action = "agendados para remoção" if options["schedule"] else "encontrados"
+        self.stdout.write(self.style.SUCCESS(f"{found} objetos órfãos {action}."))
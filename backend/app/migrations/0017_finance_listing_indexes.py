@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_family_finance_family_goal_family_familymember'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_by', '-payment_date', 'created_at', 'id'], name='finances_owner_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_by', 'type', 'category'], name='finances_owner_type_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_by', 'status'], name='finances_owner_status_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def populate_totals(apps, schema_editor):
+    Finance = apps.get_model("app", "Finance")
+    FinanceMonthlyTotal = apps.get_model("app", "FinanceMonthlyTotal")
+
+    rows = (
+        Finance.objects.annotate(reference_date=Coalesce("payment_date", "due_date", output_field=DateField()))
+        .filter(reference_date__isnull=False)
+        .annotate(month=TruncMonth("reference_date", output_field=DateField()))
+        .order_by()
+        .values("created_by_id", "month", "type", "category")
+        .annotate(total=Sum("value"), count=Count("id"))
+    )
+    FinanceMonthlyTotal.objects.bulk_create(
+        (
+            FinanceMonthlyTotal(
+                user_id=row["created_by_id"],
+                month=row["month"],
+                type=row["type"],
+                category=row["category"],
+                total=row["total"],
+                count=row["count"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_finance_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceMonthlyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('Receita', 'Receita'), ('Despesa', 'Despesa'), ('Meta', 'Meta')], max_length=10)),
+                ('category', models.CharField(max_length=45)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_totals', to='app.user')),
+            ],
+            options={
+                'db_table': 'finance_monthly_totals',
+                'unique_together': {('user', 'month', 'type', 'category')},
+            },
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_financemonthlytotal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='token',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_session_token_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='finance',
+            name='family',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.family'),
+        ),
+        migrations.AlterField(
+            model_name='goal',
+            name='family',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.family'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['family', '-payment_date', 'created_at', 'id'], name='finances_family_page_idx'),
+        ),
+    ]
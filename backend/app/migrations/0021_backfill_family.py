@@ -0,0 +1,37 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_family(apps, schema_editor):
+    """Preenche a família das finanças e metas de cada membro, em lotes."""
+    FamilyMember = apps.get_model("app", "FamilyMember")
+    Finance = apps.get_model("app", "Finance")
+    Goal = apps.get_model("app", "Goal")
+
+    # Mesmo critério de get_scope: a primeira associação (menor id) de cada usuário
+    families = {}
+    for user_id, family_id in FamilyMember.objects.order_by("-id").values_list("user_id", "family_id"):
+        families[user_id] = family_id
+
+    for user_id, family_id in families.items():
+        for model, owner_field in ((Finance, "created_by_id"), (Goal, "user_id")):
+            pending = model.objects.filter(**{owner_field: user_id}, family_id__isnull=True)
+            while True:
+                ids = list(pending.values_list("id", flat=True)[:BATCH_SIZE])
+                if not ids:
+                    break
+                model.objects.filter(id__in=ids).update(family_id=family_id)
+
+
+class Migration(migrations.Migration):
+    # Cada lote é gravado separadamente para não segurar uma transação longa
+    atomic = False
+
+    dependencies = [
+        ('app', '0020_finance_family_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_family, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_backfill_family'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(condition=models.Q(('status', 'Pendente')), fields=['due_date'], name='finances_pending_due_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_finance_pending_due_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='finance',
+            name='finances_owner_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_by', 'status', 'due_date'], name='finances_owner_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['family', 'status', 'due_date'], name='finances_family_due_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_finance_due_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finance',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='finance',
+            constraint=models.UniqueConstraint(condition=models.Q(('import_fingerprint__isnull', False)), fields=('created_by', 'import_fingerprint'), name='finances_unique_import_fingerprint'),
+        ),
+    ]
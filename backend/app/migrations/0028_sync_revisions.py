@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_user_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(max_length=80, unique=True)),
+                ('revision', models.BigIntegerField(default=0)),
+                ('min_revision', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'sync_revisions',
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(max_length=80)),
+                ('object_id', models.BigIntegerField()),
+                ('revision', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'sync_tombstones',
+            },
+        ),
+        migrations.AddField(
+            model_name='finance',
+            name='revision',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='revision',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_by', 'revision'], name='finances_owner_revision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['family', 'revision'], name='finances_family_revision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['user', 'revision'], name='goals_owner_revision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['family', 'revision'], name='goals_family_revision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['stream', 'revision'], name='sync_tombstones_stream_idx'),
+        ),
+    ]
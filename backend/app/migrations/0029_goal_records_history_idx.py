@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0028_sync_revisions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goalrecord',
+            index=models.Index(fields=['goal', '-created_at', '-id'], name='goal_records_history_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser
+from django.utils import timezone
+from decimal import Decimal
 from .types import FinanceType, FinanceStatus
 import uuid
 
@@ -13,6 +19,8 @@ class User(AbstractBaseUser):
     email = models.EmailField(unique=True)
     email_verified = models.BooleanField(default=False)
     image = models.TextField(null=True, blank=True)
+    # URLs das variantes da foto de perfil: {"64": {"webp": ..., "jpeg": ...}, ...}
+    image_variants = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,7 +39,7 @@ class User(AbstractBaseUser):
 class Session(models.Model):
     id = models.CharField(primary_key=True, max_length=36)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    token = models.CharField(max_length=255)
+    token = models.CharField(max_length=255, db_index=True)
     expires_at = models.DateTimeField()
     ip_address = models.CharField(max_length=255, null=True)
     user_agent = models.CharField(max_length=255, null=True)
@@ -74,7 +82,8 @@ class Verification(models.Model):
 
 
 class Finance(models.Model):
-    family = models.ForeignKey("Family", on_delete=models.CASCADE, null=True, blank=True)
+    # Família do autor no momento; mantida em create/join/leave (ver app.api.assign_family)
+    family = models.ForeignKey("Family", on_delete=models.SET_NULL, null=True, blank=True)
     title = models.CharField(max_length=50)
     value = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateField(blank=True, null=True)
@@ -93,8 +102,13 @@ class Finance(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Identificador estável de linhas importadas de extratos (evita duplicar na reimportação)
+    import_fingerprint = models.CharField(max_length=64, null=True, blank=True)
+    # Revisão da última alteração no escopo (família ou usuário); ver app.sync
+    revision = models.BigIntegerField(default=0)
 
-    def save(self, *args, **kwargs):
+    def apply_status_rules(self):
+        """Ajusta status/data de pagamento; chamar antes de bulk_create (que não usa save)."""
         from datetime import date
         if self.status == FinanceStatus.PENDING:
             self.payment_date = None
@@ -104,11 +118,56 @@ class Finance(models.Model):
             and self.status not in [FinanceStatus.PAID, FinanceStatus.OVERDUE]
         ):
             self.status = FinanceStatus.OVERDUE
+
+    def save(self, *args, **kwargs):
+        self.apply_status_rules()
         super().save(*args, **kwargs)
 
     class Meta:
         db_table = "finances"
         ordering = ["-payment_date", "created_at"]
+        indexes = [
+            # Paginação por cursor da listagem (ver app.pagination.KeysetPagination)
+            models.Index(fields=["created_by", "-payment_date", "created_at", "id"], name="finances_owner_page_idx"),
+            models.Index(fields=["family", "-payment_date", "created_at", "id"], name="finances_family_page_idx"),
+            models.Index(fields=["created_by", "type", "category"], name="finances_owner_type_cat_idx"),
+            models.Index(fields=["created_by", "status", "due_date"], name="finances_owner_due_idx"),
+            models.Index(fields=["family", "status", "due_date"], name="finances_family_due_idx"),
+            # Sincronização incremental (?since=)
+            models.Index(fields=["created_by", "revision"], name="finances_owner_revision_idx"),
+            models.Index(fields=["family", "revision"], name="finances_family_revision_idx"),
+            # Só as pendentes podem vencer (ver comando mark_overdue_finances)
+            models.Index(
+                fields=["due_date"],
+                name="finances_pending_due_idx",
+                condition=Q(status=FinanceStatus.PENDING.value),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["created_by", "import_fingerprint"],
+                condition=Q(import_fingerprint__isnull=False),
+                name="finances_unique_import_fingerprint",
+            ),
+        ]
+
+
+class FinanceMonthlyTotal(models.Model):
+    """Totais mensais por usuário/tipo/categoria, mantidos incrementalmente (ver app.rollups)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finance_totals")
+    month = models.DateField()
+    type = models.CharField(
+        max_length=10,
+        choices=[(t.value, t.value) for t in FinanceType]
+    )
+    category = models.CharField(max_length=45)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "finance_monthly_totals"
+        unique_together = ("user", "month", "type", "category")
 
 
 class SpendingLimit(models.Model):
@@ -125,9 +184,40 @@ class SpendingLimit(models.Model):
         return f"Limite de {self.user.email}: {self.value or 'Sem limite'}"
 
 
+class AttachmentBlob(models.Model):
+    """Conteúdo de anexo guardado uma única vez no bucket, identificado pelo SHA-256."""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="finances/blobs", max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "attachment_blobs"
+
+    @classmethod
+    def release(cls, blob_id, count=1):
+        """Solta referências; sem nenhuma, apaga o registro e agenda a remoção do objeto."""
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=blob_id).first()
+            if blob is None:
+                return
+            blob.ref_count = max(blob.ref_count - count, 0)
+            if blob.ref_count:
+                blob.save(update_fields=["ref_count"])
+                return
+            StorageDeletion.schedule([blob.file.name])
+            blob.delete()
+
+
 class FinanceAttachment(models.Model):
     finance = models.ForeignKey(Finance, on_delete=models.CASCADE, related_name="attachments")
-    file = models.FileField(upload_to="finances")
+    # Anexos enviados pela API apontam para um blob compartilhado (file é o objeto do blob)
+    blob = models.ForeignKey(
+        AttachmentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="attachments"
+    )
+    file = models.FileField(upload_to="finances", max_length=255)
     name = models.CharField(max_length=255, null=True, blank=True)
     content_type = models.CharField(max_length=255, null=True, blank=True)
     size = models.IntegerField(null=True, blank=True)
@@ -138,8 +228,40 @@ class FinanceAttachment(models.Model):
         db_table = "finance_attachments"
 
 
+@receiver(post_delete, sender=FinanceAttachment)
+def release_attachment_storage(sender, instance, **kwargs):
+    # Também roda nas exclusões em cascata (finança, conta)
+    if instance.blob_id:
+        AttachmentBlob.release(instance.blob_id)
+    elif instance.file.name:
+        StorageDeletion.schedule([instance.file.name])
+
+
+class StorageDeletion(models.Model):
+    """
+    Outbox de objetos do bucket a apagar. É gravado na mesma transação que remove
+    o registro dono do arquivo; o comando ``process_storage_deletions`` apaga os
+    objetos em lote.
+    """
+
+    STORAGE_CHOICES = [("default", "Anexos"), ("public", "Público")]
+
+    storage = models.CharField(max_length=20, choices=STORAGE_CHOICES, default="default")
+    name = models.CharField(max_length=255)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "storage_deletions"
+
+    @classmethod
+    def schedule(cls, names, storage="default"):
+        cls.objects.bulk_create([cls(storage=storage, name=name) for name in names if name])
+
+
 class Goal(models.Model):
-    family = models.ForeignKey("Family", on_delete=models.CASCADE, null=True, blank=True)
+    family = models.ForeignKey("Family", on_delete=models.SET_NULL, null=True, blank=True)
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="goals")
     title = models.CharField(max_length=100)
@@ -148,10 +270,16 @@ class Goal(models.Model):
     deadline = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Revisão da última alteração no escopo (família ou usuário); ver app.sync
+    revision = models.BigIntegerField(default=0)
 
     class Meta:
         db_table = "goals"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "revision"], name="goals_owner_revision_idx"),
+            models.Index(fields=["family", "revision"], name="goals_family_revision_idx"),
+        ]
 
     @property
     def progress(self):
@@ -159,6 +287,18 @@ class Goal(models.Model):
             return 0.0
         return float(self.current_value) / float(self.target_value) * 100
 
+    def recalculate_current_value(self):
+        """Recalcula o saldo somando todos os registros (caminho de reparo, O(n))."""
+        with transaction.atomic():
+            Goal.objects.select_for_update().only("pk").get(pk=self.pk)
+            totals = self.records.aggregate(
+                added=Coalesce(Sum("value", filter=Q(type="Adicionar")), Decimal("0")),
+                removed=Coalesce(Sum("value", filter=Q(type="Retirar")), Decimal("0")),
+            )
+            self.current_value = totals["added"] - totals["removed"]
+            Goal.objects.filter(pk=self.pk).update(current_value=self.current_value, updated_at=timezone.now())
+        return self.current_value
+
 
 class GoalRecord(models.Model):
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name="records")
@@ -169,15 +309,28 @@ class GoalRecord(models.Model):
 
     class Meta:
         db_table = "goal_records"
+        # Histórico paginado por meta (mais recentes primeiro)
+        indexes = [models.Index(fields=["goal", "-created_at", "-id"], name="goal_records_history_idx")]
+
+    @property
+    def signed_value(self):
+        return Decimal(str(self.value)) if self.type == "Adicionar" else -Decimal(str(self.value))
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        total = sum(
-            record.value if record.type == "Adicionar" else -record.value
-            for record in self.goal.records.all()
-        )
-        self.goal.current_value = total
-        self.goal.save()
+        # Aplica só a diferença no saldo da meta, com a linha da meta travada,
+        # para que depósitos simultâneos não se sobrescrevam.
+        with transaction.atomic():
+            goal = Goal.objects.select_for_update().only("current_value").get(pk=self.goal_id)
+            delta = self.signed_value
+            if not self._state.adding:
+                delta -= GoalRecord.objects.get(pk=self.pk).signed_value
+            super().save(*args, **kwargs)
+            Goal.objects.filter(pk=self.goal_id).update(
+                current_value=F("current_value") + delta,
+                updated_at=timezone.now(),
+            )
+        if self._meta.get_field("goal").is_cached(self):
+            self.goal.current_value = goal.current_value + delta
 
 
 class Family(models.Model):
@@ -204,3 +357,29 @@ class FamilyMember(models.Model):
     class Meta:
         db_table = "family_members"
         unique_together = ("family", "user")
+
+
+class SyncRevision(models.Model):
+    """
+    Contador de revisões de um stream de sincronização: tipo + escopo
+    (ex.: "finances:family:3" ou "goals:user:<id>").
+    """
+    stream = models.CharField(max_length=80, unique=True)
+    revision = models.BigIntegerField(default=0)
+    # Lápides até esta revisão já foram removidas: clientes mais antigos recarregam tudo
+    min_revision = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "sync_revisions"
+
+
+class SyncTombstone(models.Model):
+    """Remoção (ou saída do escopo) de uma finança/meta, para a sincronização incremental."""
+    stream = models.CharField(max_length=80)
+    object_id = models.BigIntegerField()
+    revision = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "sync_tombstones"
+        indexes = [models.Index(fields=["stream", "revision"], name="sync_tombstones_stream_idx")]
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from functools import wraps
+from typing import Any, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, QuerySet
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import AsyncPaginationBase, paginate
+from ninja.utils import is_async_callable
+
+from core.renderers import render_json
+
+
+class KeysetPagination(AsyncPaginationBase):
+    """
+    Paginação por cursor (keyset).
+
+    Em vez de OFFSET, cada página continua a partir da última linha da página
+    anterior, então o custo de cada página é constante e usa os índices da
+    ordenação. O último campo da ordenação deve ser único (ex.: "id").
+
+    Com ``rows``, os itens da página são montados por ``rows(queryset)`` (ex.:
+    dicionários de ``.values_list()``) em vez de instâncias dos models.
+    """
+
+    class Input(Schema):
+        cursor: Optional[str] = None
+        limit: int = Field(100, ge=1, le=500)
+
+    class Output(Schema):
+        items: List[Any]
+        next_cursor: Optional[str] = None
+
+    def __init__(self, ordering=("-payment_date", "created_at", "id"), rows=None, **kwargs: Any) -> None:
+        self.ordering = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+        self.rows = rows or list
+        super().__init__(**kwargs)
+
+    def paginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        return self._page(self.rows(self._page_queryset(queryset, pagination)), pagination)
+
+    async def apaginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        if self.rows is list:
+            items = [item async for item in self._page_queryset(queryset, pagination)]
+        else:
+            items = await sync_to_async(self.rows)(self._page_queryset(queryset, pagination))
+        return self._page(items, pagination)
+
+    def _page_queryset(self, queryset, pagination):
+        queryset = queryset.order_by(*self._order_by())
+        if pagination.cursor:
+            values = self._decode_cursor(queryset.model, pagination.cursor)
+            queryset = queryset.filter(self._after(queryset.model, values))
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        return queryset[: pagination.limit + 1]
+
+    def _page(self, items, pagination):
+        next_cursor = None
+        if len(items) > pagination.limit:
+            items = items[: pagination.limit]
+            next_cursor = self._encode_cursor(items[-1])
+
+        return {"items": items, "next_cursor": next_cursor}
+
+    def _order_by(self):
+        # NULLs primeiro no DESC e por último no ASC, igual ao padrão do Postgres,
+        # para que os índices (campo DESC / campo ASC) atendam a ordenação.
+        return [
+            F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True)
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, model, values):
+        """Monta o filtro "linhas depois do cursor" para a ordenação configurada."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            nullable = model._meta.get_field(name).null
+            if value is None:
+                after = Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                after = Q(**{f"{name}__{lookup}": value})
+                if nullable and not descending:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+        return condition
+
+    def _encode_cursor(self, obj) -> str:
+        if isinstance(obj, dict):
+            values = [obj[name] for name, _ in self.ordering]
+        else:
+            values = [getattr(obj, name) for name, _ in self.ordering]
+        raw = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, model, cursor: str):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, ValidationError):
+            raise HttpError(400, "Cursor inválido")
+
+
+def paginate_rows(rows, page=None, **params):
+    """
+    Como ``@paginate(KeysetPagination)``, mas a página é montada por ``rows`` e
+    renderizada direto, sem validar cada item pelo schema de resposta (que
+    continua valendo para a documentação). Só para linhas já no formato de saída.
+
+    ``page(data, **kwargs)``, se informado, recebe a página pronta e os
+    parâmetros da operação e retorna a página a renderizar.
+    """
+
+    def finish(data, kwargs):
+        return render_json(page(data, **kwargs) if page else data)
+
+    def decorator(func):
+        view = paginate(KeysetPagination, rows=rows, **params)(func)
+
+        if is_async_callable(view):
+
+            @wraps(view)
+            async def trusted_view(request, **kwargs):
+                return finish(await view(request, **kwargs), kwargs)
+
+        else:
+
+            @wraps(view)
+            def trusted_view(request, **kwargs):
+                return finish(view(request, **kwargs), kwargs)
+
+        return trusted_view
+
+    return decorator
@@ -0,0 +1,147 @@
+"""
+Processamento das fotos de perfil.
+
+O upload só guarda o original; a decodificação, a rotação pela orientação EXIF
+e a geração das variantes quadradas (WebP e JPEG) rodam depois do commit, num
+pool de threads fora do ciclo da requisição. Ao terminar, ``User.image`` passa
+a ser a maior variante JPEG e ``User.image_variants`` traz a URL de cada tamanho.
+
+O original continua publicado enquanto a foto for a atual: é a URL devolvida
+pelo upload. Ele fica em ``image_variants["original"]`` e é removido junto com
+as variantes quando a foto é trocada (ver ``stored_names``).
+"""
+import io
+import logging
+import posixpath
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils.text import get_valid_filename
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import StorageDeletion, User
+from .storage_backend import PublicMediaStorage
+
+logger = logging.getLogger(__name__)
+
+PHOTO_SIZES = (64, 128, 256, 512)
+PHOTO_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+MAX_PHOTO_PIXELS = 40_000_000
+
+_executor = None
+
+
+class InvalidPhotoError(ValueError):
+    pass
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "PROFILE_PHOTO_WORKERS", 2), thread_name_prefix="profile-photo"
+        )
+    return _executor
+
+
+def public_url(storage, name):
+    """URL pública permanente do objeto (mesmo formato usado por ``upload_profile_photo``)."""
+    host = settings.AWS_S3_ENDPOINT_URL.replace("http://", "").replace("https://", "")
+    return f"http://{host}/{settings.AWS_STORAGE_BUCKET_NAME}/{storage.location}/{name}"
+
+
+def stored_name(image_url):
+    """Nome (no storage público) de uma URL gerada por ``public_url``."""
+    marker = f"/{settings.AWS_STORAGE_BUCKET_NAME}/{settings.AWS_PUBLIC_MEDIA_LOCATION}/"
+    if not image_url or marker not in image_url:
+        return None
+    return image_url.split(marker, 1)[1]
+
+
+def stored_names(user):
+    """Todos os objetos da foto atual do usuário (original ou variantes)."""
+    urls = [user.image]
+    for formats in (user.image_variants or {}).values():
+        urls.extend(formats.values())
+    return list(dict.fromkeys(name for name in map(stored_name, urls) if name))
+
+
+def validate_photo(file):
+    """Lê só o cabeçalho da imagem; rejeita o que não for uma imagem suportada."""
+    try:
+        with Image.open(file) as image:
+            if image.width * image.height > MAX_PHOTO_PIXELS:
+                raise InvalidPhotoError("Imagem grande demais.")
+            image.verify()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidPhotoError("Arquivo de imagem inválido.")
+    finally:
+        file.seek(0)
+
+
+def save_original(user, file):
+    """Guarda o original enviado e retorna o nome no storage público."""
+    name = get_valid_filename(posixpath.basename(file.name or "")) or "foto"
+    return PublicMediaStorage().save(f"{user.id}/{uuid.uuid4().hex[:12]}/{name}", file)
+
+
+def render_variants(data):
+    """Gera {tamanho: {formato: bytes}} a partir da imagem original."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (max(PHOTO_SIZES), max(PHOTO_SIZES)))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    variants = {}
+    for size in sorted(PHOTO_SIZES, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        variants[size] = {}
+        for key, (pil_format, _) in PHOTO_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, quality=82, optimize=pil_format == "JPEG")
+            variants[size][key] = buffer.getvalue()
+    return variants
+
+
+def process_profile_photo(user_id, original_name):
+    """Gera e publica as variantes; ignora o resultado se a foto foi trocada nesse meio-tempo."""
+    storage = PublicMediaStorage()
+    with storage.open(original_name) as original:
+        variants = render_variants(original.read())
+
+    base = posixpath.dirname(original_name)
+    urls, names = {}, []
+    for size, formats in variants.items():
+        urls[str(size)] = {}
+        for key, content in formats.items():
+            name = storage.save(f"{base}/{size}.{'jpg' if key == 'jpeg' else key}", ContentFile(content))
+            names.append(name)
+            urls[str(size)][key] = public_url(storage, name)
+    urls["original"] = {"source": public_url(storage, original_name)}
+
+    with transaction.atomic():
+        updated = User.objects.filter(id=user_id, image=urls["original"]["source"]).update(
+            image=urls[str(max(PHOTO_SIZES))]["jpeg"], image_variants=urls
+        )
+        if not updated:
+            # A foto foi trocada: o novo upload já agendou a remoção do original
+            StorageDeletion.schedule(names, storage="public")
+
+
+def _run(user_id, original_name):
+    # As threads do pool não passam pelos sinais de requisição que renovam as
+    # conexões: descarta as vencidas ou quebradas antes e depois de cada tarefa
+    close_old_connections()
+    try:
+        process_profile_photo(user_id, original_name)
+    except Exception:
+        logger.exception("Falha ao processar a foto de perfil %s", original_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_processing(user_id, original_name):
+    """Enfileira o processamento depois do commit da requisição."""
+    transaction.on_commit(lambda: _pool().submit(_run, user_id, original_name))
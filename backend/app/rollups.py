@@ -0,0 +1,156 @@
+"""
+Manutenção incremental da tabela de totais mensais (FinanceMonthlyTotal).
+
+Cada finança com data de referência (pagamento ou, se pendente, vencimento)
+contribui com seu valor para a linha (usuário, mês, tipo, categoria). As
+mutações em app.api chamam estas funções dentro da mesma transação que altera
+a finança; o comando ``rebuild_finance_totals`` recalcula tudo do zero.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import Finance, FinanceMonthlyTotal
+from .types import FinanceType
+
+
+def snapshot(finance):
+    """Retorna a chave e o valor com que a finança contribui nos totais (ou None)."""
+    reference_date = finance.payment_date or finance.due_date
+    if not reference_date:
+        return None
+    key = (finance.created_by_id, reference_date.replace(day=1), finance.type, finance.category)
+    return key, Decimal(str(finance.value)).quantize(Decimal("0.01"))
+
+
+def record_change(before, after):
+    """Aplica a diferença entre dois snapshots (None = finança inexistente)."""
+    record_changes([(before, after)])
+
+
+def record_changes(changes):
+    """Aplica várias diferenças (antes, depois) de uma vez, uma atualização por chave."""
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for before, after in changes:
+        if before:
+            deltas[before[0]][0] -= before[1]
+            deltas[before[0]][1] -= 1
+        if after:
+            deltas[after[0]][0] += after[1]
+            deltas[after[0]][1] += 1
+    _apply(deltas)
+
+
+def record_created(finances):
+    """Soma aos totais várias finanças novas de uma vez (ex.: após bulk_create)."""
+    record_changes((None, snapshot(finance)) for finance in finances)
+
+
+def remove_finances(queryset):
+    """Desconta dos totais as finanças do queryset (ex.: antes de um delete em cascata)."""
+    deltas = {
+        key: [-total, -count]
+        for key, total, count in _grouped(queryset)
+    }
+    _apply(deltas)
+
+
+def _apply(deltas):
+    with transaction.atomic():
+        for (user_id, month, type, category), (total, count) in sorted(deltas.items(), key=str):
+            if not total and not count:
+                continue
+            row, _ = FinanceMonthlyTotal.objects.get_or_create(
+                user_id=user_id, month=month, type=type, category=category
+            )
+            FinanceMonthlyTotal.objects.filter(pk=row.pk).update(
+                total=F("total") + total, count=F("count") + count
+            )
+
+
+def _grouped(queryset):
+    """Agrega as finanças no banco por (usuário, mês, tipo, categoria)."""
+    rows = (
+        queryset.annotate(reference_date=Coalesce("payment_date", "due_date", output_field=DateField()))
+        .filter(reference_date__isnull=False)
+        .annotate(month=TruncMonth("reference_date", output_field=DateField()))
+        .order_by()
+        .values("created_by_id", "month", "type", "category")
+        .annotate(total=Sum("value"), count=Count("id"))
+    )
+    for row in rows.iterator():
+        key = (row["created_by_id"], row["month"], row["type"], row["category"])
+        yield key, row["total"], row["count"]
+
+
+def rebuild(batch_size=1000):
+    """Recalcula a tabela inteira a partir das finanças. Retorna o número de linhas."""
+    with transaction.atomic():
+        FinanceMonthlyTotal.objects.all().delete()
+        rows = [
+            FinanceMonthlyTotal(user_id=user_id, month=month, type=type, category=category, total=total, count=count)
+            for (user_id, month, type, category), total, count in _grouped(Finance.objects.all())
+        ]
+        FinanceMonthlyTotal.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def verify():
+    """Compara a tabela com as finanças. Retorna a lista de chaves divergentes."""
+    expected = {key: (total, count) for key, total, count in _grouped(Finance.objects.all())}
+
+    stored = {}
+    for row in FinanceMonthlyTotal.objects.exclude(total=0, count=0).iterator():
+        stored[(row.user_id, row.month, row.type, row.category)] = (row.total, row.count)
+
+    return sorted(
+        (key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)),
+        key=str,
+    )
+
+
+def can_summarize(filters, period, group_by):
+    """Indica se o resumo pedido pode ser lido da tabela de totais (granularidade mensal)."""
+    date_from, date_to = filters.date_from, filters.date_to
+    return (
+        period == "month"
+        and filters.status is None
+        and filters.title is None
+        and filters.due_date is None
+        and "status" not in group_by
+        and (date_from is None or date_from.day == 1)
+        and (date_to is None or (date_to + timedelta(days=1)).day == 1)
+    )
+
+
+def summarize(user_ids, filters, dimensions):
+    """Lê os buckets do resumo mensal direto da tabela de totais: O(meses), não O(finanças)."""
+    totals = FinanceMonthlyTotal.objects.filter(user_id__in=user_ids)
+    if filters.date_from:
+        totals = totals.filter(month__gte=filters.date_from)
+    if filters.date_to:
+        totals = totals.filter(month__lte=filters.date_to)
+    if filters.type:
+        totals = totals.filter(type=filters.type)
+    if filters.category:
+        totals = totals.filter(category=filters.category)
+
+    fields = [name for name in dimensions if name == "category"]
+    aliases = {"created_by_id": F("user_id")} if "created_by_id" in dimensions else {}
+    zero = Value(Decimal("0"))
+    return list(
+        totals.order_by()
+        .values(*fields, period=F("month"), **aliases)
+        .annotate(
+            income=Coalesce(Sum("total", filter=Q(type=FinanceType.INCOME)), zero),
+            expense=Coalesce(Sum("total", filter=Q(type=FinanceType.EXPENSE)), zero),
+            goal=Coalesce(Sum("total", filter=Q(type=FinanceType.GOAL)), zero),
+            count=Sum("count"),
+        )
+        .filter(count__gt=0)
+        .order_by("period", *dimensions)
+    )
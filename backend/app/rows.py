@@ -0,0 +1,89 @@
+"""
+Linhas das listagens grandes montadas direto de ``.values_list()``.
+
+As listagens de finanças e metas não instanciam os models nem validam cada
+objeto pelo pydantic: as colunas vêm do banco já com os tipos da resposta e
+viram dicionários com as mesmas chaves (e na mesma ordem) dos schemas, que
+continuam valendo para a documentação e para os demais endpoints.
+
+Com ``user_refs``, o autor de cada linha vira só ``created_by_id`` e os
+usuários aparecem uma única vez no dicionário ``users`` da resposta.
+"""
+from django.db.models import Case, Count, FloatField, Value, When
+from django.db.models.functions import Cast
+
+from core.schemas import UserSchema
+
+from .schemas import FinanceSchema, GoalSchema
+
+USER_FIELDS = tuple(UserSchema.model_fields)
+FINANCE_FIELDS = tuple(FinanceSchema.model_fields)
+GOAL_FIELDS = tuple(GoalSchema.model_fields)
+
+
+def finance_rows(queryset):
+    """Finanças no formato de ``FinanceSchema`` (com o autor aninhado)."""
+    columns = [*FINANCE_FIELDS, *(f"created_by__{name}" for name in USER_FIELDS)]
+    split = len(FINANCE_FIELDS)
+    rows = []
+    for values in queryset.values_list(*columns):
+        row = dict(zip(FINANCE_FIELDS, values[:split]))
+        row["created_by"] = dict(zip(USER_FIELDS, values[split:]))
+        rows.append(row)
+    return rows
+
+
+def goal_rows(queryset):
+    """
+    Metas no formato de ``GoalSchema`` numa única consulta: o progresso e o
+    total de registros são calculados pelo banco, e o histórico não vem junto.
+    """
+    current, target = Cast("current_value", FloatField()), Cast("target_value", FloatField())
+    queryset = queryset.annotate(
+        # Mesmo cálculo de Goal.progress
+        progress=Case(When(target_value=0, then=Value(0.0)), default=current / target * 100),
+        records_count=Count("records"),
+    )
+    rows = []
+    for values in queryset.values_list(*GOAL_FIELDS):
+        row = dict(zip(GOAL_FIELDS, values))
+        row["target_value"], row["current_value"] = float(row["target_value"]), float(row["current_value"])
+        rows.append(row)
+    return rows
+
+
+def goal_record_rows(queryset):
+    """Registros de meta no formato de ``GoalRecordSchema``."""
+    return [
+        {"id": record_id, "title": title, "value": float(value), "type": record_type, "created_at": created_at}
+        for record_id, title, value, record_type, created_at in queryset.values_list(
+            "id", "title", "value", "type", "created_at"
+        )
+    ]
+
+
+def extract_users(rows):
+    """Troca ``created_by`` de cada linha por ``created_by_id``; retorna {id: usuário}."""
+    users = {}
+    for row in rows:
+        user = row.pop("created_by")
+        if user is None:
+            # Anexos de usuários removidos ficam sem autor
+            row["created_by_id"] = None
+            continue
+        users.setdefault(user["id"], user)
+        row["created_by_id"] = user["id"]
+    return users
+
+
+def finance_page(data, user_refs=False, **params):
+    """Página da listagem de finanças, com os autores deduplicados se pedido."""
+    if user_refs:
+        data["users"] = extract_users(data["items"])
+    return data
+
+
+def finance_detail_with_user_refs(data):
+    """Detalhe de finança (já serializado) com os autores da finança e dos anexos deduplicados."""
+    data["users"] = extract_users([data, *data["attachments"]])
+    return data
@@ -1,10 +1,11 @@
 from datetime import date, datetime
-from ninja import ModelSchema, Schema
-from typing import Optional, List
+from ninja import ModelSchema, Schema, FilterSchema, Field
+from typing import Annotated, Optional, List, Literal, Union
 from .models import Finance, SpendingLimit, FinanceAttachment
 from .types import FinanceType, FinanceStatus
 from core.schemas import UserSchema
 from pydantic import BaseModel
+from ninja.patch_dict import create_patch_schema
 
 
 class FinanceAttachmentSchema(ModelSchema):
@@ -18,6 +19,32 @@ class FinanceAttachmentSchema(ModelSchema):
         model_fields = ["id", "name", "content_type", "size", "uploaded_at"]
 
 
+class AttachmentUploadRequestSchema(Schema):
+    name: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field("application/octet-stream", max_length=255)
+
+
+class PresignAttachmentsSchema(Schema):
+    files: List[AttachmentUploadRequestSchema] = Field(..., min_length=1, max_length=20)
+
+
+class PresignedUploadSchema(Schema):
+    name: str
+    key: str
+    url: str
+    method: str = "PUT"
+    headers: dict
+
+
+class ConfirmedUploadSchema(Schema):
+    key: str
+    name: str = Field(..., min_length=1, max_length=255)
+
+
+class ConfirmAttachmentsSchema(Schema):
+    uploads: List[ConfirmedUploadSchema] = Field(..., min_length=1, max_length=20)
+
+
 class FinanceSchema(ModelSchema):
     id: int
     created_by: UserSchema
@@ -30,7 +57,7 @@ class FinanceSchema(ModelSchema):
 
     class Config:
         model = Finance
-        model_fields = "__all__"
+        model_exclude = ["import_fingerprint", "revision"]
 
 
 class DetailFinanceSchema(ModelSchema):
@@ -46,7 +73,7 @@ class DetailFinanceSchema(ModelSchema):
 
     class Config:
         model = Finance
-        model_fields = "__all__"
+        model_exclude = ["import_fingerprint", "revision"]
 
 
 class CreateFinanceSchema(Schema):
@@ -58,6 +85,97 @@ class CreateFinanceSchema(Schema):
     type: FinanceType = FinanceType.EXPENSE
     status: FinanceStatus = FinanceStatus.PENDING
 
+
+class FinanceBatchCreateSchema(Schema):
+    op: Literal["create"]
+    data: CreateFinanceSchema
+
+
+class FinanceBatchUpdateSchema(Schema):
+    op: Literal["update"]
+    id: int
+    data: create_patch_schema(CreateFinanceSchema)
+
+
+class FinanceBatchDeleteSchema(Schema):
+    op: Literal["delete"]
+    id: int
+
+
+class FinanceBatchSchema(Schema):
+    operations: List[
+        Annotated[
+            Union[FinanceBatchCreateSchema, FinanceBatchUpdateSchema, FinanceBatchDeleteSchema],
+            Field(discriminator="op"),
+        ]
+    ] = Field(..., min_length=1, max_length=500)
+
+
+class FinanceBatchResultSchema(Schema):
+    index: int
+    op: str
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+
+
+class FinanceChangesSchema(Schema):
+    # Token a enviar como ``since`` na próxima sincronização
+    revision: str
+    # True: o token não vale mais (ou há alterações demais) e a listagem deve ser recarregada
+    reset: bool = False
+    items: List[FinanceSchema] = []
+    deleted: List[int] = []
+
+
+class FinanceFilterSchema(FilterSchema):
+    date_from: Optional[date] = Field(None, q="payment_date__gte")
+    date_to: Optional[date] = Field(None, q="payment_date__lte")
+    type: Optional[FinanceType] = None
+    status: Optional[FinanceStatus] = None
+    category: Optional[str] = None
+    # Busca por trecho do título e vencimento exato (barra de busca)
+    title: Optional[str] = Field(None, q="title__icontains")
+    due_date: Optional[date] = None
+
+
+class FinanceSummaryFilterSchema(FinanceFilterSchema):
+    # No resumo o período considera a data de pagamento ou, se pendente, o vencimento
+    date_from: Optional[date] = Field(None, q="reference_date__gte")
+    date_to: Optional[date] = Field(None, q="reference_date__lte")
+
+
+class FinanceSummaryBucketSchema(Schema):
+    period: date
+    category: Optional[str] = None
+    status: Optional[FinanceStatus] = None
+    created_by_id: Optional[str] = None
+    income: float
+    expense: float
+    goal: float
+    count: int
+
+
+class FinanceImportErrorSchema(Schema):
+    line: int
+    message: str
+
+
+class FinanceImportResultSchema(Schema):
+    created: int
+    duplicates: int
+    errors: List[FinanceImportErrorSchema]
+
+
+class FinanceNotificationSchema(Schema):
+    id: int
+    title: str
+    due_date: date
+    status: FinanceStatus
+    days_left: int
+    kind: Literal["due-today", "due-tomorrow", "due-soon", "due-expired"]
+
+
 class SpendingLimitSchema(ModelSchema):
     id: int
     user: UserSchema
@@ -92,7 +210,15 @@ class GoalSchema(Schema):
     deadline: Optional[date]
     created_at: datetime
     updated_at: datetime
-    records: List[GoalRecordSchema]
+    # O histórico fica em /goals/{goal_id}/records (paginado)
+    records_count: int
+
+
+class GoalChangesSchema(Schema):
+    revision: str
+    reset: bool = False
+    items: List[GoalSchema] = []
+    deleted: List[int] = []
 
 
 class CreateGoalSchema(Schema):
@@ -0,0 +1,84 @@
+"""
+Escopo de acesso do usuário: ele próprio e, se houver, sua família.
+
+O escopo é resolvido uma vez por requisição. Entre requisições, ele só fica
+em cache se ``FAMILY_SCOPE_CACHE_ALIAS`` apontar para um cache do Django
+compartilhado entre os processos (ex.: Redis): o escopo decide o acesso aos
+dados, e um cache local (LocMem) não seria invalidado nos outros workers
+quando um membro sai ou é removido. Toda alteração de membros de família deve
+chamar ``invalidate_scopes`` com os usuários afetados.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import FamilyMember
+
+
+class FamilyScope:
+    def __init__(self, user_id, family_id=None, member_ids=()):
+        self.user_id = user_id
+        self.family_id = family_id
+        self.member_ids = tuple(member_ids)
+
+    @property
+    def user_ids(self):
+        """Usuários cujos dados fazem parte do escopo."""
+        return self.member_ids if self.family_id else (self.user_id,)
+
+    def can_access(self, owner_id, family_id=None):
+        """Indica se um registro (dono e família) pertence ao escopo."""
+        return owner_id in self.user_ids or (family_id is not None and family_id == self.family_id)
+
+
+def _cache_key(user_id):
+    return f"family_scope:{user_id}"
+
+
+def _shared_cache():
+    alias = getattr(settings, "FAMILY_SCOPE_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def get_scope(request):
+    """Retorna o escopo do usuário autenticado, resolvido no máximo uma vez por requisição."""
+    scope = getattr(request, "_family_scope", None)
+    if scope is None:
+        scope = resolve_scope(request.auth.id)
+        request._family_scope = scope
+    return scope
+
+
+async def aget_scope(request):
+    """Versão async de ``get_scope`` (cache e banco são consultados numa thread)."""
+    scope = getattr(request, "_family_scope", None)
+    if scope is None:
+        scope = await sync_to_async(get_scope)(request)
+    return scope
+
+
+def resolve_scope(user_id):
+    cache = _shared_cache()
+    cached = cache.get(_cache_key(user_id)) if cache else None
+    if cached is not None:
+        return FamilyScope(*cached)
+
+    family_id = FamilyMember.objects.filter(user_id=user_id).values_list("family_id", flat=True).first()
+    member_ids = ()
+    if family_id:
+        member_ids = tuple(FamilyMember.objects.filter(family_id=family_id).values_list("user_id", flat=True))
+
+    scope = FamilyScope(user_id, family_id, member_ids)
+    if cache:
+        cache.set(_cache_key(user_id), (user_id, family_id, member_ids), getattr(settings, "FAMILY_SCOPE_CACHE_TTL", 300))
+    return scope
+
+
+def family_member_ids(family_id):
+    return list(FamilyMember.objects.filter(family_id=family_id).values_list("user_id", flat=True))
+
+
+def invalidate_scopes(user_ids):
+    cache = _shared_cache()
+    if cache:
+        cache.delete_many([_cache_key(user_id) for user_id in user_ids])
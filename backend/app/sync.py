@@ -0,0 +1,186 @@
+"""
+Versões por escopo para GET condicional (ETag) e sincronização incremental.
+
+Finanças e metas de cada escopo (a família ou, sem família, o usuário) formam
+um stream com um contador de revisões. As mutações chamam ``record_changed`` e
+``record_deleted`` na mesma transação da alteração: a linha do contador fica
+travada até o commit, então as revisões de um stream são publicadas em ordem
+e "tudo com revisão > N" nunca pula uma alteração. Remoções (e linhas que saem
+do escopo) viram lápides em ``SyncTombstone``. Cada revisão também publica um
+evento no canal do escopo (ver ``events``).
+
+O token entregue ao cliente é "<revisão>.<digest>". O digest muda com o
+escopo e com os dados dos membros embutidos nas finanças (nome, foto...): um
+token de outro escopo, ou anterior às lápides já removidas, pede recarga total.
+"""
+import hashlib
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, QuerySet
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from ninja.utils import is_async_callable
+
+from . import events
+from .models import Finance, Goal, SyncRevision, SyncTombstone, User
+from .scope import get_scope
+
+FINANCES = "finances"
+GOALS = "goals"
+
+KINDS = {Finance: FINANCES, Goal: GOALS}
+# Dono de cada registro (define o escopo quando não há família)
+OWNER_FIELDS = {Finance: "created_by", Goal: "user"}
+
+
+def stream_key(kind, family_id, user_id):
+    return f"{kind}:{events.scope_channel(family_id, user_id)}"
+
+
+def _group_by_stream(objects):
+    if isinstance(objects, QuerySet):
+        objects = objects.only("id", "family", OWNER_FIELDS[objects.model])
+    groups = defaultdict(list)
+    for obj in objects:
+        model = type(obj)
+        owner_id = getattr(obj, f"{OWNER_FIELDS[model]}_id")
+        groups[stream_key(KINDS[model], obj.family_id, owner_id)].append(obj)
+    return groups
+
+
+def next_revision(stream):
+    """Incrementa o contador do stream; a linha fica travada até o fim da transação."""
+    with transaction.atomic():
+        if not SyncRevision.objects.filter(stream=stream).update(revision=F("revision") + 1):
+            SyncRevision.objects.get_or_create(stream=stream)
+            SyncRevision.objects.filter(stream=stream).update(revision=F("revision") + 1)
+        return SyncRevision.objects.values_list("revision", flat=True).get(stream=stream)
+
+
+def record_changed(objects):
+    """Marca finanças ou metas (instâncias ou queryset) como alteradas, com uma revisão por stream."""
+    with transaction.atomic():
+        for stream, items in _group_by_stream(objects).items():
+            revision = next_revision(stream)
+            ids = [obj.pk for obj in items]
+            type(items[0]).objects.filter(pk__in=ids).update(revision=revision)
+            for obj in items:
+                obj.revision = revision
+            kind, channel = stream.split(":", 1)
+            events.publish_records(channel, kind, revision, changed=ids)
+
+
+def record_deleted(objects):
+    """Gera as lápides de finanças ou metas removidas (chamar antes de saírem do escopo)."""
+    with transaction.atomic():
+        for stream, items in _group_by_stream(objects).items():
+            revision = next_revision(stream)
+            ids = [obj.pk for obj in items]
+            SyncTombstone.objects.bulk_create(
+                SyncTombstone(stream=stream, object_id=object_id, revision=revision) for object_id in ids
+            )
+            kind, channel = stream.split(":", 1)
+            events.publish_records(channel, kind, revision, deleted=ids)
+
+
+def _members(kind, scope):
+    # Só as finanças embutem os autores; as metas não dependem dos dados dos membros
+    if kind != FINANCES:
+        return ""
+    users = User.objects.filter(id__in=scope.user_ids).order_by("id")
+    return repr(list(users.values_list("id", "name", "email", "image", "image_variants")))
+
+
+def current(kind, scope):
+    """Retorna (revisão, menor revisão aceita em ``since``, token) do stream do escopo."""
+    stream = stream_key(kind, scope.family_id, scope.user_id)
+    state = SyncRevision.objects.filter(stream=stream).values_list("revision", "min_revision").first()
+    revision, min_revision = state or (0, 0)
+    digest = hashlib.sha256(f"{stream}|{_members(kind, scope)}".encode()).hexdigest()[:12]
+    return revision, min_revision, f"{revision}.{digest}"
+
+
+def _parse_token(since, token):
+    try:
+        revision, digest = since.split(".", 1)
+        revision = int(revision)
+    except (AttributeError, ValueError):
+        return None
+    return revision if digest == token.split(".", 1)[1] else None
+
+
+def changes(kind, scope, since, visible, rows, matching=None):
+    """
+    Alterações do stream desde o token ``since``: as linhas alteradas que ainda
+    atendem a ``matching`` (montadas por ``rows``) e os ids que o cliente deve
+    descartar. Com ``reset``, o cliente precisa recarregar a listagem inteira.
+    """
+    revision, min_revision, token = current(kind, scope)
+    since_revision = _parse_token(since, token)
+    reset = {"revision": token, "reset": True, "items": [], "deleted": []}
+    if since_revision is None or not min_revision <= since_revision <= revision:
+        return reset
+
+    changed = visible.filter(revision__gt=since_revision).order_by("revision", "id")
+    limit = getattr(settings, "SYNC_MAX_CHANGES", 1000)
+    changed_ids = list(changed.values_list("id", flat=True)[: limit + 1])
+    if len(changed_ids) > limit:
+        return reset
+
+    items = rows(matching(changed) if matching else changed)
+    stream = stream_key(kind, scope.family_id, scope.user_id)
+    deleted = set(
+        SyncTombstone.objects.filter(stream=stream, revision__gt=since_revision).values_list("object_id", flat=True)
+    )
+    # Alteradas que deixaram de atender aos filtros também saem da lista do cliente
+    deleted = (deleted | set(changed_ids)) - {item["id"] for item in items}
+    return {"revision": token, "reset": False, "items": items, "deleted": sorted(deleted)}
+
+
+def conditional(kind):
+    """
+    GET condicional para as listagens: ETag com o token do stream e 304
+    enquanto nada mudar. A revisão é lida antes dos dados, então o ETag nunca
+    é mais novo que a resposta (no pior caso, o cliente baixa de novo).
+    """
+
+    def etag(request):
+        return f'W/"{current(kind, get_scope(request))[2]}"'
+
+    def finish(tag, response):
+        response.headers.setdefault("ETag", tag)
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def decorator(func):
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view(request, **kwargs):
+                tag = await sync_to_async(etag)(request)
+                response = get_conditional_response(request, etag=tag) or await func(request, **kwargs)
+                return finish(tag, response)
+
+        else:
+
+            @wraps(func)
+            def view(request, **kwargs):
+                tag = etag(request)
+                response = get_conditional_response(request, etag=tag) or func(request, **kwargs)
+                return finish(tag, response)
+
+        return view
+
+    return decorator
+
+
+def prune_tombstones(before):
+    """Remove lápides antigas; tokens anteriores a elas passam a pedir recarga total."""
+    with transaction.atomic():
+        pruned = SyncTombstone.objects.filter(deleted_at__lt=before)
+        for stream, revision in pruned.order_by().values_list("stream").annotate(revision=Max("revision")):
+            SyncRevision.objects.filter(stream=stream, min_revision__lt=revision).update(min_revision=revision)
+        return pruned.delete()[0]
@@ -1,3 +1,1285 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import threading
+import time
+import unittest
+import uuid
+import zipfile
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
+from xml.etree import ElementTree
 
-# Create your tests here.
+import boto3
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from ninja.errors import HttpError
+from ninja.renderers import JSONRenderer
+from ninja.testing import TestAsyncClient, TestClient
+from PIL import Image
+from storages.backends.s3 import S3Storage
+
+from core.auth import AuthBearer, TokenCache, invalidate_tokens, token_cache
+from core.limits import RequestBodyLimit
+from core.renderers import renderer
+from . import cleanup, events, exports, imports, photos, rollups, rows, sync, uploads
+from .schemas import FinanceSchema, GoalSchema
+from .pagination import KeysetPagination
+from .scope import resolve_scope
+from .upload_handlers import BoundedUploadHandler, StreamedUploadedFile, get_limits
+from .api import router
+from .models import (
+    User, Session, Goal, GoalRecord, Finance, FinanceMonthlyTotal, Family, FamilyMember, AttachmentBlob,
+    StorageDeletion,
+)
+
+try:
+    import requests
+    from moto import mock_aws
+except ImportError:  # moto só é necessário para os testes de storage
+    mock_aws = None
+
+
+def create_user():
+    user_id = str(uuid.uuid4())
+    return User.objects.create(id=user_id, name="Teste", email=f"{user_id}@example.com")
+
+
+def auth_headers(user):
+    token = uuid.uuid4().hex
+    Session.objects.create(
+        id=str(uuid.uuid4()), user=user, token=token, expires_at=timezone.now() + timedelta(hours=1)
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+TEST_BUCKET = "anexos-teste"
+TEST_STORAGES = {
+    "default": {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": TEST_BUCKET,
+            "endpoint_url": None,
+            "region_name": "us-east-1",
+            "access_key": "teste",
+            "secret_key": "teste",
+        },
+    },
+    "staticfiles": {"BACKEND": "django.core.files.storage.StaticFilesStorage"},
+}
+
+
+class AuthBearerCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user()
+        self.session = Session.objects.create(
+            id=str(uuid.uuid4()),
+            user=self.user,
+            token="token-teste",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_cached_token_skips_database(self):
+        auth = AuthBearer()
+        self.assertEqual(auth.authenticate(None, "token-teste"), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(auth.authenticate(None, "token-teste"), self.user)
+
+    def test_expired_and_invalidated_sessions_are_rejected(self):
+        auth = AuthBearer()
+        auth.authenticate(None, "token-teste")
+
+        self.session.delete()
+        invalidate_tokens(["token-teste"])
+        with self.assertRaises(HttpError):
+            auth.authenticate(None, "token-teste")
+
+        token_cache.set("token-vencido", self.user, timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(auth.authenticate(None, "token-vencido"))
+
+    def test_session_deleted_by_better_auth_is_accepted_until_the_ttl(self):
+        auth = AuthBearer()
+        auth.authenticate(None, "token-teste")
+        # Logout feito pelo frontend: a sessão some do banco sem passar pelo Django
+        self.session.delete()
+        self.assertEqual(auth.authenticate(None, "token-teste"), self.user)
+
+        later = time.monotonic() + token_cache.ttl + 1
+        with mock.patch("core.auth.time.monotonic", return_value=later):
+            with self.assertRaises(HttpError):
+                auth.authenticate(None, "token-teste")
+
+    def test_zero_ttl_disables_the_cache(self):
+        cache = TokenCache(maxsize=10, ttl=0)
+        cache.set("token-teste", self.user, self.session.expires_at)
+        self.assertIsNone(cache.get("token-teste"))
+
+
+def parse_upload(kind, files, storage=None):
+    """Monta uma requisição multipart real e lê os arquivos com o BoundedUploadHandler."""
+    request = RequestFactory().post("/upload", {"files": files})
+    request.upload_handlers = [BoundedUploadHandler(request, get_limits(kind), storage)]
+    return request, request.FILES.getlist("files")
+
+
+class FamilyAssignmentTests(TestCase):
+    def setUp(self):
+        self.owner, self.member = create_user(), create_user()
+        self.owner_headers, self.member_headers = auth_headers(self.owner), auth_headers(self.member)
+        for user in (self.owner, self.member):
+            self.finance(user.id[:8], user)
+            Goal.objects.create(title=user.id[:8], target_value=Decimal("10"), user=user)
+
+    def finance(self, title, user):
+        Finance.objects.create(title=title, value=Decimal("1"), category="Casa", type="Despesa", created_by=user)
+
+    def post(self, url, payload, headers):
+        return self.client.post(url, payload, content_type="application/json", headers=headers)
+
+    def families(self, user):
+        return (
+            set(Finance.objects.filter(created_by=user).values_list("family_id", flat=True)),
+            set(Goal.objects.filter(user=user).values_list("family_id", flat=True)),
+        )
+
+    def visible_titles(self, headers):
+        return {item["title"] for item in self.client.get("/api/finances", headers=headers).json()["items"]}
+
+    def test_join_and_leave_move_records_between_scopes(self):
+        family = self.post("/api/family", {"name": "Casa"}, self.owner_headers).json()
+        self.assertEqual(self.families(self.owner), ({family["id"]}, {family["id"]}))
+
+        self.post("/api/family/join", {"code": family["code"].lower()}, self.member_headers)
+        self.assertEqual(self.families(self.member), ({family["id"]}, {family["id"]}))
+        self.assertEqual(self.visible_titles(self.owner_headers), {self.owner.id[:8], self.member.id[:8]})
+
+        self.assertEqual(self.post("/api/family/leave", {}, self.member_headers).status_code, 204)
+        self.assertEqual(self.families(self.member), ({None}, {None}))
+        self.assertEqual(self.visible_titles(self.owner_headers), {self.owner.id[:8]})
+        self.assertEqual(self.visible_titles(self.member_headers), {self.member.id[:8]})
+
+    def test_removed_member_takes_records_out_of_the_family(self):
+        family = self.post("/api/family", {"name": "Casa"}, self.owner_headers).json()
+        self.post("/api/family/join", {"code": family["code"]}, self.member_headers)
+
+        response = self.client.delete(f"/api/family/remove/{self.member.id}", headers=self.owner_headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.families(self.member), ({None}, {None}))
+        self.assertEqual(self.families(self.owner), ({family["id"]}, {family["id"]}))
+
+    def test_joining_a_second_family_is_rejected(self):
+        family = self.post("/api/family", {"name": "Casa"}, self.owner_headers).json()
+        other = self.post("/api/family", {"name": "Outra"}, self.member_headers).json()
+
+        response = self.post("/api/family/join", {"code": other["code"]}, self.owner_headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post("/api/family", {"name": "Nova"}, self.owner_headers).status_code, 400)
+        memberships = FamilyMember.objects.filter(user=self.owner).values_list("family_id", flat=True)
+        self.assertEqual(list(memberships), [family["id"]])
+        self.assertEqual(self.families(self.owner), ({family["id"]}, {family["id"]}))
+        self.assertEqual(self.visible_titles(self.owner_headers), {self.owner.id[:8]})
+
+        # Entrar de novo na própria família não muda nada
+        response = self.post("/api/family/join", {"code": family["code"]}, self.owner_headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_backfill_migration_uses_the_first_membership(self):
+        first = Family.objects.create(name="Primeira", code="BACK01", created_by=self.owner)
+        second = Family.objects.create(name="Segunda", code="BACK02", created_by=self.member)
+        FamilyMember.objects.create(family=first, user=self.owner)
+        FamilyMember.objects.create(family=second, user=self.owner)
+        for _ in range(2):
+            self.finance("Extra", self.owner)
+
+        migration = importlib.import_module("app.migrations.0021_backfill_family")
+        with mock.patch.object(migration, "BATCH_SIZE", 2):
+            migration.backfill_family(django_apps, None)
+        self.assertEqual(self.families(self.owner), ({first.id}, {first.id}))
+        self.assertEqual(self.families(self.member), ({None}, {None}))
+
+
+class FamilyScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner, self.member = create_user(), create_user()
+        self.owner_headers, self.member_headers = auth_headers(self.owner), auth_headers(self.member)
+        self.family = Family.objects.create(name="Casa", code="SCOPE1", created_by=self.owner)
+        FamilyMember.objects.create(family=self.family, user=self.owner)
+        FamilyMember.objects.create(family=self.family, user=self.member)
+        self.goal = Goal.objects.create(
+            user=self.owner, title="Viagem", target_value=Decimal("100"), family=self.family
+        )
+        self.client = TestClient(router)
+
+    def test_scope_includes_family_members(self):
+        scope = resolve_scope(self.member.id)
+        self.assertEqual(scope.family_id, self.family.id)
+        self.assertEqual(set(scope.user_ids), {self.owner.id, self.member.id})
+        self.assertTrue(scope.can_access(self.owner.id, self.family.id))
+        self.assertEqual(resolve_scope(create_user().id).family_id, None)
+
+    def test_without_shared_cache_scope_is_resolved_per_request(self):
+        resolve_scope(self.member.id)
+        FamilyMember.objects.filter(user=self.member).delete()
+        self.assertIsNone(resolve_scope(self.member.id).family_id)
+
+    @override_settings(FAMILY_SCOPE_CACHE_ALIAS="default")
+    def test_removed_member_loses_access(self):
+        self.assertEqual(self.client.get(f"/goals/{self.goal.id}", headers=self.member_headers).status_code, 200)
+        response = self.client.delete(f"/family/remove/{self.member.id}", headers=self.owner_headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(f"/goals/{self.goal.id}", headers=self.member_headers).status_code, 403)
+
+    @override_settings(FAMILY_SCOPE_CACHE_ALIAS="default")
+    def test_member_who_leaves_loses_access(self):
+        resolve_scope(self.member.id)
+        self.assertEqual(self.client.post("/family/leave", headers=self.member_headers).status_code, 204)
+        self.assertIsNone(resolve_scope(self.member.id).family_id)
+        self.assertEqual(resolve_scope(self.owner.id).user_ids, (self.owner.id,))
+        self.assertEqual(self.client.get(f"/goals/{self.goal.id}", headers=self.member_headers).status_code, 403)
+
+
+class UploadLimitTests(TestCase):
+    def test_content_type_and_hash_come_from_the_bytes(self):
+        data = b"%PDF-1.4 comprovante"
+        _, [upload] = parse_upload("attachments", [SimpleUploadedFile("nota.txt", data, "text/plain")])
+
+        self.assertEqual(upload.content_type, "application/pdf")
+        self.assertEqual(upload.size, len(data))
+        self.assertEqual(upload.sha256, uploads.content_digest(SimpleUploadedFile("x", data)))
+
+    @override_settings(ATTACHMENT_MAX_FILE_MB=1, ATTACHMENT_MAX_REQUEST_MB=1)
+    def test_oversized_upload_is_rejected(self):
+        big = SimpleUploadedFile("grande.pdf", b"%PDF-" + b"0" * (2 * 1024 * 1024))
+        request = RequestFactory().post("/upload", {"files": [big]})
+        request.upload_handlers = [BoundedUploadHandler(request, get_limits("attachments"))]
+
+        with self.assertRaises(HttpError) as ctx:
+            request.FILES
+        self.assertEqual(ctx.exception.status_code, 413)
+        # Recusado pelo Content-Length, sem ler o corpo
+        self.assertFalse(request.META["wsgi.input"].read_started)
+
+    def test_declared_html_is_stored_as_plain_text(self):
+        page = b"<!DOCTYPE html><html><script>alert(1)</script></html>"
+        _, [upload] = parse_upload("attachments", [SimpleUploadedFile("pagina.html", page, "text/html")])
+        self.assertEqual(upload.content_type, "text/plain")
+
+        _, [upload] = parse_upload("attachments", [SimpleUploadedFile("extrato.csv", b"data;valor\n", "text/csv")])
+        self.assertEqual(upload.content_type, "text/csv")
+
+    def test_disallowed_type_is_rejected_on_first_chunk(self):
+        with self.assertRaises(HttpError) as ctx:
+            parse_upload("photo", [SimpleUploadedFile("foto.png", b"MZ\x90\x00\x03\x00\x00\x00", "image/png")])
+        self.assertEqual(ctx.exception.status_code, 415)
+
+
+class RequestBodyLimitTests(TestCase):
+    async def call(self, headers, chunks):
+        messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        async def app(scope, receive, send):
+            # Como o handler do Django: lê o corpo inteiro antes de responder
+            while (await receive())["more_body"]:
+                pass
+
+        await RequestBodyLimit(app, max_bytes=10)({"type": "http", "headers": headers}, receive, send)
+        return sent[0]["status"] if sent else None, len(messages)
+
+    async def test_declared_length_is_rejected_before_reading(self):
+        self.assertEqual(await self.call([(b"content-length", b"11")], [b"x" * 11]), (413, 1))
+
+    async def test_chunked_body_is_cut_when_it_passes_the_limit(self):
+        self.assertEqual(await self.call([], [b"x" * 6, b"x" * 6, b"x" * 6]), (413, 1))
+
+
+class ImportTests(TestCase):
+    OFX = (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKTRANLIST>\n"
+        "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20250305120000\n<TRNAMT>-1.234\n<FITID>A1\n<MEMO>Aluguel\n</STMTTRN>\n"
+        "<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20250306\n<TRNAMT>2500.50\n<FITID>A2\n<NAME>Salário\n</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>\n"
+    )
+
+    def setUp(self):
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+
+    def upload(self, name, content, content_type="text/plain"):
+        file = SimpleUploadedFile(name, content, content_type)
+        return self.client.post("/api/finances/import", {"file": file}, headers=self.headers).json()
+
+    def test_parse_decimal_formats(self):
+        cases = {
+            "1.234": "1234", "-1.234.567": "-1234567", "R$ 1.234,56": "1234.56", "-1234.56": "-1234.56", "1.5": "1.5",
+        }
+        for raw, expected in cases.items():
+            self.assertEqual(imports.parse_decimal(raw), Decimal(expected), raw)
+
+    def test_csv_in_windows_1252_with_invalid_rows(self):
+        content = "Descrição;Valor;Data\nPadaria São João;-12,50;05/03/2025\nSalário;1.234;\nErro;abc;01/01/2025\n"
+        result = self.upload("extrato.csv", content.encode("cp1252"))
+        self.assertEqual((result["created"], result["duplicates"]), (2, 0))
+        self.assertEqual(result["errors"], [{"line": 4, "message": "Valor inválido: 'abc'"}])
+
+        bakery, salary = Finance.objects.order_by("id")
+        self.assertEqual(
+            (bakery.title, bakery.value, bakery.type, bakery.status),
+            ("Padaria São João", Decimal("12.50"), "Despesa", "Pago"),
+        )
+        self.assertEqual((salary.value, salary.type, salary.status), (Decimal("1234"), "Receita", "Pendente"))
+
+    def test_reimport_skips_rows_already_imported(self):
+        content = "titulo,valor,data\nCafé,-5.00,2025-03-01\nCafé,-5.00,2025-03-01\n".encode()
+        self.assertEqual(self.upload("extrato.csv", content)["created"], 2)
+        # Mesma linha repetida no extrato conta como ocorrências diferentes
+        extended = content + "Almoço,-30.00,2025-03-02\n".encode()
+        result = self.upload("extrato.csv", extended)
+        self.assertEqual((result["created"], result["duplicates"]), (1, 2))
+        self.assertEqual(Finance.objects.count(), 3)
+
+    def test_ofx_uses_fitid_to_deduplicate(self):
+        result = self.upload("extrato.ofx", self.OFX.encode())
+        self.assertEqual((result["created"], result["errors"]), (2, []))
+        rent, salary = Finance.objects.order_by("id")
+        self.assertEqual(
+            (rent.title, rent.value, rent.type, str(rent.payment_date)),
+            ("Aluguel", Decimal("1234"), "Despesa", "2025-03-05"),
+        )
+        self.assertEqual((salary.title, salary.value, salary.type), ("Salário", Decimal("2500.50"), "Receita"))
+
+        result = self.upload("extrato.ofx", self.OFX.replace("Aluguel", "Aluguel março").encode())
+        self.assertEqual((result["created"], result["duplicates"]), (0, 2))
+
+    def test_csv_without_required_columns_is_rejected(self):
+        file = SimpleUploadedFile("extrato.csv", b"data;categoria\n01/01/2025;Casa\n", "text/csv")
+        response = self.client.post("/api/finances/import", {"file": file}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+        Finance.objects.create(
+            title='Luz, "março"', value=Decimal("1234.5"), category="Casa", type="Despesa", status="Pago",
+            due_date=date(2025, 3, 10), payment_date=date(2025, 3, 8), created_by=self.user,
+        )
+        Finance.objects.create(
+            title="Salário <&>", value=Decimal("3000"), category="Trabalho", type="Receita", created_by=self.user,
+        )
+        self.expected = [
+            exports.EXPORT_HEADER,
+            ['Luz, "março"', "Despesa", "Pago", "Casa", "1234.50", "10/03/2025", "08/03/2025", "Teste"],
+            ["Salário <&>", "Receita", "Pendente", "Trabalho", "3000.00", "", "", "Teste"],
+        ]
+
+    def export(self, query):
+        response = self.client.get(f"/api/finances/export?{query}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def assertTable(self, rows, expected):
+        # Cabeçalho primeiro; a posição das linhas sem pagamento depende do banco (NULLs no DESC)
+        self.assertEqual((rows[0], sorted(rows[1:])), (expected[0], sorted(expected[1:])))
+
+    def sheet_rows(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn("[Content_Types].xml", archive.namelist())
+            sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        return [
+            [cell.text or "" for cell in row.iterfind("s:c/s:is/s:t", ns)] for row in sheet.iterfind(".//s:row", ns)
+        ]
+
+    def test_csv_export(self):
+        response, content = self.export("format=csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="registros.csv"')
+        text = content.decode("utf-8")
+        self.assertTrue(text.startswith("\ufeff"))
+        self.assertTable(list(csv.reader(io.StringIO(text[1:]))), self.expected)
+
+        _, content = self.export("format=csv&type=Receita")
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+        self.assertEqual(rows, [self.expected[0], self.expected[2]])
+
+    def test_csv_neutralizes_formulas(self):
+        rows = [("=HYPERLINK(\"http://x\")", "Despesa", "Pago", "@SUM(A1)", "-10.00", "", "", "+5-1")]
+        content = "".join(exports.stream_csv(iter(rows)))
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content[1:])))[1],
+            ["'=HYPERLINK(\"http://x\")", "Despesa", "Pago", "'@SUM(A1)", "-10.00", "", "", "'+5-1"],
+        )
+
+    def test_export_applies_the_search_filters(self):
+        for query in ("title=luz", "due_date=2025-03-10", "date_from=2025-03-08&date_to=2025-03-08"):
+            _, content = self.export(f"format=csv&{query}")
+            rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+            self.assertEqual(rows, self.expected[:2], query)
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        response, content = self.export("format=xlsx")
+        self.assertTrue(response["Content-Type"].startswith("application/vnd.openxmlformats"))
+        self.assertTable(self.sheet_rows(content), self.expected)
+
+    def test_xlsx_streamed_in_several_chunks(self):
+        rows = [(f"Linha {i}",) for i in range(5)]
+        chunks = list(exports.stream_xlsx(iter(rows), rows_per_chunk=2))
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(self.sheet_rows(b"".join(chunks))[1:], [[title] for title, in rows])
+
+
+class FinanceNotificationTests(TestCase):
+    def test_kind_follows_days_left_within_the_window(self):
+        user = create_user()
+        today = date.today()
+
+        def finance(title, days, status="Pendente", created_by=user):
+            Finance.objects.create(
+                title=title, value=Decimal("1"), category="Casa", type="Despesa", status=status,
+                due_date=today + timedelta(days=days), created_by=created_by,
+            )
+
+        for days in (4, 3, 2, 1, 0, -1):
+            finance(f"{days:+d}", days)
+        finance("paga", 0, status="Pago")
+        finance("de outro usuário", 0, created_by=create_user())
+
+        response = self.client.get("/api/finances/notifications", headers=auth_headers(user))
+        self.assertEqual(
+            [(item["title"], item["days_left"], item["kind"], item["status"]) for item in response.json()],
+            [
+                ("-1", -1, "due-expired", "Atrasada"),
+                ("+0", 0, "due-today", "Pendente"),
+                ("+1", 1, "due-tomorrow", "Pendente"),
+                ("+2", 2, "due-soon", "Pendente"),
+                ("+3", 3, "due-soon", "Pendente"),
+            ],
+        )
+
+
+class MarkOverdueTests(TestCase):
+    def test_pending_past_due_finances_are_marked_in_batches(self):
+        user = create_user()
+        today = date.today()
+        cases = {
+            "vencida 1": (today - timedelta(days=1), "Pendente"),
+            "vencida 2": (today - timedelta(days=30), "Pendente"),
+            "vencida 3": (today - timedelta(days=2), "Pendente"),
+            "vence hoje": (today, "Pendente"),
+            "sem vencimento": (None, "Pendente"),
+            "paga": (today - timedelta(days=1), "Pago"),
+        }
+        for title, (due, status) in cases.items():
+            finance = Finance.objects.create(
+                title=title, value=Decimal("1"), category="Casa", type="Despesa", due_date=due, created_by=user
+            )
+            # Sem passar por save(), que já marcaria as vencidas
+            Finance.objects.filter(pk=finance.pk).update(status=status)
+
+        out = io.StringIO()
+        call_command("mark_overdue_finances", batch_size=2, stdout=out)
+        self.assertIn("3 finanças marcadas como atrasadas", out.getvalue())
+
+        overdue = Finance.objects.filter(status="Atrasada")
+        self.assertEqual(set(overdue.values_list("title", flat=True)), {"vencida 1", "vencida 2", "vencida 3"})
+        # As alterações entram no stream de sincronização
+        self.assertTrue(all(overdue.values_list("revision", flat=True)))
+
+    def test_finance_paid_during_the_batch_keeps_its_revision(self):
+        user = create_user()
+        for title in ("vencida", "paga no meio"):
+            finance = Finance.objects.create(
+                title=title, value=Decimal("1"), category="Casa", type="Despesa", created_by=user,
+                due_date=date.today() - timedelta(days=1),
+            )
+            Finance.objects.filter(pk=finance.pk).update(status="Pendente")
+        paid = Finance.objects.filter(title="paga no meio")
+        revision = paid.get().revision
+        atomic = transaction.atomic
+
+        def pay_then_atomic(*args, **kwargs):
+            # Pago entre a leitura dos ids e a transação do lote
+            paid.update(status="Pago")
+            return atomic(*args, **kwargs)
+
+        out = io.StringIO()
+        with mock.patch("app.management.commands.mark_overdue_finances.transaction") as patched:
+            patched.atomic.side_effect = pay_then_atomic
+            call_command("mark_overdue_finances", stdout=out)
+
+        self.assertIn("1 finanças marcadas como atrasadas", out.getvalue())
+        self.assertEqual(paid.values_list("status", "revision").get(), ("Pago", revision))
+        self.assertTrue(Finance.objects.get(title="vencida").revision)
+
+        out = io.StringIO()
+        call_command("mark_overdue_finances", stdout=out)
+        self.assertIn("0 finanças marcadas", out.getvalue())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = create_user()
+        self.ids = {}
+        for title, due, paid in [
+            ("a", None, None), ("b", date(2025, 3, 1), date(2025, 3, 1)), ("c", None, date(2025, 4, 1)),
+            ("d", date(2025, 3, 1), None), ("e", None, date(2025, 3, 1)), ("f", date(2025, 2, 1), None),
+        ]:
+            status = "Pago" if paid else "Pendente"
+            finance = Finance.objects.create(
+                title=title, value=Decimal("1"), category="Casa", type="Despesa", status=status,
+                due_date=due, payment_date=paid, created_by=user,
+            )
+            self.ids[finance.id] = title
+        # Mesmo created_at em todas: o desempate fica com o id
+        Finance.objects.update(created_at=timezone.now())
+
+    def walk(self, ordering, limit=2):
+        paginator = KeysetPagination(ordering=ordering)
+        titles, cursor = [], None
+        while True:
+            page = paginator.paginate_queryset(
+                Finance.objects.all(), KeysetPagination.Input(cursor=cursor, limit=limit)
+            )
+            titles += [self.ids[finance.id] for finance in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return titles
+
+    def test_nulls_first_when_descending(self):
+        # Sem pagamento primeiro; empates de data e created_at pelo id
+        for limit in (1, 2, 4):
+            self.assertEqual(self.walk(("-payment_date", "created_at", "id"), limit), list("adfcbe"))
+
+    def test_nulls_last_when_ascending(self):
+        for limit in (1, 2, 4):
+            self.assertEqual(self.walk(("due_date", "-id"), limit), list("fdbeca"))
+
+    def test_invalid_cursor_is_rejected(self):
+        headers = auth_headers(create_user())
+        response = self.client.get("/api/finances?cursor=bm90LWpzb24", headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        self.user, self.other = create_user(), create_user()
+        self.headers = auth_headers(self.user)
+        family = Family.objects.create(name="Casa", code="ASYNC1", created_by=self.user)
+        FamilyMember.objects.create(family=family, user=self.user)
+        FamilyMember.objects.create(family=family, user=self.other)
+        for i in range(3):
+            Finance.objects.create(
+                title=f"Conta {i}", value=Decimal("10"), category="Casa", type="Despesa",
+                created_by=self.user, family=family,
+            )
+        self.client = TestAsyncClient(router)
+
+    async def test_listing_pages_through_family_finances(self):
+        first = (await self.client.get("/finances?limit=2", headers=self.headers)).json()
+        self.assertEqual(len(first["items"]), 2)
+        rest = (await self.client.get(f"/finances?limit=2&cursor={first['next_cursor']}", headers=self.headers)).json()
+        self.assertEqual(len(rest["items"]), 1)
+        self.assertIsNone(rest["next_cursor"])
+
+        users = (await self.client.get("/family/users", headers=self.headers)).json()
+        self.assertEqual({user["id"] for user in users}, {self.user.id, self.other.id})
+
+    async def test_user_refs_list_each_author_once(self):
+        data = (await self.client.get("/finances?limit=2&user_refs=true", headers=self.headers)).json()
+        self.assertEqual(list(data["users"]), [self.user.id])
+        self.assertEqual(data["users"][self.user.id]["email"], self.user.email)
+        self.assertTrue(all(item["created_by_id"] == self.user.id and "created_by" not in item for item in data["items"]))
+
+        finance = await Finance.objects.afirst()
+        detail = (await self.client.get(f"/finances/{finance.id}?user_refs=true", headers=self.headers)).json()
+        self.assertEqual((detail["created_by_id"], list(detail["users"])), (self.user.id, [self.user.id]))
+
+    async def test_export_streams_asynchronously(self):
+        response = await self.async_client.get("/api/finances/export?format=csv", headers=self.headers)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8-sig")
+        self.assertEqual(len(content.strip().splitlines()), 4)
+        self.assertIn("Conta 2", content)
+
+    async def test_detail_requires_access(self):
+        finance = await Finance.objects.afirst()
+        response = await self.client.get(f"/finances/{finance.id}", headers=self.headers)
+        self.assertEqual(response.json()["created_by"]["id"], self.user.id)
+
+        outsider = await sync_to_async(lambda: auth_headers(create_user()))()
+        response = await self.client.get(f"/finances/{finance.id}", headers=outsider)
+        self.assertEqual(response.status_code, 403)
+
+
+class ListRenderingTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.user.image_variants = {"64": {"webp": "https://exemplo/64.webp"}}
+        self.user.save()
+        for i in range(3):
+            Finance.objects.create(
+                title=f"Conta {i}", value=Decimal("10.5") + i, category="Casa",
+                type="Despesa" if i else "Receita", created_by=self.user,
+            )
+        for target in (Decimal("100"), Decimal("0")):
+            goal = Goal.objects.create(user=self.user, title="Viagem", target_value=target)
+            GoalRecord.objects.create(goal=goal, title="Depósito", value=Decimal("12.34"), type="Adicionar")
+
+    def assertSameJson(self, schema, objects, fast_rows):
+        # Mesmo JSON (byte a byte) que o caminho com validação pelo schema geraria
+        data = [schema.model_validate(obj).model_dump() for obj in objects]
+        expected = json.loads(JSONRenderer().render(None, data, response_status=200))
+        self.assertEqual(
+            renderer.render(None, fast_rows, response_status=200),
+            json.dumps(expected, separators=(",", ":"), ensure_ascii=False).encode(),
+        )
+
+    def test_rows_render_like_the_response_schemas(self):
+        finances = Finance.objects.order_by("id")
+        self.assertSameJson(FinanceSchema, finances.select_related("created_by"), rows.finance_rows(finances))
+        goals = Goal.objects.order_by("id")
+        self.assertSameJson(GoalSchema, goals.annotate(records_count=Count("records")), rows.goal_rows(goals))
+
+
+class FinanceBatchTests(TestCase):
+    def setUp(self):
+        self.user, self.outsider = create_user(), create_user()
+        self.headers = auth_headers(self.user)
+        self.own = self.finance("Luz", self.user)
+        self.other = self.finance("Aluguel", self.outsider)
+
+    def finance(self, title, user):
+        return Finance.objects.create(
+            title=title, value=Decimal("10"), category="Casa", type="Despesa", created_by=user
+        )
+
+    def batch(self, operations):
+        response = self.client.post(
+            "/api/finances/batch", {"operations": operations}, content_type="application/json", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        return [(result["op"], result["status"]) for result in response.json()]
+
+    def test_results_follow_each_operation(self):
+        spare = self.finance("Internet", self.user)
+        results = self.batch([
+            {"op": "create", "data": {"title": "Mercado", "value": 50, "category": "Casa"}},
+            {"op": "update", "id": self.own.id, "data": {"title": "Luz (março)", "value": 12}},
+            {"op": "delete", "id": spare.id},
+        ])
+        self.assertEqual(results, [("create", 201), ("update", 200), ("delete", 204)])
+
+        self.own.refresh_from_db()
+        self.assertEqual((self.own.title, self.own.value), ("Luz (março)", Decimal("12")))
+        self.assertFalse(Finance.objects.filter(id=spare.id).exists())
+        self.assertTrue(Finance.objects.filter(title="Mercado", created_by=self.user).exists())
+
+    def test_failed_items_do_not_block_the_others(self):
+        results = self.batch([
+            {"op": "update", "id": 999999, "data": {"title": "X"}},
+            {"op": "delete", "id": self.other.id},
+            {"op": "delete", "id": self.own.id},
+            {"op": "update", "id": self.own.id, "data": {"title": "X"}},
+            {"op": "update", "id": self.other.id, "data": {"title": None}},
+        ])
+        self.assertEqual(results, [("update", 404), ("delete", 403), ("delete", 204), ("update", 409), ("update", 403)])
+        self.assertFalse(Finance.objects.filter(id=self.own.id).exists())
+        self.assertTrue(Finance.objects.filter(id=self.other.id).exists())
+
+    def test_null_required_fields_are_rejected_per_item(self):
+        results = self.batch([
+            {"op": "update", "id": self.own.id, "data": {"title": None, "due_date": None}},
+            {"op": "create", "data": {"title": "Mercado", "value": 50, "category": "Casa"}},
+        ])
+        self.assertEqual(results, [("update", 400), ("create", 201)])
+        self.own.refresh_from_db()
+        self.assertEqual(self.own.title, "Luz")
+
+        response = self.client.put(
+            f"/api/finances/{self.own.id}", {"value": None}, content_type="application/json", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_is_written_atomically(self):
+        operations = [
+            {"op": "create", "data": {"title": "Mercado", "value": 50, "category": "Casa"}},
+            {"op": "update", "id": self.own.id, "data": {"title": "Luz (março)"}},
+        ]
+        with mock.patch("app.api.rollups.record_changes", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.batch(operations)
+        self.own.refresh_from_db()
+        self.assertEqual(self.own.title, "Luz")
+        self.assertFalse(Finance.objects.filter(title="Mercado").exists())
+
+
+class FinanceSummaryTests(TestCase):
+    def setUp(self):
+        self.user, self.member = create_user(), create_user()
+        self.headers = auth_headers(self.user)
+        family = Family.objects.create(name="Casa", code="RESUMO", created_by=self.user)
+        FamilyMember.objects.create(family=family, user=self.user)
+        FamilyMember.objects.create(family=family, user=self.member)
+
+        def finance(title, value, type, user=self.user, **fields):
+            Finance.objects.create(
+                title=title, value=Decimal(value), type=type, created_by=user, family=family,
+                **{"category": "Casa", **fields},
+            )
+
+        # Pagamento tem precedência sobre o vencimento
+        finance("Salário", "1000", "Receita", status="Pago", payment_date=date(2025, 3, 5), due_date=date(2025, 2, 28))
+        # Sem pagamento: conta pelo vencimento
+        finance("Luz", "200", "Despesa", due_date=date(2025, 3, 20))
+        finance(
+            "Cinema", "50", "Despesa", user=self.member, category="Lazer", status="Pago", payment_date=date(2025, 4, 2)
+        )
+        # Sem data de referência: fica fora do resumo
+        finance("Sem data", "999", "Despesa")
+        rollups.rebuild()
+
+    FIELDS = ("period", "income", "expense", "count", "category", "created_by_id", "status")
+
+    def summary(self, query):
+        response = self.client.get(f"/api/finances/summary?{query}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [tuple(bucket[field] for field in self.FIELDS) for bucket in response.json()]
+
+    def test_month_buckets_match_the_finances(self):
+        expected = [("2025-03-01", 1000, 200, 2, None, None, None), ("2025-04-01", 0, 50, 1, None, None, None)]
+        self.assertEqual(self.summary("period=month"), expected)
+        # O mesmo resultado sem a tabela de totais mensais
+        with mock.patch("app.api.rollups.can_summarize", return_value=False):
+            self.assertEqual(self.summary("period=month"), expected)
+
+    def test_day_buckets_use_the_due_date_when_unpaid(self):
+        self.assertEqual([bucket[:4] for bucket in self.summary("period=day")], [
+            ("2025-03-05", 1000, 0, 1), ("2025-03-20", 0, 200, 1), ("2025-04-02", 0, 50, 1),
+        ])
+        # O filtro de datas também usa a data de referência
+        self.assertEqual(
+            [bucket[:4] for bucket in self.summary("period=day&date_from=2025-03-10&date_to=2025-03-31")],
+            [("2025-03-20", 0, 200, 1)],
+        )
+
+    def test_grouping_by_dimensions(self):
+        user, member = self.user.id, self.member.id
+        self.assertEqual(self.summary("group_by=category&group_by=member"), [
+            ("2025-03-01", 1000, 200, 2, "Casa", user, None),
+            ("2025-04-01", 0, 50, 1, "Lazer", member, None),
+        ])
+        self.assertEqual(self.summary("group_by=status"), [
+            ("2025-03-01", 0, 200, 1, None, None, "Atrasada"),
+            ("2025-03-01", 1000, 0, 1, None, None, "Pago"),
+            ("2025-04-01", 0, 50, 1, None, None, "Pago"),
+        ])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+
+    def send(self, method, url, payload=None):
+        response = getattr(self.client, method)(url, payload, content_type="application/json", headers=self.headers)
+        self.assertLess(response.status_code, 300)
+        # Os totais incrementais batem com as finanças depois de cada mutação
+        self.assertEqual(rollups.verify(), [], f"{method} {url}")
+        return response.json() if response.content else None
+
+    def stored_totals(self):
+        rows = FinanceMonthlyTotal.objects.exclude(total=0, count=0)
+        return sorted(rows.values_list("user_id", "month", "type", "category", "total", "count"), key=str)
+
+    def test_api_mutations_keep_totals_equal_to_rebuild(self):
+        luz = self.send("post", "/api/finances", {
+            "title": "Luz", "value": 100.5, "category": "Casa", "type": "Despesa", "status": "Pago",
+            "payment_date": "2025-03-10",
+        })
+        agua = self.send("post", "/api/finances", {
+            "title": "Água", "value": 40, "category": "Casa", "type": "Despesa", "due_date": "2025-04-05",
+        })
+        # Troca de mês, categoria e tipo; depois só o vencimento como referência
+        self.send("put", f"/api/finances/{luz['id']}", {"payment_date": "2025-02-28", "category": "Contas"})
+        self.send("put", f"/api/finances/{luz['id']}", {"type": "Receita", "value": 80})
+        self.send("put", f"/api/finances/{agua['id']}", {"payment_date": "2025-05-01"})
+        self.send("put", f"/api/finances/{agua['id']}", {"payment_date": None})
+        self.send("post", "/api/finances/batch", {"operations": [
+            {"op": "create", "data": {
+                "title": "Mercado", "value": 20, "category": "Casa", "status": "Pago", "payment_date": "2025-03-01",
+            }},
+            {"op": "update", "id": agua["id"], "data": {"value": 45}},
+            {"op": "delete", "id": luz["id"]},
+        ]})
+        self.send("delete", f"/api/finances/{agua['id']}")
+
+        incremental = self.stored_totals()
+        self.assertEqual(incremental, [
+            (self.user.id, date(2025, 3, 1), "Despesa", "Casa", Decimal("20.00"), 1),
+        ])
+        rollups.rebuild()
+        self.assertEqual(self.stored_totals(), incremental)
+
+    def test_verify_reports_drift(self):
+        Finance.objects.create(
+            title="Luz", value=Decimal("100"), category="Casa", type="Despesa", status="Pago",
+            payment_date=date(2025, 3, 10), created_by=self.user,
+        )
+        rollups.rebuild()
+        FinanceMonthlyTotal.objects.update(total=F("total") + 1)
+        key = (self.user.id, date(2025, 3, 1), "Despesa", "Casa")
+        self.assertEqual(rollups.verify(), [key])
+
+        rollups.rebuild()
+        self.assertEqual(rollups.verify(), [])
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+
+    def create_finance(self, title):
+        payload = {"title": title, "value": 10, "category": "Casa", "type": "Despesa"}
+        response = self.client.post("/api/finances", payload, content_type="application/json", headers=self.headers)
+        return response.json()
+
+    def test_unchanged_goal_listing_returns_304(self):
+        response = self.client.get("/api/goals", headers=self.headers)
+        etag = response.headers["ETag"]
+        conditional = {**self.headers, "If-None-Match": etag}
+        self.assertEqual(self.client.get("/api/goals", headers=conditional).status_code, 304)
+
+        payload = {"title": "Viagem", "target_value": 100}
+        self.client.post("/api/goals", payload, content_type="application/json", headers=self.headers)
+        response = self.client.get("/api/goals", headers=conditional)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_changes_since_token_return_updates_and_deletions(self):
+        first, second = self.create_finance("Luz"), self.create_finance("Água")
+        token = self.client.get("/api/finances/changes", headers=self.headers).json()
+        self.assertTrue(token["reset"])
+
+        payload = {"title": "Luz (março)"}
+        self.client.put(f"/api/finances/{first['id']}", payload, content_type="application/json", headers=self.headers)
+        self.client.delete(f"/api/finances/{second['id']}", headers=self.headers)
+        data = self.client.get(f"/api/finances/changes?since={token['revision']}", headers=self.headers).json()
+        self.assertFalse(data["reset"])
+        self.assertEqual([item["title"] for item in data["items"]], ["Luz (março)"])
+        self.assertEqual(data["deleted"], [second["id"]])
+
+        data = self.client.get(f"/api/finances/changes?since={data['revision']}", headers=self.headers).json()
+        self.assertEqual((data["items"], data["deleted"]), ([], []))
+
+    def test_tokens_from_another_scope_or_pruned_history_reset(self):
+        finance = self.create_finance("Luz")
+        token = self.client.get("/api/finances/changes", headers=self.headers).json()["revision"]
+        self.client.delete(f"/api/finances/{finance['id']}", headers=self.headers)
+
+        other = auth_headers(create_user())
+        self.assertTrue(self.client.get(f"/api/finances/changes?since={token}", headers=other).json()["reset"])
+
+        self.assertEqual(sync.prune_tombstones(timezone.now() + timedelta(seconds=1)), 1)
+        self.assertTrue(self.client.get(f"/api/finances/changes?since={token}", headers=self.headers).json()["reset"])
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user, self.other = create_user(), create_user()
+        self.headers, self.other_headers = auth_headers(self.user), auth_headers(self.other)
+        family = Family.objects.create(name="Casa", code="EVENT1", created_by=self.user)
+        FamilyMember.objects.create(family=family, user=self.user)
+        FamilyMember.objects.create(family=family, user=self.other)
+
+    def create_finance(self):
+        payload = {"title": "Luz", "value": 10, "category": "Casa", "type": "Despesa"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/finances", payload, content_type="application/json", headers=self.headers)
+        return response.json()
+
+    async def test_family_members_receive_change_events(self):
+        response = await self.async_client.get("/api/events", headers=self.other_headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"retry: 3000\n\n")
+
+        finance = await sync_to_async(self.create_finance)()
+        message = (await asyncio.wait_for(anext(content), 1)).decode()
+        self.assertTrue(message.startswith("event: finances\n"))
+        event = json.loads(message.split("data: ", 1)[1])
+        self.assertEqual((event["changed"], event["deleted"]), ([finance["id"]], []))
+        # O Django fecha a resposta ao fim da conexão, o que remove a inscrição
+        # (sem fechar a conexão do banco do teste, como faz o próprio test client)
+        request_finished.disconnect(close_old_connections)
+        try:
+            await sync_to_async(response.close)()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertEqual(dict(events.broker._subscriptions), {})
+
+    def test_stream_requires_asgi(self):
+        self.assertEqual(self.client.get("/api/events", headers=self.headers).status_code, 501)
+
+
+class GoalRecordsTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+        self.goal = Goal.objects.create(user=self.user, title="Viagem", target_value=Decimal("200"))
+        for value in ("10", "20", "30"):
+            GoalRecord.objects.create(goal=self.goal, title="Depósito", value=Decimal(value), type="Adicionar")
+        Goal.objects.create(user=self.user, title="Reserva", target_value=Decimal("0"))
+        self.client = TestClient(router)
+
+    def test_listing_is_one_query_with_summaries(self):
+        with self.assertNumQueries(1):
+            goals = {row["title"]: row for row in rows.goal_rows(Goal.objects.filter(user=self.user))}
+        self.assertEqual((goals["Viagem"]["records_count"], goals["Viagem"]["progress"]), (3, 30.0))
+        self.assertEqual((goals["Reserva"]["records_count"], goals["Reserva"]["progress"]), (0, 0.0))
+        self.assertNotIn("records", goals["Viagem"])
+
+    def test_records_are_paginated_newest_first(self):
+        first = self.client.get(f"/goals/{self.goal.id}/records?limit=2", headers=self.headers).json()
+        rest = self.client.get(
+            f"/goals/{self.goal.id}/records?limit=2&cursor={first['next_cursor']}", headers=self.headers
+        ).json()
+        self.assertEqual([r["value"] for r in first["items"] + rest["items"]], [30.0, 20.0, 10.0])
+        self.assertIsNone(rest["next_cursor"])
+
+        outsider = auth_headers(create_user())
+        self.assertEqual(self.client.get(f"/goals/{self.goal.id}/records", headers=outsider).status_code, 403)
+
+
+class GoalBalanceTests(TestCase):
+    def setUp(self):
+        self.goal = Goal.objects.create(user=create_user(), title="Viagem", target_value=Decimal("1000"))
+
+    def test_records_update_balance_incrementally(self):
+        GoalRecord.objects.create(goal=self.goal, title="Depósito", value=Decimal("150.00"), type="Adicionar")
+        GoalRecord.objects.create(goal=self.goal, title="Saque", value=Decimal("40.00"), type="Retirar")
+
+        self.assertEqual(self.goal.current_value, Decimal("110.00"))
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_value, Decimal("110.00"))
+
+    def test_recalculate_repairs_drifted_balance(self):
+        GoalRecord.objects.create(goal=self.goal, title="Depósito", value=Decimal("75.50"), type="Adicionar")
+        Goal.objects.filter(pk=self.goal.pk).update(current_value=Decimal("0"))
+
+        self.assertEqual(self.goal.recalculate_current_value(), Decimal("75.50"))
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_value, Decimal("75.50"))
+
+
+class GoalUpdateTests(TestCase):
+    def test_edit_keeps_deposit_made_after_loading_the_goal(self):
+        user = create_user()
+        goal = Goal.objects.create(user=user, title="Reserva", target_value=Decimal("1000"))
+        save = Goal.save
+
+        def save_after_deposit(instance, *args, **kwargs):
+            # Depósito confirmado entre a leitura da meta e o save de update_goal
+            GoalRecord.objects.create(goal_id=instance.pk, title="Depósito", value=Decimal("50"), type="Adicionar")
+            return save(instance, *args, **kwargs)
+
+        payload = {"title": "Viagem", "target_value": 2000}
+        with mock.patch.object(Goal, "save", save_after_deposit):
+            response = self.client.put(
+                f"/api/goals/{goal.pk}", payload, content_type="application/json", headers=auth_headers(user)
+            )
+        self.assertEqual(response.status_code, 200)
+        goal.refresh_from_db()
+        self.assertEqual((goal.title, goal.target_value, goal.current_value), ("Viagem", 2000, Decimal("50.00")))
+
+
+class GoalConcurrentDepositTests(TransactionTestCase):
+    def test_concurrent_deposits_are_not_lost(self):
+        goal = Goal.objects.create(user=create_user(), title="Reserva", target_value=Decimal("1000"))
+        writers = 8
+        barrier = threading.Barrier(writers)
+        errors = []
+
+        def deposit():
+            try:
+                # Cada thread usa sua própria instância (e conexão), como requisições distintas
+                stale_goal = Goal.objects.get(pk=goal.pk)
+                barrier.wait()
+                GoalRecord.objects.create(goal=stale_goal, title="Depósito", value=Decimal("10.00"), type="Adicionar")
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=deposit) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_value, Decimal("80.00"))
+        self.assertEqual(goal.records.count(), writers)
+
+
+@unittest.skipIf(mock_aws is None, "moto não instalado")
+@override_settings(STORAGES=TEST_STORAGES)
+class AttachmentStorageTests(TestCase):
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=TEST_BUCKET)
+
+        self.user = create_user()
+        self.headers = auth_headers(self.user)
+        self.finance = Finance.objects.create(
+            title="Aluguel", value=Decimal("1200"), category="Casa", type="Despesa", created_by=self.user
+        )
+        self.client = TestClient(router)
+
+    def test_direct_upload_is_confirmed_with_storage_metadata(self):
+        url = f"/finances/{self.finance.id}/attachments"
+        response = self.client.post(
+            f"{url}/presign",
+            json={"files": [{"name": "recibo.pdf", "content_type": "application/pdf"}]},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        upload = response.json()[0]
+        self.assertTrue(upload["key"].startswith(f"finances/{self.finance.id}/"))
+
+        # O cliente envia os bytes direto para o bucket, sem passar pela API
+        sent = requests.put(upload["url"], data=b"%PDF-1.4 recibo", headers=upload["headers"])
+        self.assertEqual(sent.status_code, 200)
+
+        confirm = {"uploads": [{"key": upload["key"], "name": "recibo.pdf"}]}
+        response = self.client.post(f"{url}/confirm", json=confirm, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        attachment = response.json()[0]
+        self.assertEqual(attachment["size"], len(b"%PDF-1.4 recibo"))
+        self.assertEqual(attachment["content_type"], "application/pdf")
+
+        # Confirmar de novo não duplica o anexo
+        self.client.post(f"{url}/confirm", json=confirm, headers=self.headers)
+        self.assertEqual(self.finance.attachments.count(), 1)
+
+    def test_presign_rejects_renderable_types(self):
+        files = [{"name": "recibo.pdf", "content_type": "application/pdf"}, {"name": "x.html", "content_type": "text/html"}]
+        response = self.client.post(
+            f"/finances/{self.finance.id}/attachments/presign", json={"files": files}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 415)
+
+    def test_confirm_rejects_missing_or_foreign_objects(self):
+        url = f"/finances/{self.finance.id}/attachments/confirm"
+        missing = {"uploads": [{"key": f"finances/{self.finance.id}/nada/x.pdf", "name": "x.pdf"}]}
+        self.assertEqual(self.client.post(url, json=missing, headers=self.headers).status_code, 404)
+
+        foreign = {"uploads": [{"key": "profile_photos/outro/x.png", "name": "x.png"}]}
+        self.assertEqual(self.client.post(url, json=foreign, headers=self.headers).status_code, 400)
+        self.assertEqual(self.finance.attachments.count(), 0)
+
+    def bucket_keys(self):
+        listing = boto3.client("s3", region_name="us-east-1").list_objects_v2(Bucket=TEST_BUCKET)
+        return [item["Key"] for item in listing.get("Contents", [])]
+
+    def test_parallel_upload_creates_all_attachments(self):
+        files = [SimpleUploadedFile(f"nota-{i}.txt", b"conteudo %d" % i, "text/plain") for i in range(5)]
+        attachments = uploads.save_attachments(self.finance, files, self.user)
+
+        self.assertEqual([a.name for a in attachments], [f.name for f in files])
+        self.assertTrue(all(a.pk for a in attachments))
+        self.assertEqual(sorted(self.bucket_keys()), sorted(a.file.name for a in attachments))
+
+    def test_failed_upload_removes_objects_already_sent(self):
+        files = [SimpleUploadedFile(f"nota-{i}.txt", b"conteudo %d" % i, "text/plain") for i in range(4)]
+        original_save = S3Storage._save
+
+        def flaky_save(storage, name, content):
+            if content.name == "nota-2.txt":
+                raise ConnectionError("falha no envio")
+            return original_save(storage, name, content)
+
+        with mock.patch.object(S3Storage, "_save", flaky_save):
+            with self.assertRaises(ConnectionError):
+                uploads.save_attachments(self.finance, files, self.user)
+
+        self.assertEqual(self.finance.attachments.count(), 0)
+        self.assertEqual(self.bucket_keys(), [])
+
+    def test_identical_content_is_stored_once(self):
+        other = Finance.objects.create(
+            title="Luz", value=Decimal("90"), category="Casa", type="Despesa", created_by=self.user
+        )
+        receipt = b"%PDF-1.4 mesmo recibo"
+        first = uploads.save_attachments(
+            self.finance, [SimpleUploadedFile("recibo.pdf", receipt), SimpleUploadedFile("copia.pdf", receipt)], self.user
+        )
+        with mock.patch.object(S3Storage, "_save") as save:
+            second = uploads.save_attachments(other, [SimpleUploadedFile("recibo.pdf", receipt)], self.user)
+        save.assert_not_called()
+
+        blob = first[0].blob
+        self.assertEqual({a.blob_id for a in first + second}, {blob.pk})
+        self.assertEqual(self.bucket_keys(), [blob.file.name])
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+        # Apagar um anexo (ou a finança, em cascata) não remove o conteúdo dos outros
+        first[0].delete()
+        self.finance.delete()
+        cleanup.process_deletions()
+        self.assertEqual(self.bucket_keys(), [blob.file.name])
+
+        other.delete()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertEqual(cleanup.process_deletions(), (1, 0))
+        self.assertEqual(self.bucket_keys(), [])
+
+    def test_orphans_are_found_and_removed_in_batches(self):
+        kept = uploads.save_attachments(self.finance, [SimpleUploadedFile("nota.txt", b"nota")], self.user)[0]
+        s3 = boto3.client("s3", region_name="us-east-1")
+        orphans = [f"finances/{self.finance.id}/abandonado/{i}.pdf" for i in range(3)]
+        for key in orphans:
+            s3.put_object(Bucket=TEST_BUCKET, Key=key, Body=b"x")
+
+        found = [name for page in cleanup.find_orphans(older_than=timedelta(0)) for name in page]
+        self.assertEqual(sorted(found), orphans)
+        self.assertEqual(list(cleanup.find_orphans()), [])
+
+        StorageDeletion.schedule(found)
+        with mock.patch.object(cleanup, "DELETE_OBJECTS_LIMIT", 2):
+            self.assertEqual(cleanup.process_deletions(), (3, 0))
+        self.assertEqual(self.bucket_keys(), [kept.file.name])
+        self.assertFalse(StorageDeletion.objects.exists())
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_uploads_stream_to_storage_and_become_blobs(self):
+        data = b"%PDF-1.4 " + b"x" * 5000
+        _, [upload] = parse_upload(
+            "attachments", [SimpleUploadedFile("extrato.pdf", data, "application/pdf")], default_storage
+        )
+        self.assertIsInstance(upload, StreamedUploadedFile)
+        self.assertEqual(self.bucket_keys(), [upload.storage_name])
+
+        with mock.patch.object(S3Storage, "_save") as save:
+            [attachment] = uploads.save_attachments(self.finance, [upload], self.user)
+        save.assert_not_called()
+        self.assertEqual(attachment.blob.file.name, upload.storage_name)
+        self.assertEqual(attachment.size, len(data))
+        with default_storage.open(upload.storage_name) as stored:
+            self.assertEqual(stored.read(), data)
+
+    def test_signed_urls_are_reused_from_cache(self):
+        cache.clear()
+        names = ["finances/1/a/recibo.pdf", "finances/1/b/nota.pdf"]
+        with mock.patch.object(S3Storage, "url", autospec=True, side_effect=lambda storage, name: f"url:{name}") as url:
+            first = uploads.signed_urls(names)
+            second = uploads.signed_urls(names + ["finances/1/c/novo.pdf"])
+
+        self.assertEqual(url.call_count, 3)
+        self.assertEqual(second["finances/1/a/recibo.pdf"], first["finances/1/a/recibo.pdf"])
+
+        with override_settings(ATTACHMENT_URL_CACHE_MARGIN=3600):
+            cache.clear()
+            with mock.patch.object(S3Storage, "url", autospec=True, side_effect=lambda storage, name: name) as url:
+                uploads.signed_urls(names)
+                uploads.signed_urls(names)
+            # URLs que expirariam antes da margem não vão para o cache
+            self.assertEqual(url.call_count, 4)
+
+
+@unittest.skipIf(mock_aws is None, "moto não instalado")
+@override_settings(AWS_STORAGE_BUCKET_NAME=TEST_BUCKET)
+class ProfilePhotoTests(TestCase):
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=TEST_BUCKET)
+        self.user = create_user()
+
+        # As URLs continuam apontando para o MinIO; só o cliente S3 fala com o moto
+        storage_class = type("MotoPublicMediaStorage", (photos.PublicMediaStorage,), {"endpoint_url": None})
+        patcher = mock.patch.object(photos, "PublicMediaStorage", storage_class)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def camera_photo(self):
+        """Foto 800x400 (esquerda vermelha, direita azul) que a câmera marcou para girar 90°."""
+        image = Image.new("RGB", (800, 400), "blue")
+        image.paste("red", (0, 0, 400, 400))
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", exif=exif)
+        return buffer.getvalue()
+
+    def test_variants_are_rotated_and_resized(self):
+        variants = photos.render_variants(self.camera_photo())
+
+        self.assertEqual(sorted(variants), sorted(photos.PHOTO_SIZES))
+        with Image.open(io.BytesIO(variants[64]["webp"])) as small:
+            self.assertEqual(small.size, (64, 64))
+            # Depois da rotação, o lado vermelho fica em cima
+            self.assertGreater(small.getpixel((32, 2))[0], 200)
+            self.assertGreater(small.getpixel((32, 61))[2], 200)
+
+    def test_processing_publishes_variants_and_keeps_original(self):
+        name = photos.save_original(self.user, ContentFile(self.camera_photo(), name="camera.jpg"))
+        storage = photos.PublicMediaStorage()
+        User.objects.filter(pk=self.user.pk).update(image=photos.public_url(storage, name))
+
+        photos.process_profile_photo(self.user.pk, name)
+
+        self.user.refresh_from_db()
+        self.assertEqual(
+            sorted(self.user.image_variants), sorted([str(size) for size in photos.PHOTO_SIZES] + ["original"])
+        )
+        self.assertEqual(self.user.image, self.user.image_variants["512"]["jpeg"])
+        self.assertTrue(storage.exists(photos.stored_name(self.user.image_variants["64"]["webp"])))
+        # A URL devolvida pelo upload continua válida até a foto ser trocada
+        self.assertTrue(storage.exists(name))
+        self.assertFalse(StorageDeletion.objects.exists())
+        self.assertIn(name, photos.stored_names(self.user))
+
+    def test_worker_closes_connections_around_each_job(self):
+        calls = []
+
+        def failing_job(*args):
+            calls.append("job")
+            raise RuntimeError
+
+        with (
+            mock.patch.object(photos, "close_old_connections", lambda: calls.append("close")),
+            mock.patch.object(photos, "process_profile_photo", failing_job),
+            self.assertLogs("app.photos", "ERROR"),
+        ):
+            photos._run(self.user.pk, "foto.jpg")
+        # Também depois de uma falha
+        self.assertEqual(calls, ["close", "job", "close"])
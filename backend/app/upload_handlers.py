@@ -0,0 +1,264 @@
+"""
+Leitura dos uploads com limites por endpoint.
+
+``BoundedUploadHandler`` substitui os handlers padrão do Django na requisição:
+confere tamanho e quantidade de arquivos enquanto o corpo é lido (e pelo
+Content-Length, antes de ler), identifica o tipo real pelos primeiros bytes e
+calcula o SHA-256 de cada arquivo. Arquivos pequenos ficam em memória; os
+maiores vão direto para o storage num upload multipart (quando o endpoint
+permite) ou, senão, para um arquivo temporário.
+"""
+import hashlib
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from ninja.errors import HttpError
+
+from .uploads import new_streamed_key
+
+MB = 1024 * 1024
+# Partes do multipart do S3 precisam de pelo menos 5 MB (exceto a última)
+STREAM_PART_SIZE = 8 * MB
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+TEXT_TYPES = {"text/plain"}
+# Tipos de texto que o cliente pode declarar para um arquivo detectado como
+# texto; qualquer outro (text/html, image/svg+xml...) é gravado como text/plain,
+# para que o navegador nunca renderize o anexo como página
+DECLARED_TEXT_TYPES = {"text/plain", "text/csv"}
+
+UPLOAD_RULES = {
+    "attachments": {
+        "content_types": IMAGE_TYPES | TEXT_TYPES | {"application/pdf", "image/heic"},
+        "max_file_setting": "ATTACHMENT_MAX_FILE_MB",
+        "max_request_setting": "ATTACHMENT_MAX_REQUEST_MB",
+        "max_files": 20,
+    },
+    "photo": {
+        "content_types": IMAGE_TYPES,
+        "max_file_setting": "PROFILE_PHOTO_MAX_MB",
+        "max_request_setting": "PROFILE_PHOTO_MAX_MB",
+        "max_files": 1,
+    },
+    "import": {
+        "content_types": TEXT_TYPES,
+        "max_file_setting": "IMPORT_MAX_MB",
+        "max_request_setting": "IMPORT_MAX_MB",
+        "max_files": 1,
+    },
+}
+
+SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_content_type(head):
+    """Tipo do arquivo pelos primeiros bytes (o Content-Type do cliente não é confiável)."""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"heif", b"mif1"):
+        return "image/heic"
+    if b"\x00" not in head[:1024]:
+        # CSV, OFX, TXT...
+        return "text/plain"
+    return "application/octet-stream"
+
+
+def get_limits(kind):
+    rule = UPLOAD_RULES[kind]
+    max_file = getattr(settings, rule["max_file_setting"]) * MB
+    return {
+        "content_types": rule["content_types"],
+        "max_file_size": max_file,
+        "max_request_size": max(max_file, getattr(settings, rule["max_request_setting"]) * MB),
+        "max_files": rule["max_files"],
+    }
+
+
+class _MultipartWriter:
+    """Envia um objeto ao S3 em partes, à medida que os bytes chegam."""
+
+    def __init__(self, storage, name, content_type):
+        self.client = storage.connection.meta.client
+        self.params = {"Bucket": storage.bucket_name, "Key": storage._normalize_name(name)}
+        self.upload_id = self.client.create_multipart_upload(**self.params, ContentType=content_type)["UploadId"]
+        self.parts = []
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= STREAM_PART_SIZE:
+            self._send_part()
+
+    def _send_part(self):
+        number = len(self.parts) + 1
+        response = self.client.upload_part(
+            **self.params, UploadId=self.upload_id, PartNumber=number, Body=bytes(self.buffer)
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": number})
+        self.buffer = bytearray()
+
+    def complete(self):
+        if self.buffer or not self.parts:
+            self._send_part()
+        self.client.complete_multipart_upload(
+            **self.params, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+        )
+
+    def abort(self):
+        self.client.abort_multipart_upload(**self.params, UploadId=self.upload_id)
+
+
+class StreamedUploadedFile(UploadedFile):
+    """Arquivo que já foi gravado no storage durante a leitura da requisição."""
+
+    def __init__(self, storage, storage_name, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.storage = storage
+        self.storage_name = storage_name
+
+    def open(self, mode="rb"):
+        self.file = self.storage.open(self.storage_name, mode)
+        return self
+
+    def chunks(self, chunk_size=None):
+        if self.file is None:
+            self.open()
+        return super().chunks(chunk_size)
+
+
+class BoundedUploadHandler(FileUploadHandler):
+    def __init__(self, request, limits, storage=None):
+        super().__init__(request)
+        self.limits = limits
+        self.storage = storage
+        self.received = 0
+        self.count = 0
+        self.streamed = []
+        self.writer = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Rejeita pelo tamanho declarado, antes de ler o corpo
+        if content_length and content_length > self.limits["max_request_size"]:
+            self._reject(413, f"O envio passa do limite de {self.limits['max_request_size'] // MB} MB.")
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.count += 1
+        if self.count > self.limits["max_files"]:
+            self._reject(400, f"Envie no máximo {self.limits['max_files']} arquivo(s).")
+        self.digest = hashlib.sha256()
+        self.buffer = BytesIO()
+        self.spool = None
+        self.writer = None
+        self.sniffed = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if start + len(raw_data) > self.limits["max_file_size"]:
+            self._reject(413, f"O arquivo {self.file_name} passa do limite de {self.limits['max_file_size'] // MB} MB.")
+        if self.received > self.limits["max_request_size"]:
+            self._reject(413, f"O envio passa do limite de {self.limits['max_request_size'] // MB} MB.")
+
+        if start == 0:
+            self.sniffed = sniff_content_type(raw_data)
+            if self.sniffed not in self.limits["content_types"]:
+                self._reject(415, f"Tipo de arquivo não permitido: {self.file_name}")
+
+        self.digest.update(raw_data)
+        target = self.writer or self.spool or self.buffer
+        target.write(raw_data)
+        if target is self.buffer and self.buffer.tell() > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            self._leave_memory()
+
+    def _leave_memory(self):
+        data = self.buffer.getvalue()
+        self.buffer = None
+        if self.storage is not None:
+            self.stream_name = new_streamed_key()
+            self.writer = _MultipartWriter(self.storage, self.stream_name, self.resolved_content_type)
+            self.writer.write(data)
+        else:
+            self.spool = TemporaryUploadedFile(
+                self.file_name, self.resolved_content_type, 0, self.charset, self.content_type_extra
+            )
+            self.spool.write(data)
+
+    @property
+    def resolved_content_type(self):
+        # Para texto, o tipo declarado (text/csv) é mais específico que o detectado
+        declared = (self.content_type or "").lower()
+        if self.sniffed == "text/plain" and declared in DECLARED_TEXT_TYPES:
+            return declared
+        return self.sniffed
+
+    def file_complete(self, file_size):
+        if self.sniffed is None:
+            self._reject(400, f"Arquivo vazio: {self.file_name}")
+
+        if self.writer is not None:
+            self.writer.complete()
+            self.writer = None
+            self.streamed.append(self.stream_name)
+            upload = StreamedUploadedFile(
+                self.storage, self.stream_name, self.file_name, self.resolved_content_type, file_size, self.charset,
+                self.content_type_extra,
+            )
+        elif self.spool is not None:
+            upload = self.spool
+            upload.file.seek(0)
+            upload.size = file_size
+        else:
+            self.buffer.seek(0)
+            upload = InMemoryUploadedFile(
+                self.buffer, self.field_name, self.file_name, self.resolved_content_type, file_size,
+                self.charset, self.content_type_extra,
+            )
+        upload.sha256 = self.digest.hexdigest()
+        return upload
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _discard(self):
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+        for name in self.streamed:
+            self.storage.delete(name)
+        self.streamed = []
+
+    def _reject(self, status, message):
+        self._discard()
+        raise HttpError(status, message)
+
+
+def limit_uploads(kind, stream_to_storage=False):
+    """
+    Decorador (via ``decorate_view``) que aplica os limites de ``kind`` aos
+    arquivos da requisição. Com ``stream_to_storage``, arquivos grandes vão
+    direto para o storage padrão em vez de um arquivo temporário.
+    """
+
+    def decorator(run):
+        @wraps(run)
+        def wrapper(request, *args, **kwargs):
+            storage = default_storage if stream_to_storage else None
+            request.upload_handlers = [BoundedUploadHandler(request, get_limits(kind), storage)]
+            return run(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,237 @@
+"""
+Upload de anexos direto para o storage (S3/MinIO) com URLs pré-assinadas.
+
+A API só assina a URL de PUT e, depois, confere o objeto enviado: os bytes
+vão do cliente para o bucket sem passar pelo Django. Uploads que passam pela
+API (multipart) são deduplicados pelo SHA-256 do conteúdo (um único objeto por
+conteúdo, com contagem de referências) e enviados ao bucket em paralelo.
+
+As URLs assinadas de leitura ficam no cache até pouco antes de expirarem, para
+não recalcular a assinatura S3v4 de cada anexo a cada requisição.
+
+Nas operações async, as chamadas ao storage (boto3 é bloqueante) rodam num
+pool de threads próprio, via ``run_storage_io``, sem travar o loop.
+"""
+import asyncio
+import functools
+import hashlib
+import posixpath
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils.text import get_valid_filename
+
+from .models import AttachmentBlob, FinanceAttachment
+
+ATTACHMENTS_LOCATION = "finances"
+
+_io_executor = None
+
+
+def attachment_prefix(finance_id):
+    return f"{ATTACHMENTS_LOCATION}/{finance_id}/"
+
+
+def new_attachment_key(finance_id, filename):
+    """Chave única do objeto; o nome original só entra para facilitar a leitura no bucket."""
+    name = get_valid_filename(posixpath.basename(filename or "")) or "arquivo"
+    return f"{attachment_prefix(finance_id)}{uuid.uuid4().hex}/{name}"
+
+
+def _io_pool():
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "STORAGE_IO_WORKERS", 32), thread_name_prefix="storage-io"
+        )
+    return _io_executor
+
+
+async def run_storage_io(func, *args, **kwargs):
+    """Executa uma chamada bloqueante ao storage (sem uso do banco) fora do loop de eventos."""
+    return await asyncio.get_running_loop().run_in_executor(_io_pool(), functools.partial(func, *args, **kwargs))
+
+
+def _client(storage):
+    return storage.connection.meta.client
+
+
+def presign_put(key, content_type, storage=None):
+    """URL para o cliente enviar o arquivo com PUT (o Content-Type enviado deve ser o mesmo)."""
+    storage = storage or default_storage
+    return _client(storage).generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": storage.bucket_name,
+            "Key": storage._normalize_name(key),
+            "ContentType": content_type,
+        },
+        ExpiresIn=getattr(settings, "ATTACHMENT_UPLOAD_URL_EXPIRE", 900),
+        HttpMethod="PUT",
+    )
+
+
+def stat_object(key, storage=None):
+    """Tamanho e tipo do objeto no bucket, ou None se ele não existir."""
+    storage = storage or default_storage
+    try:
+        head = _client(storage).head_object(Bucket=storage.bucket_name, Key=storage._normalize_name(key))
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return {"size": head["ContentLength"], "content_type": head.get("ContentType")}
+
+
+def content_digest(file):
+    """SHA-256 do arquivo, lido em pedaços (o arquivo volta ao início)."""
+    if getattr(file, "sha256", None):
+        # Já calculado pelo BoundedUploadHandler durante a leitura
+        return file.sha256
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def new_blob_key(digest):
+    # O sufixo aleatório evita que um blob recriado reaproveite a chave de um objeto sendo apagado
+    return f"{ATTACHMENTS_LOCATION}/blobs/{digest}/{uuid.uuid4().hex[:8]}"
+
+
+def new_streamed_key():
+    """Chave de um arquivo enviado ao storage enquanto a requisição é lida (hash ainda desconhecido)."""
+    return f"{ATTACHMENTS_LOCATION}/blobs/streamed/{uuid.uuid4().hex}"
+
+
+def _upload_blobs(pool, storage, files_by_digest, uploaded):
+    """Envia os conteúdos em paralelo; ``uploaded`` recebe digest -> objeto mesmo se algum falhar."""
+    futures = {}
+    for digest, file in files_by_digest.items():
+        if getattr(file, "storage_name", None):
+            # Já está no bucket (veio em streaming): o objeto vira o blob sem novo envio
+            uploaded[digest] = file.storage_name
+        else:
+            futures[digest] = pool.submit(storage.save, new_blob_key(digest), file)
+    wait(futures.values())
+    for digest, future in futures.items():
+        if future.exception() is None:
+            uploaded[digest] = future.result()
+    for future in futures.values():
+        if future.exception() is not None:
+            raise future.exception()
+
+
+def _reference_blobs(digests, files, uploaded):
+    """
+    Trava os blobs usados (criando os novos) e soma as referências. Retorna None
+    se algum blob conhecido foi apagado em paralelo e precisa ser reenviado.
+    """
+    sizes = dict(zip(digests, (file.size or 0 for file in files)))
+    AttachmentBlob.objects.bulk_create(
+        [AttachmentBlob(sha256=digest, file=name, size=sizes[digest]) for digest, name in uploaded.items()],
+        ignore_conflicts=True,
+    )
+    blobs = AttachmentBlob.objects.select_for_update().in_bulk(set(digests), field_name="sha256")
+    if len(blobs) < len(set(digests)):
+        return None
+
+    by_count = defaultdict(list)
+    for digest, count in Counter(digests).items():
+        by_count[count].append(blobs[digest].pk)
+    for count, ids in by_count.items():
+        AttachmentBlob.objects.filter(pk__in=ids).update(ref_count=F("ref_count") + count)
+    return blobs
+
+
+def _discard_unreferenced(pool, storage, names):
+    """Apaga objetos enviados que não ficaram ligados a nenhum blob (falha ou envio concorrente)."""
+    names = set(names)
+    names -= set(AttachmentBlob.objects.filter(file__in=names).values_list("file", flat=True))
+    wait([pool.submit(storage.delete, name) for name in names])
+
+
+def save_attachments(finance, files, user, storage=None):
+    """
+    Cria os anexos de uma finança com deduplicação por conteúdo.
+
+    Cada arquivo é identificado pelo SHA-256; só o conteúdo que ainda não está
+    no bucket é enviado (em paralelo) e os anexos passam a referenciar o blob
+    compartilhado, criados com um único ``bulk_create``. Se algum envio (ou a
+    gravação no banco) falhar, os objetos enviados aqui são removidos.
+    """
+    storage = storage or default_storage
+    workers = max(1, min(getattr(settings, "ATTACHMENT_UPLOAD_WORKERS", 4), len(files)))
+    uploaded = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(content_digest, files))
+        try:
+            while True:
+                known = set(AttachmentBlob.objects.filter(sha256__in=digests).values_list("sha256", flat=True))
+                missing = {d: f for d, f in zip(digests, files) if d not in known and d not in uploaded}
+                _upload_blobs(pool, storage, missing, uploaded)
+
+                with transaction.atomic():
+                    blobs = _reference_blobs(digests, files, uploaded)
+                    if blobs is None:
+                        transaction.set_rollback(True)
+                        continue
+                    attachments = FinanceAttachment.objects.bulk_create(
+                        FinanceAttachment(
+                            finance=finance,
+                            blob=blobs[digest],
+                            file=blobs[digest].file.name,
+                            name=file.name or "",
+                            content_type=file.content_type or "application/octet-stream",
+                            size=file.size or 0,
+                            created_by=user,
+                        )
+                        for digest, file in zip(digests, files)
+                    )
+                break
+        finally:
+            streamed = [file.storage_name for file in files if getattr(file, "storage_name", None)]
+            _discard_unreferenced(pool, storage, [*uploaded.values(), *streamed])
+
+    return attachments
+
+
+def _url_cache_key(name):
+    return "attachment_url:" + hashlib.sha256(name.encode()).hexdigest()
+
+
+def signed_urls(names, storage=None):
+    """URLs de leitura (nome do objeto -> URL), assinando só as que não estão no cache."""
+    storage = storage or default_storage
+    keys = {name: _url_cache_key(name) for name in names}
+    cached = cache.get_many(keys.values())
+
+    urls, signed = {}, {}
+    for name, key in keys.items():
+        if key in cached:
+            urls[name] = cached[key]
+        else:
+            urls[name] = signed[key] = storage.url(name)
+
+    # A URL sai do cache antes de expirar, para o cliente ainda ter tempo de usá-la
+    timeout = getattr(storage, "querystring_expire", 0) - getattr(settings, "ATTACHMENT_URL_CACHE_MARGIN", 300)
+    if signed and timeout > 0:
+        cache.set_many(signed, timeout)
+    return urls
+
+
+def set_file_urls(attachments):
+    """Preenche ``file_url`` de cada anexo com uma única consulta ao cache."""
+    urls = signed_urls([attachment.file.name for attachment in attachments])
+    for attachment in attachments:
+        attachment.file_url = urls[attachment.file.name]
+    return attachments
@@ -2,8 +2,13 @@ from app.api import router as app_router
 from ninja import NinjaAPI
 
 from .auth import AuthBearer
+from .renderers import ORJSONRenderer
 
 class API(NinjaAPI):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("renderer", ORJSONRenderer())
+        super().__init__(*args, **kwargs)
+
     def get_openapi_operation_id(self, operation) -> str:
         name = operation.view_func.__name__
         return name.replace(".", "_")
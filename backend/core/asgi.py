@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from core.limits import MB, RequestBodyLimit
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Recusa corpos grandes antes de o Django gravá-los em disco
+application = RequestBodyLimit(django_application, settings.MAX_REQUEST_BODY_MB * MB)
+
+# Streams SSE (/api/events): a conexão em LISTEN já fica pronta ao subir o processo
+from app import events  # noqa: E402
+
+events.start_listener()
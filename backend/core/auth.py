@@ -1,19 +1,129 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 from app.models import Session
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
 from django.utils import timezone
 from ninja.security import HttpBearer
 from ninja.errors import HttpError
 
+
+class TokenCache:
+    """
+    Cache de token -> (usuário, expiração da sessão), LRU com TTL, local ao processo.
+
+    Se ``AUTH_TOKEN_CACHE_ALIAS`` apontar para um cache do Django (ex.: Redis),
+    as entradas também são compartilhadas entre processos.
+
+    Janela de revogação: o ``expires_at`` da sessão é conferido a cada
+    requisição, mas uma sessão apagada fora do Django (logout ou revogação
+    feitos pelo better-auth no frontend) continua aceita por até ``ttl``
+    segundos em cada processo que já tinha o token em cache. O proxy do Next só
+    encaminha tokens de sessões vivas, então a janela vale para quem chama a API
+    direto com o token. ``AUTH_TOKEN_CACHE_TTL=0`` desliga o cache.
+    """
+
+    def __init__(self, maxsize, ttl, alias=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return "auth:session:" + hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                user, expires_at, _ = entry
+                return user, expires_at
+            self._entries.pop(key, None)
+
+        if self.alias:
+            shared = caches[self.alias].get(key)
+            if shared:
+                self._store(key, *shared)
+                return shared
+        return None
+
+    def set(self, token, user, expires_at):
+        key = self._key(token)
+        self._store(key, user, expires_at)
+        if self.alias:
+            timeout = min(self.ttl, (expires_at - timezone.now()).total_seconds())
+            if timeout > 0:
+                caches[self.alias].set(key, (user, expires_at), timeout)
+
+    def delete(self, token):
+        key = self._key(token)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.alias:
+            caches[self.alias].delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, user, expires_at):
+        with self._lock:
+            self._entries[key] = (user, expires_at, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+    alias=getattr(settings, "AUTH_TOKEN_CACHE_ALIAS", None),
+)
+
+
+def invalidate_tokens(tokens):
+    """
+    Remove tokens do cache (chamar sempre que o Django apagar sessões). Só
+    alcança o cache deste processo e o compartilhado; nos demais processos a
+    entrada expira pelo TTL (ver ``TokenCache``).
+    """
+    for token in tokens:
+        token_cache.delete(token)
+
+
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token):
-        try:
-            session = Session.objects.select_related("user").get(token=token)
-        except Session.DoesNotExist:
-            raise HttpError(401, "Sessão inválida ou expirada")
-        
-        if not session:
-            return None
-        
-        if session.expires_at < timezone.now():
+        cached = token_cache.get(token)
+        if cached:
+            user, expires_at = cached
+        else:
+            try:
+                session = Session.objects.select_related("user").get(token=token)
+            except Session.DoesNotExist:
+                raise HttpError(401, "Sessão inválida ou expirada")
+            user, expires_at = session.user, session.expires_at
+            token_cache.set(token, user, expires_at)
+
+        if expires_at < timezone.now():
+            token_cache.delete(token)
             return None
-        
-        return session.user
\ No newline at end of file
+
+        # Cada requisição recebe sua própria cópia do usuário em cache
+        return copy.copy(user)
+
+
+class AsyncAuthBearer(AuthBearer):
+    """AuthBearer para operações async: a consulta ao banco (se o token não estiver em cache) roda fora do loop."""
+
+    async def __call__(self, request):
+        return await sync_to_async(super().__call__)(request)
@@ -0,0 +1,56 @@
+"""
+Limite de tamanho do corpo das requisições no ASGI.
+
+O handler ASGI do Django grava o corpo inteiro num arquivo temporário antes de
+montar a requisição, então os limites por endpoint dos uploads
+(``app.upload_handlers``) só seriam conferidos depois de tudo recebido. Este
+wrapper recusa com 413 já pelo Content-Length e, sem ele (chunked), interrompe
+a leitura assim que o corpo passa do teto.
+"""
+import orjson
+
+MB = 1024 * 1024
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+class RequestBodyLimit:
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestBodyTooLarge
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        except RequestBodyTooLarge:
+            # O corpo é lido antes da view, então a resposta ainda não começou
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = orjson.dumps({"detail": f"A requisição passa do limite de {self.max_bytes // MB} MB."})
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,37 @@
+"""
+Renderer JSON da API, com orjson.
+
+Gera o mesmo JSON do renderer padrão do ninja (datas no formato do
+``DjangoJSONEncoder``, Decimal como string), mas a codificação roda em C.
+"""
+import orjson
+from django.http import HttpResponse
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    # Datas passam pelo encoder do Django para manter o formato atual (milissegundos e "Z")
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def __init__(self):
+        self.default = NinjaJSONEncoder().default
+
+    def render(self, request, data, *, response_status):
+        return orjson.dumps(data, default=self.default, option=self.option)
+
+
+renderer = ORJSONRenderer()
+
+
+def render_json(data, status=200):
+    """
+    Resposta JSON sem a validação do schema de resposta, para dados que já
+    estão no formato de saída (ex.: linhas montadas de ``.values_list()``).
+    """
+    return HttpResponse(
+        renderer.render(None, data, response_status=status),
+        status=status,
+        content_type=f"{renderer.media_type}; charset={renderer.charset}",
+    )
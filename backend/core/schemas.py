@@ -1,10 +1,12 @@
 from app.models import User
 from ninja import ModelSchema
-from typing import Optional
+from typing import Dict, Optional
 
 class UserSchema(ModelSchema):
     id: str
     image: Optional[str] = None
+    # Tamanho (px) -> {"webp": url, "jpeg": url}
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     class Meta:
         model = User
-        fields = ["id", "name", "email", "image"]
\ No newline at end of file
+        fields = ["id", "name", "email", "image", "image_variants"]
\ No newline at end of file
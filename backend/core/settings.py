@@ -142,6 +142,21 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
 
+# Cache de autenticação (token -> usuário). Sessões apagadas pelo better-auth
+# (logout, revogação) ainda valem por até AUTH_TOKEN_CACHE_TTL segundos; 0 desliga
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+# Alias de um cache do Django para compartilhar entre processos (ex.: "default")
+AUTH_TOKEN_CACHE_ALIAS = os.getenv("AUTH_TOKEN_CACHE_ALIAS") or None
+
+# Cache do escopo de família entre requisições: só com um cache compartilhado
+# entre processos (ex.: Redis), senão a saída de um membro não chegaria aos
+# outros workers. Sem alias, o escopo é resolvido a cada requisição.
+FAMILY_SCOPE_CACHE_ALIAS = os.getenv("FAMILY_SCOPE_CACHE_ALIAS") or None
+# Tempo (s) que o escopo de família de cada usuário fica no cache
+FAMILY_SCOPE_CACHE_TTL = int(os.getenv("FAMILY_SCOPE_CACHE_TTL", "300"))
+
+
 # Storage MinIO via django-storages
 STORAGES = {
     "default": {
@@ -164,6 +179,26 @@ AWS_S3_SIGNATURE_VERSION = os.getenv("AWS_S3_SIGNATURE_VERSION", "s3v4")
 AWS_QUERYSTRING_AUTH = True
 AWS_QUERYSTRING_EXPIRE = 3600
 
+# URLs assinadas de anexos ficam em cache até este tempo (s) antes de expirar
+ATTACHMENT_URL_CACHE_MARGIN = int(os.getenv("ATTACHMENT_URL_CACHE_MARGIN", "300"))
+
+# Validade (s) das URLs de upload direto de anexos
+ATTACHMENT_UPLOAD_URL_EXPIRE = int(os.getenv("ATTACHMENT_UPLOAD_URL_EXPIRE", "900"))
+
+# Limites de upload (MB), conferidos enquanto o corpo da requisição é lido
+ATTACHMENT_MAX_FILE_MB = int(os.getenv("ATTACHMENT_MAX_FILE_MB", "25"))
+ATTACHMENT_MAX_REQUEST_MB = int(os.getenv("ATTACHMENT_MAX_REQUEST_MB", "100"))
+PROFILE_PHOTO_MAX_MB = int(os.getenv("PROFILE_PHOTO_MAX_MB", "10"))
+IMPORT_MAX_MB = int(os.getenv("IMPORT_MAX_MB", "20"))
+# Teto do corpo de qualquer requisição no ASGI (core/asgi.py): o Django lê o
+# corpo inteiro antes da view, então os limites acima só valem depois disso
+MAX_REQUEST_BODY_MB = int(
+    os.getenv("MAX_REQUEST_BODY_MB", str(max(ATTACHMENT_MAX_REQUEST_MB, PROFILE_PHOTO_MAX_MB, IMPORT_MAX_MB)))
+)
+
+# Envios simultâneos ao storage por requisição de upload de anexos
+ATTACHMENT_UPLOAD_WORKERS = int(os.getenv("ATTACHMENT_UPLOAD_WORKERS", "4"))
+
 # Arquivos padrão (privados)
 DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
 
@@ -171,3 +206,15 @@ DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
 AWS_PUBLIC_MEDIA_LOCATION = "profile_photos"
 AWS_PUBLIC_MEDIA_DEFAULT_ACL = "public-read"
 PUBLIC_FILE_STORAGE = "app.storage_backends.PublicMediaStorage"
+
+# Threads que geram as variantes das fotos de perfil
+PROFILE_PHOTO_WORKERS = int(os.getenv("PROFILE_PHOTO_WORKERS", "2"))
+
+# Threads para chamadas ao storage feitas pelas operações async (ASGI)
+STORAGE_IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS", "32"))
+
+# Sincronização incremental: acima disso, o cliente recebe "reset" e recarrega a listagem
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "1000"))
+
+# Intervalo (s) do comentário de keep-alive nos streams de eventos (SSE)
+EVENTS_HEARTBEAT = int(os.getenv("EVENTS_HEARTBEAT", "15"))
@@ -185,7 +185,11 @@ export default function FamilyPage() {
                 <div className="flex items-center gap-3 min-w-0 flex-1 overflow-hidden">
                   <Avatar className="flex-shrink-0">
                     <AvatarImage
-                      src={user.image || undefined}
+                      src={
+                        user.image_variants?.["128"]?.webp ||
+                        user.image ||
+                        undefined
+                      }
                       alt={user.name || "Usuário"}
                     />
                     <AvatarFallback>
@@ -1,8 +1,9 @@
 "use client"
 
 import { useState } from "react"
-import { useQuery, useQueryClient } from "@tanstack/react-query"
+import { useQueryClient } from "@tanstack/react-query"
 import { Finances } from "@/services"
+import { useGoals } from "@/hooks/useGoals"
 import { Button } from "@/components/ui/button"
 import { Plus } from "lucide-react"
 import { GoalCard } from "@/components/goal-card"
@@ -16,10 +17,7 @@ export default function GoalsPage() {
   const [selectedGoal, setSelectedGoal] = useState<any | null>(null)
 
   // --- Buscar lista de metas ---
-  const { data: goals, isLoading } = useQuery({
-    queryKey: ["goals"],
-    queryFn: () => Finances.listGoals(),
-  })
+  const { data: goals, isLoading } = useGoals(true).listGoals
 
   // --- Ver detalhes ---
   async function handleViewGoal(id: number) {
@@ -3,7 +3,7 @@
 import React, { useMemo, useState } from "react";
 import { FinanceChart } from "@/components/finance-chart";
 import { DataTable } from "@/components/data-table";
-import { useFinances } from "@/hooks/useFinances";
+import { useFinances, type FinanceFilters } from "@/hooks/useFinances";
 import { FinanceCreateCard } from "@/components/finance-create-card";
 import { useDeleteFinance } from "@/hooks/useDeleteFinance";
 import { useFinanceCreate } from "@/hooks/useFinanceCreate";
@@ -12,51 +12,41 @@ import { set, z } from "zod";
 import { SearchBar, Filters } from "@/components/search-bar";
 import { ExportFinanceCard } from "@/components/export-finance-card";
 import { FinanceAttachmentCard } from "@/components/finance-attachment-card";
+import { Button } from "@/components/ui/button";
 
 import type { FinanceSchema as ApiFinance } from "@/services/types.gen";
 
 type FinanceRow = z.infer<typeof schema>;
 
+// Filtros da barra de busca no formato da API (os vazios ficam de fora da queryKey)
+function toFinanceFilters(filters: Filters): FinanceFilters {
+  const params: FinanceFilters = {
+    title: filters.title?.trim(),
+    type: filters.type,
+    status: filters.status,
+    category: filters.category?.trim(),
+    dueDate: filters.due_date,
+    dateFrom: filters.payment_date,
+    dateTo: filters.payment_date,
+  };
+  return Object.fromEntries(Object.entries(params).filter(([, value]) => value)) as FinanceFilters;
+}
+
 export default function Page() {
-  const { data, isLoading, isError } = useFinances(true);
+  const [filters, setFilters] = useState<Filters>({});
+  const apiFilters = useMemo(() => toFinanceFilters(filters), [filters]);
+  // Filtrado no backend: a busca considera todos os registros, não só as páginas carregadas
+  const { data, isLoading, isError, hasMore, isLoadingMore, loadMore } = useFinances(true, apiFilters);
   const { mutate: deleteFinance } = useDeleteFinance();
   const { showCreate, setShowCreate } = useFinanceCreate();
   const [editing, setEditing] = useState<ApiFinance | null>(null);
-  const [filters, setFilters] = useState<Filters>({});
   const [showExport, setShowExport] = useState(false);
   const [attaching, setAttaching] = useState<z.infer<typeof schema> | null>(null)
 
   const rows: FinanceRow[] = useMemo(() => {
     if (!data) return [];
 
-    return data
-      .filter((f) => {
-        if (
-          filters.title &&
-          !f.title.toLowerCase().includes(filters.title.toLowerCase())
-        )
-          return false;
-        if (
-          filters.category &&
-          !f.category?.toLowerCase().includes(filters.category.toLowerCase())
-        )
-          return false;
-        if (filters.status && f.status !== filters.status) return false;
-        if (filters.type && f.type !== filters.type) return false;
-
-        if (filters.due_date) {
-          const due = f.due_date ? f.due_date.slice(0, 10) : null;
-          if (due !== filters.due_date) return false;
-        }
-
-        if (filters.payment_date) {
-          const pay = f.payment_date ? f.payment_date.slice(0, 10) : null;
-          if (pay !== filters.payment_date) return false;
-        }
-
-        return true;
-      })
-      .map((f) => ({
+    return data.map((f) => ({
         id: Number(f.id),
         title: f.title,
         type: f.type,
@@ -67,7 +57,7 @@ export default function Page() {
         due_date: f.due_date ?? null,
         payment_date: f.payment_date ?? null,
       }));
-  }, [data, filters]);
+  }, [data]);
 
   return (
     <>
@@ -76,7 +66,7 @@ export default function Page() {
         <FinanceCreateCard onClose={() => setEditing(null)} finance={editing} />
       )}
       {showExport && (
-        <ExportFinanceCard onClose={() => setShowExport(false)} data={rows} />
+        <ExportFinanceCard onClose={() => setShowExport(false)} filters={apiFilters} />
       )}
       {attaching && (
         <FinanceAttachmentCard onClose={() => setAttaching(null)} financeId={attaching.id} open={!!attaching} />
@@ -108,6 +98,14 @@ export default function Page() {
               onAttachClick={(row) => setAttaching(row)}
             />
 
+            {hasMore && (
+              <div className="flex justify-center px-4 lg:px-6">
+                <Button variant="outline" onClick={loadMore} disabled={isLoadingMore}>
+                  {isLoadingMore ? "Carregando..." : "Carregar mais registros"}
+                </Button>
+              </div>
+            )}
+
             <div className="px-4 lg:px-6">
               <FinanceChart />
             </div>
@@ -132,7 +132,7 @@ export default function ProfilePage() {
     try {
       const imageUrl = await uploadPhoto.mutateAsync(photo);
       if (imageUrl) {
-        await authClient.updateUser({ image: imageUrl });
+        // O backend já gravou a foto (e troca pela variante ao processar)
         await authClient.getSession();
         setPreview(imageUrl);
         toast.success("Foto de perfil atualizada!");
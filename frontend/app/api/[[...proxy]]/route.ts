@@ -24,24 +24,56 @@ export const GET = async function GET(req: Request) {
     // eslint-disable-next-line @typescript-eslint/no-unused-vars
   } catch (err) {}
 
+  const headers: Record<string, string> = {
+    Authorization: `Bearer ${session?.session?.token}`,
+  };
+  // GET condicional: o backend responde 304 se o ETag ainda vale
+  const ifNoneMatch = req.headers.get("If-None-Match");
+  if (ifNoneMatch) headers["If-None-Match"] = ifNoneMatch;
+
   const res = await fetch(url, {
     method: req.method,
-    headers: {
-      Authorization: `Bearer ${session?.session?.token}`,
-    },
+    headers,
     body,
+    // Encerra a requisição ao backend quando o cliente desconecta (streams SSE)
+    signal: req.signal,
   });
 
   const resContentType = res.headers.get("content-type");
 
-  if (res.status == 204) {
-    return new Response(null, { status: res.status });
+  if (resContentType?.includes("text/event-stream")) {
+    return new Response(res.body, {
+      status: res.status,
+      headers: { "Content-Type": resContentType, "Cache-Control": "no-cache" },
+    });
+  }
+
+  // Downloads (ex.: /finances/export) seguem em streaming, com o nome do arquivo
+  const disposition = res.headers.get("Content-Disposition");
+  if (disposition) {
+    return new Response(res.body, {
+      status: res.status,
+      headers: {
+        "Content-Type": resContentType || "application/octet-stream",
+        "Content-Disposition": disposition,
+      },
+    });
+  }
+
+  // Revalidado a cada uso pelo navegador, que reenvia o ETag em If-None-Match
+  const etag = res.headers.get("ETag");
+  const cacheHeaders: Record<string, string> = etag
+    ? { ETag: etag, "Cache-Control": "private, no-cache" }
+    : {};
+
+  if (res.status == 204 || res.status == 304) {
+    return new Response(null, { status: res.status, headers: cacheHeaders });
   }
 
   if (resContentType?.includes("application/json")) {
     try {
       const data = await res.json();
-      return Response.json(data, { status: res.status });
+      return Response.json(data, { status: res.status, headers: cacheHeaders });
     } catch {
       return new Response(null, { status: res.status });
     }
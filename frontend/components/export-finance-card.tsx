@@ -19,123 +19,53 @@ import { CalendarIcon, FileDown } from "lucide-react";
 import { format } from "date-fns";
 import { ptBR } from "date-fns/locale";
 import { toast } from "sonner";
-import jsPDF from "jspdf";
-import autoTable from "jspdf-autotable";
-import * as XLSX from "xlsx";
+import type { FinanceFilters } from "@/hooks/useFinances";
+
+// Nomes dos parâmetros de /finances/export (os mesmos da listagem)
+const EXPORT_PARAMS: Record<keyof FinanceFilters, string> = {
+  title: "title",
+  type: "type",
+  status: "status",
+  category: "category",
+  dateFrom: "date_from",
+  dateTo: "date_to",
+  dueDate: "due_date",
+};
 
 export function ExportFinanceCard({
   onClose,
-  data,
+  filters,
 }: {
   onClose: () => void;
-  data: any[];
+  filters: FinanceFilters;
 }) {
   const [startDate, setStartDate] = useState<Date | undefined>(undefined);
   const [endDate, setEndDate] = useState<Date | undefined>(undefined);
-  const [formatType, setFormatType] = useState<"pdf" | "excel">("pdf");
-
-  // filtra registros por intervalo
-  function getFiltered() {
-    return data.filter((f) => {
-      const date = f.payment_date
-        ? new Date(f.payment_date)
-        : f.due_date
-          ? new Date(f.due_date)
-          : null;
-      if (!date) return false;
-      if (startDate && date < startDate) return false;
-      if (endDate && date > endDate) return false;
-      return true;
-    });
-  }
+  const [formatType, setFormatType] = useState<"csv" | "xlsx">("csv");
 
+  // Exporta no backend com os filtros da busca; o período (pagamento) escolhido aqui tem prioridade
   function handleExport() {
-    // valida campos
-    if (!startDate || !endDate) {
-      toast.error("Selecione a data de início e fim.");
-      return;
-    }
-
-    if (startDate > endDate) {
+    if (startDate && endDate && startDate > endDate) {
       toast.error("A data de início não pode ser maior que a data fim.");
       return;
     }
 
-    const filtered = getFiltered();
-    if (!filtered.length) {
-      toast.error("Nenhum registro encontrado para o período selecionado.");
-      return;
-    }
+    const selected: FinanceFilters = { ...filters };
+    if (startDate) selected.dateFrom = format(startDate, "yyyy-MM-dd");
+    if (endDate) selected.dateTo = format(endDate, "yyyy-MM-dd");
 
-    try {
-      if (formatType === "pdf") {
-        generatePDF(filtered);
-      } else {
-        generateExcel(filtered);
-      }
-      toast.success("Exportação realizada com sucesso!");
-    } catch (err) {
-      toast.error("Erro ao exportar os registros.");
+    const params = new URLSearchParams({ format: formatType });
+    for (const [key, value] of Object.entries(selected)) {
+      if (value) params.set(EXPORT_PARAMS[key as keyof FinanceFilters], value);
     }
-  }
-
-  // ---------------- PDF ----------------
-  function generatePDF(records: any[]) {
-    const doc = new jsPDF();
-
-    doc.setFontSize(14);
-    doc.text("Histórico de Registros Financeiros", 14, 20);
-
-    autoTable(doc, {
-      startY: 30,
-      head: [
-        [
-          "Título",
-          "Tipo",
-          "Status",
-          "Categoria",
-          "Valor (R$)",
-          "Vencimento",
-          "Pagamento",
-        ],
-      ],
-      body: records.map((r) => [
-        r.title,
-        r.type,
-        r.status,
-        r.category || "-",
-        Number(r.value).toFixed(2),
-        r.due_date ? format(new Date(r.due_date), "dd/MM/yyyy") : "-",
-        r.payment_date ? format(new Date(r.payment_date), "dd/MM/yyyy") : "-",
-      ]),
-      styles: { fontSize: 10 },
-      headStyles: { fillColor: [41, 128, 185] },
-    });
-
-    doc.save("registros.pdf");
-  }
-
-  // ---------------- Excel ----------------
-  function generateExcel(records: any[]) {
-    const worksheet = XLSX.utils.json_to_sheet(
-      records.map((r) => ({
-        Título: r.title,
-        Tipo: r.type,
-        Status: r.status,
-        Categoria: r.category || "-",
-        "Valor (R$)": Number(r.value).toFixed(2),
-        "Data Vencimento": r.due_date
-          ? format(new Date(r.due_date), "dd/MM/yyyy")
-          : "-",
-        "Data Pagamento": r.payment_date
-          ? format(new Date(r.payment_date), "dd/MM/yyyy")
-          : "-",
-      }))
-    );
 
-    const workbook = XLSX.utils.book_new();
-    XLSX.utils.book_append_sheet(workbook, worksheet, "Registros");
-    XLSX.writeFile(workbook, "registros.xlsx");
+    // O navegador baixa o arquivo em streaming, sem carregar os registros na página
+    const link = document.createElement("a");
+    link.href = `/api/finances/export?${params}`;
+    link.download = `registros.${formatType}`;
+    link.click();
+    toast.success("Exportação iniciada!");
+    onClose();
   }
 
   return (
@@ -196,15 +126,15 @@ export function ExportFinanceCard({
           {/* Seleção do formato */}
           <div className="flex gap-4">
             <Button
-              variant={formatType === "pdf" ? "default" : "outline"}
-              onClick={() => setFormatType("pdf")}
+              variant={formatType === "csv" ? "default" : "outline"}
+              onClick={() => setFormatType("csv")}
               className="flex-1"
             >
-              PDF
+              CSV
             </Button>
             <Button
-              variant={formatType === "excel" ? "default" : "outline"}
-              onClick={() => setFormatType("excel")}
+              variant={formatType === "xlsx" ? "default" : "outline"}
+              onClick={() => setFormatType("xlsx")}
               className="flex-1"
             >
               Excel
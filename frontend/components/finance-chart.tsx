@@ -13,7 +13,6 @@ import {
 } from "recharts"
 import { AlertTriangle, HelpCircle } from "lucide-react"
 import {
-  parseISO,
   format,
   eachDayOfInterval,
   eachMonthOfInterval,
@@ -21,9 +20,8 @@ import {
 import { ptBR } from "date-fns/locale"
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
-import { useFinances } from "@/hooks/useFinances"
+import { useFinanceSummary } from "@/hooks/useFinanceSummary"
 import { useSpendingLimit } from "@/hooks/useSpendingLimit"
-import type { FinanceSchema } from "@/services/types.gen"
 import {
   DropdownMenu,
   DropdownMenuTrigger,
@@ -85,7 +83,6 @@ function CustomTooltip({ active, payload, label }: any) {
 }
 
 export function FinanceChart() {
-  const { data: finances = [] } = useFinances(true)
   const { spendingLimit } = useSpendingLimit(true)
   const [view, setView] = React.useState("3m") // padrão = últimos 3 meses
 
@@ -126,6 +123,19 @@ export function FinanceChart() {
   }
 
   const range = getDateRange()
+  const daily = view === "7d" || view === "1m"
+
+  // totais agregados no servidor, apenas para o intervalo exibido
+  const { data: buckets = [] } = useFinanceSummary(
+    {
+      period: daily ? "day" : "month",
+      dateFrom: format(range[0], "yyyy-MM-dd"),
+      dateTo: daily
+        ? format(range[range.length - 1], "yyyy-MM-dd")
+        : format(new Date(today.getFullYear(), today.getMonth() + 1, 0), "yyyy-MM-dd"),
+    },
+    true
+  )
 
   // inicia estrutura de dados vazia
   const grouped: Record<
@@ -153,26 +163,12 @@ export function FinanceChart() {
   })
 
   // acumula dados
-  finances.forEach((f: FinanceSchema) => {
-    const date = f.payment_date
-      ? parseISO(f.payment_date)
-      : f.due_date
-      ? parseISO(f.due_date)
-      : null
-    if (!date) return
-
-    const key =
-      view === "7d" || view === "1m"
-        ? format(date, "yyyy-MM-dd")
-        : `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, "0")}`
-
+  buckets.forEach((b) => {
+    const key = daily ? b.period : b.period.slice(0, 7)
     if (!(key in grouped)) return
 
-    if (f.type === "Receita") {
-      grouped[key].receita += Number(f.value)
-    } else if (f.type === "Despesa") {
-      grouped[key].despesa += Number(f.value)
-    }
+    grouped[key].receita += Number(b.income)
+    grouped[key].despesa += Number(b.expense)
   })
 
   const chartData = Object.values(grouped)
@@ -10,6 +10,7 @@ import { Progress } from "@/components/ui/progress";
 import { X, Trash2, Pencil } from "lucide-react";
 import { GoalFormDialog } from "./goal-form-dialog";
 import { useGoals } from "@/hooks/useGoals";
+import { useGoalRecords } from "@/hooks/useGoalRecords";
 
 interface GoalDetailsProps {
   goal: any;
@@ -22,6 +23,8 @@ export default function GoalDetails({ goal, onClose }: GoalDetailsProps) {
   const [amount, setAmount] = useState("0,00");
   const [editOpen, setEditOpen] = useState(false);
   const [currentGoal, setCurrentGoal] = useState(goal);
+  const goalRecords = useGoalRecords(goal.id);
+  const records = goalRecords.data?.pages.flatMap((page) => page.items) ?? [];
   const notifiedRef = useRef<{
     deadlineWarning?: boolean;
     deadlineReached?: boolean;
@@ -230,8 +233,8 @@ export default function GoalDetails({ goal, onClose }: GoalDetailsProps) {
           <div className="mb-6">
             <h3 className="font-bold mb-2">Histórico</h3>
             <ul className="max-h-48 overflow-y-auto space-y-1">
-              {currentGoal.records?.length ? (
-                currentGoal.records.map((r: any) => (
+              {records.length ? (
+                records.map((r) => (
                   <li
                     key={r.id}
                     className="flex justify-between text-sm font-medium"
@@ -255,6 +258,17 @@ export default function GoalDetails({ goal, onClose }: GoalDetailsProps) {
                 <p className="text-sm text-muted-foreground">Sem registros.</p>
               )}
             </ul>
+            {goalRecords.hasNextPage && (
+              <Button
+                variant="ghost"
+                size="sm"
+                className="w-full mt-2"
+                onClick={() => goalRecords.fetchNextPage()}
+                disabled={goalRecords.isFetchingNextPage}
+              >
+                {goalRecords.isFetchingNextPage ? "Carregando..." : "Carregar mais"}
+              </Button>
+            )}
           </div>
 
           {/* Botões Editar / Excluir */}
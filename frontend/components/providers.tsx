@@ -5,6 +5,7 @@ import { QueryClient, QueryClientProvider } from "@tanstack/react-query"
 import { Toaster } from "./ui/sonner"
 import { useGoalNotifications } from "@/hooks/useGoalNotifications"
 import { useFinanceNotifications } from "@/hooks/useFinanceNotifications"
+import { useLiveUpdates } from "@/hooks/useLiveUpdates"
 import { useSession } from "@/lib/auth-client"
 import { FinanceCreateProvider } from "@/hooks/useFinanceCreate"
 
@@ -16,6 +17,7 @@ export function Providers({ children }: { children: React.ReactNode }) {
       <FinanceCreateProvider> {/* 👈 envolve toda a aplicação */}
         <GoalNotificationWrapper queryClient={queryClient} />
         <FinanceNotificationWrapper queryClient={queryClient} />
+        <LiveUpdatesWrapper />
         {children}
         <Toaster position="top-right" />
       </FinanceCreateProvider>
@@ -46,3 +48,9 @@ export function FinanceNotificationWrapper({ queryClient }: { queryClient: Query
   useFinanceNotifications(userExists)
   return null
 }
+
+export function LiveUpdatesWrapper() {
+  const { data } = useSession()
+  useLiveUpdates(!!data?.user)
+  return null
+}
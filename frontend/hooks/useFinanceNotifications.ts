@@ -1,57 +1,39 @@
 "use client"
 
 import { useEffect, useRef } from "react"
+import { useQuery } from "@tanstack/react-query"
 import { toast } from "sonner"
-import { useFinances } from "@/hooks/useFinances"
+import { Finances } from "@/services"
 
 export function useFinanceNotifications(userExists: boolean) {
-  const { data: finances } = useFinances(userExists)
+  // o servidor já devolve só as finanças que vencem em breve ou estão atrasadas
+  const { data: notifications } = useQuery({
+    queryKey: ["finances", "notifications"],
+    queryFn: () => Finances.getFinanceNotifications(),
+    enabled: userExists,
+    refetchInterval: 5 * 60 * 1000,
+  })
   const notifiedFinances = useRef<Set<string>>(new Set()) // evita repetir notificações
 
   useEffect(() => {
     if (!userExists) return
-    if (!finances || !Array.isArray(finances)) return
+    if (!notifications) return
 
-    const now = new Date()
-    now.setHours(0, 0, 0, 0)
-
-    finances.forEach((f) => {
-      if (f.status === "Pago") return
-
-      const financeId = f.id.toString()
-      const { title, due_date } = f
-      if (!due_date) return
-
-      // padroniza formato yyyy-MM-dd
-      const dueDate = new Date(`${due_date}T00:00:00`)
-      dueDate.setHours(0, 0, 0, 0)
-
-      const diffMs = dueDate.getTime() - now.getTime()
-      const daysLeft = Math.floor(diffMs / (1000 * 60 * 60 * 24))
-
-      // função que garante notificação única
-      const notifyOnce = (
-        key: string,
-        message: string,
-        variant: "success" | "error" | "warning" | "info" = "info"
-      ) => {
-        const uniqueKey = `${financeId}-${key}`
-        if (!notifiedFinances.current.has(uniqueKey)) {
-          notifiedFinances.current.add(uniqueKey)
-          toast[variant](message)
-        }
-      }
+    notifications.forEach(({ id, title, days_left: daysLeft, kind }) => {
+      const uniqueKey = `${id}-${kind}`
+      if (notifiedFinances.current.has(uniqueKey)) return
+      notifiedFinances.current.add(uniqueKey)
 
       // 🔔 Regras de notificação personalizadas
-      if (daysLeft === 0) {
-        notifyOnce("due-today", `O pagamento de "${title}" é hoje!`, "warning")
-      } else if (daysLeft === 1) {
-        notifyOnce("due-tomorrow", `O pagamento de "${title}" é amanhã.`, "warning")
-      } else if (daysLeft > 1 && daysLeft <= 3) {
-        notifyOnce("due-soon", `Faltam ${daysLeft} dias para o pagamento de "${title}".`, "info")
-      } else if (daysLeft < 0) {
-        notifyOnce("due-expired", `O pagamento de "${title}" está atrasado à ${Math.abs(daysLeft)} dias!`, "error")
+      if (kind === "due-today") {
+        toast.warning(`O pagamento de "${title}" é hoje!`)
+      } else if (kind === "due-tomorrow") {
+        toast.warning(`O pagamento de "${title}" é amanhã.`)
+      } else if (kind === "due-soon") {
+        toast.info(`Faltam ${daysLeft} dias para o pagamento de "${title}".`)
+      } else {
+        toast.error(`O pagamento de "${title}" está atrasado à ${Math.abs(daysLeft)} dias!`)
       }
     })
-  }, [finances, userExists])
+  }, [notifications, userExists])
 }
@@ -0,0 +1,11 @@
+import { useQuery } from "@tanstack/react-query"
+import { Finances } from "@/services"
+import type { GetFinancesSummaryData } from "@/services/types.gen"
+
+export function useFinanceSummary(params: GetFinancesSummaryData, userExists: boolean) {
+  return useQuery({
+    queryKey: ["finances", "summary", params],
+    queryFn: () => Finances.getFinancesSummary(params),
+    enabled: userExists,
+  })
+}
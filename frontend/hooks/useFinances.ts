@@ -1,10 +1,48 @@
-import { useQuery } from "@tanstack/react-query"
+import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query"
 import { Finances } from "@/services"
+import type { FinanceSchema, GetFinancesData } from "@/services/types.gen"
+import { appendPage, syncList, type SyncedList } from "@/lib/sync"
 
-export function useFinances(userExists: boolean) {
-  return useQuery({
-    queryKey: ["finances"],
-    queryFn: () => Finances.getFinances(),
+// Registros por página; as seguintes só são buscadas quando pedidas (loadMore)
+const PAGE_SIZE = 100
+
+// Filtros da barra de busca, aplicados pelo backend (FinanceFilterSchema)
+export type FinanceFilters = Pick<
+  GetFinancesData,
+  "title" | "type" | "status" | "category" | "dateFrom" | "dateTo" | "dueDate"
+>
+
+export function useFinances(userExists: boolean, filters: FinanceFilters = {}) {
+  const queryClient = useQueryClient()
+  // Uma lista por combinação de filtros; useLiveUpdates atualiza as ativas
+  const queryKey = ["finances", "list", filters]
+
+  // Invalidar ["finances"] busca só o delta de /finances/changes, mantendo as páginas já carregadas
+  const query = useQuery({
+    queryKey,
+    queryFn: () =>
+      syncList(
+        queryClient.getQueryData<SyncedList<FinanceSchema>>(queryKey),
+        (since) => Finances.getFinanceChanges({ ...filters, since }),
+        () => Finances.getFinances({ ...filters, limit: PAGE_SIZE })
+      ),
     enabled: userExists,
   })
+
+  const nextCursor = query.data?.next_cursor
+  const loadMore = useMutation({
+    mutationFn: (cursor: string) => Finances.getFinances({ ...filters, cursor, limit: PAGE_SIZE }),
+    onSuccess: (page) =>
+      queryClient.setQueryData<SyncedList<FinanceSchema>>(queryKey, (list) => list && appendPage(list, page)),
+  })
+
+  return {
+    ...query,
+    data: query.data?.items,
+    hasMore: !!nextCursor,
+    isLoadingMore: loadMore.isPending,
+    loadMore: () => {
+      if (nextCursor) loadMore.mutate(nextCursor)
+    },
+  }
 }
@@ -0,0 +1,15 @@
+"use client";
+
+import { useInfiniteQuery } from "@tanstack/react-query";
+import { Finances } from "@/services";
+
+// Histórico da meta, carregado por páginas (cursor) sob demanda
+export function useGoalRecords(goalId: number) {
+  return useInfiniteQuery({
+    queryKey: ["goals", goalId, "records"],
+    queryFn: ({ pageParam }) =>
+      Finances.listGoalRecords({ goalId, cursor: pageParam, limit: 20 }),
+    initialPageParam: undefined as string | null | undefined,
+    getNextPageParam: (page) => page.next_cursor ?? undefined,
+  });
+}
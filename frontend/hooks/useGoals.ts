@@ -2,13 +2,22 @@
 
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 import { Finances } from "@/services";
+import type { GoalSchema } from "@/services/types.gen";
+import { syncList, type SyncedList } from "@/lib/sync";
 
 export function useGoals(userExists: boolean) {
   const queryClient = useQueryClient();
 
+  // Invalidar ["goals"] busca só o delta de /goals/changes
   const listGoals = useQuery({
     queryKey: ["goals"],
-    queryFn: () => Finances.listGoals(),
+    queryFn: () =>
+      syncList(
+        queryClient.getQueryData<SyncedList<GoalSchema>>(["goals"]),
+        (since) => Finances.getGoalChanges({ since }),
+        async () => ({ items: await Finances.listGoals() })
+      ),
+    select: (data) => data.items,
     enabled: userExists,
   });
 
@@ -0,0 +1,66 @@
+"use client";
+
+import { useEffect } from "react";
+import { useQueryClient, type InvalidateQueryFilters, type QueryFilters, type QueryKey } from "@tanstack/react-query";
+import { refreshSyncedList } from "@/lib/sync";
+
+type RecordsEvent = {
+  type: "finances" | "goals";
+  revision: number;
+  changed?: number[];
+  deleted?: number[];
+};
+
+// Consultas derivadas de cada lista, recarregadas quando ela muda (ids omitidos: todas)
+const DERIVED: Record<RecordsEvent["type"], (ids?: number[]) => InvalidateQueryFilters[]> = {
+  finances: () => [{ queryKey: ["finances", "summary"] }, { queryKey: ["finances", "notifications"] }],
+  goals: (ids) =>
+    ids
+      ? ids.map((id) => ({ queryKey: ["goals", id, "records"] }))
+      : [{ predicate: (query) => query.queryKey[0] === "goals" && query.queryKey[2] === "records" }],
+};
+
+// Listas sincronizadas em cache: as finanças têm uma por combinação de filtros (useFinances)
+const LISTS: Record<RecordsEvent["type"], QueryFilters> = {
+  finances: { queryKey: ["finances", "list"] },
+  goals: { queryKey: ["goals"], exact: true },
+};
+
+// Mudança de membros troca o escopo: o /changes das listas responde reset
+const MEMBERS: QueryKey[] = [["family"], ["family-users"], ["finances"], ["goals"]];
+
+export function useLiveUpdates(userExists: boolean) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!userExists) return;
+
+    const source = new EventSource("/api/events");
+
+    // Busca só o delta de /changes; ecos das próprias mutações são ignorados
+    const applyRecords = async (message: MessageEvent) => {
+      const event: RecordsEvent = JSON.parse(message.data);
+      const lists = queryClient.getQueryCache().findAll(LISTS[event.type]);
+      const refreshed = await Promise.all(
+        lists.map((query) => refreshSyncedList(queryClient, query.queryKey, event.revision))
+      );
+      // Sem lista em cache, só as consultas derivadas estão em uso
+      if (refreshed.length && !refreshed.some(Boolean)) return;
+      const ids = event.changed && event.deleted && [...event.changed, ...event.deleted];
+      for (const filters of DERIVED[event.type](ids)) {
+        queryClient.invalidateQueries(filters);
+      }
+    };
+    const invalidateMembers = () => {
+      for (const queryKey of MEMBERS) queryClient.invalidateQueries({ queryKey });
+    };
+    // "reset": eventos podem ter se perdido, recarrega tudo (as listas ainda por delta)
+    const invalidateAll = () => queryClient.invalidateQueries();
+
+    source.addEventListener("finances", applyRecords);
+    source.addEventListener("goals", applyRecords);
+    source.addEventListener("members", invalidateMembers);
+    source.addEventListener("reset", invalidateAll);
+    return () => source.close();
+  }, [userExists, queryClient]);
+}
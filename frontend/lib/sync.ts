@@ -0,0 +1,92 @@
+import type { QueryClient, QueryKey } from "@tanstack/react-query"
+
+// Listas sincronizadas por /changes: o cache guarda os itens e o token da
+// revisão; as recargas seguintes só buscam o que mudou desde o token.
+
+export type SyncedList<T> = {
+  revision: string
+  items: T[]
+  // Listas paginadas: cursor da próxima página ainda não carregada
+  next_cursor?: string | null
+}
+
+type Page<T> = {
+  items: T[]
+  next_cursor?: string | null
+}
+
+export type Changes<T> = {
+  revision: string
+  reset?: boolean
+  items?: T[]
+  deleted?: number[]
+}
+
+// Número da revisão de um token "<revisão>.<digest>"
+export function revisionNumber(token: string | undefined) {
+  return token ? Number(token.split(".", 1)[0]) : -1
+}
+
+// Aplica as alterações à lista: atualiza no lugar, remove os excluídos e põe os novos no início
+export function applyChanges<T extends { id: number }>(
+  list: SyncedList<T>,
+  changes: Changes<T>
+): SyncedList<T> {
+  const changed = new Map((changes.items ?? []).map((item) => [item.id, item]))
+  const deleted = new Set(changes.deleted ?? [])
+  const kept = list.items
+    .filter((item) => !deleted.has(item.id))
+    .map((item) => {
+      const updated = changed.get(item.id)
+      changed.delete(item.id)
+      return updated ?? item
+    })
+  return { ...list, revision: changes.revision, items: [...changed.values(), ...kept] }
+}
+
+// Acrescenta a próxima página, sem repetir itens que já vieram por um delta
+export function appendPage<T extends { id: number }>(list: SyncedList<T>, page: Page<T>): SyncedList<T> {
+  const loaded = new Set(list.items.map((item) => item.id))
+  return {
+    ...list,
+    items: [...list.items, ...page.items.filter((item) => !loaded.has(item.id))],
+    next_cursor: page.next_cursor,
+  }
+}
+
+// queryFn de uma lista sincronizada: delta quando há cache, lista (ou primeira
+// página) no início ou quando o backend pede recarga (reset)
+export async function syncList<T extends { id: number }>(
+  cached: SyncedList<T> | undefined,
+  getChanges: (since?: string) => Promise<Changes<T>>,
+  getFirst: () => Promise<Page<T>>
+): Promise<SyncedList<T>> {
+  // Token lido antes da lista: o que mudar no meio vem de novo no próximo delta
+  const changes = await getChanges(cached?.revision)
+  if (cached && !changes.reset) return applyChanges(cached, changes)
+  return { revision: changes.revision, ...(await getFirst()) }
+}
+
+// Atualiza a lista até a revisão informada (ex.: a de um evento do stream).
+// Retorna false se não precisou buscar nada: a revisão já estava no cache ou
+// veio na busca que já estava em andamento, como no eco das próprias mutações
+// (que invalidam as consultas ao concluir).
+export async function refreshSyncedList(
+  queryClient: QueryClient,
+  queryKey: QueryKey,
+  revision: number
+) {
+  const isBehind = () =>
+    revisionNumber(queryClient.getQueryData<SyncedList<unknown>>(queryKey)?.revision) < revision
+  const refresh = () =>
+    queryClient.invalidateQueries({ queryKey, exact: true }, { cancelRefetch: false })
+
+  if (!isBehind()) return false
+  // Espera a busca em andamento em vez de cancelá-la
+  const joined = queryClient.isFetching({ queryKey, exact: true }) > 0
+  await refresh()
+  if (!isBehind()) return !joined
+  // A busca em andamento leu o delta antes da revisão
+  await refresh()
+  return true
+}
@@ -3,18 +3,121 @@
 import type { CancelablePromise } from './core/CancelablePromise';
 import { OpenAPI } from './core/OpenAPI';
 import { request as __request } from './core/request';
-import type { GetFinancesResponse, CreateFinanceData, CreateFinanceResponse, GetFinanceData, GetFinanceResponse, UpdateFinanceData, UpdateFinanceResponse, DeleteFinanceData, DeleteFinanceResponse, UploadFinanceAttachmentsData, UploadFinanceAttachmentsResponse, DeleteFinanceAttachmentData, DeleteFinanceAttachmentResponse, GetSpendingLimitResponse, SetSpendingLimitData, SetSpendingLimitResponse, DeleteSpendingLimitResponse, ListGoalsResponse, CreateGoalData, CreateGoalResponse, GetGoalData, GetGoalResponse, UpdateGoalData, UpdateGoalResponse, DeleteGoalData, DeleteGoalResponse, AddGoalRecordData, AddGoalRecordResponse, UploadProfilePhotoData, UploadProfilePhotoResponse, CreateFamilyData, CreateFamilyResponse, GetFamilyResponse, JoinFamilyData, JoinFamilyResponse, ListFamilyUsersResponse, LeaveFamilyResponse, RemoveFamilyMemberData, RemoveFamilyMemberResponse, DeleteUserAccountResponse } from './types.gen';
+import type { GetFinancesData, GetFinancesResponse, GetFinanceChangesData, GetFinanceChangesResponse, GetFinancesSummaryData, GetFinancesSummaryResponse, GetFinanceNotificationsResponse, CreateFinanceData, CreateFinanceResponse, GetFinanceData, GetFinanceResponse, UpdateFinanceData, UpdateFinanceResponse, DeleteFinanceData, DeleteFinanceResponse, UploadFinanceAttachmentsData, UploadFinanceAttachmentsResponse, DeleteFinanceAttachmentData, DeleteFinanceAttachmentResponse, GetSpendingLimitResponse, SetSpendingLimitData, SetSpendingLimitResponse, DeleteSpendingLimitResponse, ListGoalsResponse, GetGoalChangesData, GetGoalChangesResponse, CreateGoalData, CreateGoalResponse, GetGoalData, GetGoalResponse, ListGoalRecordsData, ListGoalRecordsResponse, UpdateGoalData, UpdateGoalResponse, DeleteGoalData, DeleteGoalResponse, AddGoalRecordData, AddGoalRecordResponse, UploadProfilePhotoData, UploadProfilePhotoResponse, CreateFamilyData, CreateFamilyResponse, GetFamilyResponse, JoinFamilyData, JoinFamilyResponse, ListFamilyUsersResponse, LeaveFamilyResponse, RemoveFamilyMemberData, RemoveFamilyMemberResponse, DeleteUserAccountResponse } from './types.gen';
 
 export class Finances {
     /**
      * Get Finances
-     * @returns FinanceSchema OK
+     * @param data The data for the request.
+     * @param data.dateFrom
+     * @param data.dateTo
+     * @param data.type
+     * @param data.status
+     * @param data.category
+     * @param data.title
+     * @param data.dueDate
+     * @param data.userRefs Em vez de repetir o autor em cada item, retorna só created_by_id e os usuários uma vez em users.
+     * @param data.cursor
+     * @param data.limit
+     * @returns PagedFinanceSchema OK
+     * @throws ApiError
+     */
+    public static getFinances(data: GetFinancesData = {}): CancelablePromise<GetFinancesResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/finances',
+            query: {
+                date_from: data.dateFrom,
+                date_to: data.dateTo,
+                type: data.type,
+                status: data.status,
+                category: data.category,
+                title: data.title,
+                due_date: data.dueDate,
+                user_refs: data.userRefs,
+                cursor: data.cursor,
+                limit: data.limit
+            }
+        });
+    }
+    
+    /**
+     * Get Finance Changes
+     * Finanças alteradas e removidas desde o token ``since`` (campo ``revision``
+     * da resposta anterior). Sem ``since``, ou com ``reset``, recarregue a listagem.
+     * @param data The data for the request.
+     * @param data.since
+     * @param data.dateFrom
+     * @param data.dateTo
+     * @param data.type
+     * @param data.status
+     * @param data.category
+     * @param data.title
+     * @param data.dueDate
+     * @returns FinanceChangesSchema OK
+     * @throws ApiError
+     */
+    public static getFinanceChanges(data: GetFinanceChangesData = {}): CancelablePromise<GetFinanceChangesResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/finances/changes',
+            query: {
+                since: data.since,
+                date_from: data.dateFrom,
+                date_to: data.dateTo,
+                type: data.type,
+                status: data.status,
+                category: data.category,
+                title: data.title,
+                due_date: data.dueDate
+            }
+        });
+    }
+    
+    /**
+     * Get Finances Summary
+     * Totais de receita/despesa/meta agregados no banco por período (e dimensões opcionais).
+     * @param data The data for the request.
+     * @param data.dateFrom
+     * @param data.dateTo
+     * @param data.type
+     * @param data.status
+     * @param data.category
+     * @param data.title
+     * @param data.dueDate
+     * @param data.period
+     * @param data.groupBy
+     * @returns FinanceSummaryBucketSchema OK
+     * @throws ApiError
+     */
+    public static getFinancesSummary(data: GetFinancesSummaryData = {}): CancelablePromise<GetFinancesSummaryResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/finances/summary',
+            query: {
+                date_from: data.dateFrom,
+                date_to: data.dateTo,
+                type: data.type,
+                status: data.status,
+                category: data.category,
+                title: data.title,
+                due_date: data.dueDate,
+                period: data.period,
+                group_by: data.groupBy
+            }
+        });
+    }
+    
+    /**
+     * Get Finance Notifications
+     * Finanças não pagas que vencem nos próximos dias ou já venceram.
+     * @returns FinanceNotificationSchema OK
      * @throws ApiError
      */
-    public static getFinances(): CancelablePromise<GetFinancesResponse> {
+    public static getFinanceNotifications(): CancelablePromise<GetFinanceNotificationsResponse> {
         return __request(OpenAPI, {
             method: 'GET',
-            url: '/api/finances'
+            url: '/api/finances/notifications'
         });
     }
     
@@ -42,6 +145,7 @@ export class Finances {
      * Get Finance
      * @param data The data for the request.
      * @param data.financeId
+     * @param data.userRefs Em vez de repetir o autor em cada item, retorna só created_by_id e os usuários uma vez em users.
      * @returns DetailFinanceSchema OK
      * @throws ApiError
      */
@@ -51,6 +155,9 @@ export class Finances {
             url: '/api/finances/{finance_id}',
             path: {
                 finance_id: data.financeId
+            },
+            query: {
+                user_refs: data.userRefs
             }
         });
     }
@@ -181,6 +288,24 @@ export class Finances {
         });
     }
     
+    /**
+     * Get Goal Changes
+     * Metas alteradas e removidas desde o token ``since`` (ver /finances/changes).
+     * @param data The data for the request.
+     * @param data.since
+     * @returns GoalChangesSchema OK
+     * @throws ApiError
+     */
+    public static getGoalChanges(data: GetGoalChangesData = {}): CancelablePromise<GetGoalChangesResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/goals/changes',
+            query: {
+                since: data.since
+            }
+        });
+    }
+    
     /**
      * Create Goal
      * @param data The data for the request.
@@ -214,6 +339,30 @@ export class Finances {
         });
     }
     
+    /**
+     * List Goal Records
+     * Histórico de registros da meta, dos mais recentes para os mais antigos.
+     * @param data The data for the request.
+     * @param data.goalId
+     * @param data.cursor
+     * @param data.limit
+     * @returns PagedGoalRecordSchema OK
+     * @throws ApiError
+     */
+    public static listGoalRecords(data: ListGoalRecordsData): CancelablePromise<ListGoalRecordsResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/goals/{goal_id}/records',
+            path: {
+                goal_id: data.goalId
+            },
+            query: {
+                cursor: data.cursor,
+                limit: data.limit
+            }
+        });
+    }
+    
     /**
      * Update Goal
      * @param data The data for the request.
@@ -74,6 +74,22 @@ export type FinanceAttachmentSchema = {
     size?: (number | null);
 };
 
+export type FinanceNotificationSchema = {
+    id: number;
+    title: string;
+    due_date: string;
+    status: FinanceStatus;
+    days_left: number;
+    kind: ('due-today' | 'due-tomorrow' | 'due-soon' | 'due-expired');
+};
+
+export type FinanceChangesSchema = {
+    revision: string;
+    reset?: boolean;
+    items?: Array<FinanceSchema>;
+    deleted?: Array<(number)>;
+};
+
 export type FinanceSchema = {
     id: number;
     created_by: UserSchema;
@@ -97,6 +113,17 @@ export const FinanceStatus = {
     ATRASADA: 'Atrasada'
 } as const;
 
+export type FinanceSummaryBucketSchema = {
+    period: string;
+    category?: (string | null);
+    status?: (FinanceStatus | null);
+    created_by_id?: (string | null);
+    income: number;
+    expense: number;
+    goal: number;
+    count: number;
+};
+
 export type FinanceType = 'Receita' | 'Despesa' | 'Meta';
 
 export const FinanceType = {
@@ -105,6 +132,13 @@ export const FinanceType = {
     META: 'Meta'
 } as const;
 
+export type GoalChangesSchema = {
+    revision: string;
+    reset?: boolean;
+    items?: Array<GoalSchema>;
+    deleted?: Array<(number)>;
+};
+
 export type GoalRecordSchema = {
     id: number;
     title: string;
@@ -122,7 +156,7 @@ export type GoalSchema = {
     deadline: (string | null);
     created_at: string;
     updated_at: string;
-    records: Array<GoalRecordSchema>;
+    records_count: number;
 };
 
 export type JoinFamilySchema = {
@@ -144,11 +178,71 @@ export type UploadProfilePhotoSchema = {
 export type UserSchema = {
     id: string;
     image?: (string | null);
+    image_variants?: ({
+    [key: string]: {
+        [key: string]: (string);
+    };
+} | null);
     name?: (string | null);
     email: string;
 };
 
-export type GetFinancesResponse = (Array<FinanceSchema>);
+export type PagedFinanceSchema = {
+    items: Array<FinanceSchema>;
+    next_cursor?: (string | null);
+};
+
+export type PagedGoalRecordSchema = {
+    items: Array<GoalRecordSchema>;
+    next_cursor?: (string | null);
+};
+
+export type GetFinancesData = {
+    category?: (string | null);
+    cursor?: (string | null);
+    dateFrom?: (string | null);
+    dateTo?: (string | null);
+    dueDate?: (string | null);
+    limit?: number;
+    status?: (FinanceStatus | null);
+    title?: (string | null);
+    type?: (FinanceType | null);
+    /**
+     * Em vez de repetir o autor em cada item, retorna só created_by_id e os usuários uma vez em users.
+     */
+    userRefs?: boolean;
+};
+
+export type GetFinancesResponse = (PagedFinanceSchema);
+
+export type GetFinanceChangesData = {
+    category?: (string | null);
+    dateFrom?: (string | null);
+    dateTo?: (string | null);
+    dueDate?: (string | null);
+    since?: (string | null);
+    status?: (FinanceStatus | null);
+    title?: (string | null);
+    type?: (FinanceType | null);
+};
+
+export type GetFinanceChangesResponse = (FinanceChangesSchema);
+
+export type GetFinancesSummaryData = {
+    category?: (string | null);
+    dateFrom?: (string | null);
+    dateTo?: (string | null);
+    dueDate?: (string | null);
+    groupBy?: Array<('category' | 'status' | 'member')>;
+    period?: ('month' | 'day');
+    status?: (FinanceStatus | null);
+    title?: (string | null);
+    type?: (FinanceType | null);
+};
+
+export type GetFinancesSummaryResponse = (Array<FinanceSummaryBucketSchema>);
+
+export type GetFinanceNotificationsResponse = (Array<FinanceNotificationSchema>);
 
 export type CreateFinanceData = {
     goalId?: (number | null);
@@ -159,6 +253,10 @@ export type CreateFinanceResponse = (FinanceSchema);
 
 export type GetFinanceData = {
     financeId: number;
+    /**
+     * Em vez de repetir o autor em cada item, retorna só created_by_id e os usuários uma vez em users.
+     */
+    userRefs?: boolean;
 };
 
 export type GetFinanceResponse = (DetailFinanceSchema);
@@ -203,6 +301,12 @@ export type DeleteSpendingLimitResponse = (void);
 
 export type ListGoalsResponse = (Array<GoalSchema>);
 
+export type GetGoalChangesData = {
+    since?: (string | null);
+};
+
+export type GetGoalChangesResponse = (GoalChangesSchema);
+
 export type CreateGoalData = {
     requestBody: CreateGoalSchema;
 };
@@ -215,6 +319,14 @@ export type GetGoalData = {
 
 export type GetGoalResponse = (GoalSchema);
 
+export type ListGoalRecordsData = {
+    cursor?: (string | null);
+    goalId: number;
+    limit?: number;
+};
+
+export type ListGoalRecordsResponse = (PagedGoalRecordSchema);
+
 export type UpdateGoalData = {
     goalId: number;
     requestBody: CreateGoalSchema;